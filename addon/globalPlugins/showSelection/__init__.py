@@ -0,0 +1,363 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+import globalPluginHandler
+import addonHandler
+import braille
+import api
+import config
+import globalCommands
+import ui
+import globalVars
+import functools
+import os
+import time
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from globalCommands import GlobalCommands
+from inputCore import InputGesture
+from logHandler import log
+from NVDAObjects import NVDAObject
+from scriptHandler import script
+from treeInterceptorHandler import DocumentTreeInterceptor
+from typing import (
+	Callable,
+)
+
+from . import (
+	settings,
+	instrumentation,
+	strategy,
+	trace,
+	translation,
+)
+from .settings import (
+	_Settings,
+)
+from .instrumentation import (
+	_Instrumentation,
+	_instrumented,
+)
+from .strategy import (
+	_ReviewUpdate,
+	_invalidatePolicies,
+	_StrategyLearner,
+	_getAppPolicy,
+)
+from .selection import (
+	_selectionCache,
+)
+from .trace import (
+	_TraceRecorder,
+)
+from .coalescer import (
+	_coalescer,
+)
+from .summary import (
+	_SelectionSummary,
+	_summarizer,
+)
+from .registry import (
+	_regionRegistry,
+)
+from .prefetch import (
+	_prefetcher,
+)
+from .snapshots import (
+	_snapshotCache,
+)
+from .patches import (
+	_MISSING,
+	_originalAttributes,
+	_removePatches,
+	_updatePatches,
+)
+
+addonHandler.initTranslation()
+
+
+def _refreshSettings() -> None:
+	"""Takes snapshot of settings, and updates state which depends on them."""
+	newSettings: _Settings = _Settings.fromConfig()
+	if newSettings != settings.current:
+		settings.current = newSettings
+		_invalidatePolicies()
+	_updatePatches()
+
+
+def _onConfigChanged() -> None:
+	"""Updates state which depends on configuration."""
+	_invalidatePolicies()
+	_refreshSettings()
+
+
+def _settingsChanged() -> bool:
+	"""Checks if any setting of snapshot has changed since settings were
+	refreshed. Braille and review cursor settings are changed in settings
+	dialog without notification.
+	:return: True if snapshot of current configuration differs
+	"""
+	return _Settings.fromConfig() != settings.current
+
+
+#: Global commands which change configuration without notification, and are
+#: wrapped to refresh settings.
+_SETTINGS_COMMANDS: tuple[str, ...] = (
+	"script_braille_toggleTether",
+	"script_toggleBrailleMode",
+	"script_braille_cycleShowSelection",
+	"script_braille_cycleReviewRoutingMovesSystemCaret",
+)
+
+
+def _settingsCommand(name: str, original: Callable) -> Callable:
+	"""Wraps global command so that settings are refreshed after it.
+	:param name: name of script
+	:param original: original script
+	:return: script which keeps description, category and gestures of original
+	"""
+
+	@functools.wraps(original)
+	def script(self, gesture: InputGesture) -> None:
+		getattr(GlobalCommands, f"_{name}")(self, gesture)
+		_refreshSettings()
+
+	return script
+
+
+#: Original class attributes replaced to notice toggles of settings, while
+#: plugin is running.
+_originalSettingsAttributes: dict[tuple[type, str], object] = {}
+
+
+def _installSettingsPatches() -> None:
+	"""Wraps commands which toggle braille and review cursor settings, because
+	they change configuration without notification.
+	"""
+	for name in _SETTINGS_COMMANDS:
+		original: Callable | None = GlobalCommands.__dict__.get(name)
+		if original is None:
+			continue
+		for attribute, value in ((f"_{name}", original), (name, _settingsCommand(name, original))):
+			_originalSettingsAttributes[(GlobalCommands, attribute)] = GlobalCommands.__dict__.get(attribute, _MISSING)
+			setattr(GlobalCommands, attribute, value)
+	globalCommands.commands = globalCommands.GlobalCommands()
+
+
+def _removeSettingsPatches() -> None:
+	"""Restores commands which were wrapped to notice toggles of settings."""
+	for (cls, name), value in reversed(_originalSettingsAttributes.items()):
+		if value is _MISSING:
+			delattr(cls, name)
+		else:
+			setattr(cls, name, value)
+	_originalSettingsAttributes.clear()
+	globalCommands.commands = globalCommands.GlobalCommands()
+
+
+class GlobalPlugin(globalPluginHandler.GlobalPlugin):
+	scriptCategory: str = addonHandler.getCodeAddon().manifest["summary"]
+
+	def __init__(self):
+		"""Constructor.
+		Class variables are added and replaced to get selection to be shown
+		only when braille is tethered to review.
+		"""
+		super().__init__()
+		if config.conf["showSelection"]["instrumentation"]:
+			instrumentation.current = _Instrumentation(config.conf["showSelection"]["instrumentationBufferSize"])
+			self.event_caret = _instrumented("event_caret", self.event_caret)
+			self.event_gainFocus = _instrumented("event_gainFocus", self.event_gainFocus)
+		if config.conf["showSelection"]["adaptiveStrategy"]:
+			strategy.learner = _StrategyLearner(
+				os.path.join(globalVars.appArgs.configPath, "showSelectionStrategies.json"),
+			)
+		_refreshSettings()
+		config.post_configProfileSwitch.register(_onConfigChanged)
+		config.post_configReset.register(_onConfigChanged)
+		config.post_configSave.register(_refreshSettings)
+		braille.displayChanged.register(_refreshSettings)
+		_installSettingsPatches()
+
+	def terminate(self):
+		if trace.recorder is not None:
+			trace.recorder.close()
+			trace.recorder = None
+		if strategy.learner is not None:
+			strategy.learner.save()
+			strategy.learner = None
+		config.post_configProfileSwitch.unregister(_onConfigChanged)
+		config.post_configReset.unregister(_onConfigChanged)
+		config.post_configSave.unregister(_refreshSettings)
+		braille.displayChanged.unregister(_refreshSettings)
+		if _originalAttributes:
+			_removePatches()
+		_removeSettingsPatches()
+		super().terminate()
+
+	def event_caret(self, obj: NVDAObject, nextHandler: Callable[[], None]) -> None:
+		if not _originalAttributes:
+			nextHandler()
+			return
+		# Braille updates caused by caret events are done once per flush.
+		self._handleCaret(obj, lambda: _coalescer.deferBrailleUpdates(nextHandler))
+
+	def _handleCaret(self, obj: NVDAObject, nextHandler: Callable[[], None]) -> None:
+		_selectionCache.invalidate()
+		_prefetcher.cancel()
+		if trace.recorder is not None:
+			trace.recorder.recordSelection(_TraceRecorder.CARET, obj)
+		region: ReviewTextInfoRegion | None = _regionRegistry.get(obj)
+		if strategy.learner is not None:
+			strategy.learner.caretEvent(obj, region._realSelection if region is not None else None)
+		if not settings.current.followCaret:
+			nextHandler()
+			return
+		# When caret events cannot be relied on (for example in word when UIA
+		# is disabled), review position is updated without them.
+		if _getAppPolicy(obj.appModule).reviewUpdate == _ReviewUpdate.QUEUED_REVIEW_POSITION:
+			nextHandler()
+			return
+		if region is not None:
+			if (
+				region._reviewPos is not None
+				and region._reviewPos.obj == api.getFocusObject()
+				and _snapshotCache.keepsReviewPosition(region)
+			):
+				_coalescer.setReviewPosition(region._reviewPos)
+				region._reviewPos = None
+			elif region._realSelection is not None:
+				region._realSelection = region._reviewPos = None
+				api.setNavigatorObject(api.getFocusObject())
+		nextHandler()
+
+	def event_gainFocus(self, obj: NVDAObject, nextHandler: Callable[[], None]) -> None:
+		# Braille or review cursor settings may have been changed in a dialog.
+		if _settingsChanged():
+			_refreshSettings()
+		if not _originalAttributes:
+			nextHandler()
+			return
+		_selectionCache.invalidate()
+		_selectionCache.release(obj)
+		_coalescer.cancel()
+		_summarizer.cancel()
+		_summarizer.release(obj)
+		_prefetcher.cancel()
+		_snapshotCache.save(_regionRegistry.displayed())
+		_snapshotCache.arm()
+		_regionRegistry.release(obj)
+		if strategy.learner is not None:
+			strategy.learner.focusChanged()
+		if trace.recorder is not None:
+			trace.recorder.recordSelection(_TraceRecorder.GAIN_FOCUS, obj)
+		if settings.current.followFocus:
+			self._handleCaret(obj, nextHandler)
+		else:
+			nextHandler()
+
+	@script(
+		# Translators: Describes a command which writes performance statistics to NVDA log.
+		description=_("Writes performance statistics of show selection to NVDA log"),
+	)
+	def script_logStatistics(self, gesture: InputGesture) -> None:
+		reports: list[str] = [
+			statistics.report()
+			for statistics in (instrumentation.current, strategy.learner, translation.cache)
+			if statistics is not None
+		]
+		if reports and _originalAttributes:
+			reports.append(_regionRegistry.report())
+			reports.append(_prefetcher.report())
+			reports.append(_snapshotCache.report())
+		if not reports:
+			# Translators: Reported when performance statistics are not collected.
+			ui.message(_("Performance statistics are disabled"))
+			return
+		log.info("\n".join(reports))
+		# Translators: Reported when performance statistics are written to NVDA log.
+		ui.message(_("Performance statistics written to log"))
+
+	@script(
+		# Translators: Describes a command which starts or stops recording of selection trace.
+		description=_("Starts or stops recording of selection trace for performance analysis"),
+	)
+	def script_toggleTraceRecording(self, gesture: InputGesture) -> None:
+		if trace.recorder is not None:
+			trace.recorder.close()
+			log.info(f"Selection trace written to {trace.recorder.path}")
+			trace.recorder = None
+			# Translators: Reported when recording of selection trace stops.
+			ui.message(_("Trace recording stopped"))
+			return
+		directory: str = os.path.join(globalVars.appArgs.configPath, "showSelectionTraces")
+		os.makedirs(directory, exist_ok=True)
+		trace.recorder = _TraceRecorder(os.path.join(directory, time.strftime("trace-%Y%m%d-%H%M%S.bin")))
+		# Replay starts from document which has focus when recording starts.
+		focus: NVDAObject = api.getFocusObject()
+		treeInterceptor = focus.treeInterceptor
+		if isinstance(treeInterceptor, DocumentTreeInterceptor) and not treeInterceptor.passThrough:
+			trace.recorder.recordSelection(_TraceRecorder.GAIN_FOCUS, treeInterceptor)
+		else:
+			trace.recorder.recordSelection(_TraceRecorder.GAIN_FOCUS, focus)
+		# Translators: Reported when recording of selection trace starts.
+		ui.message(_("Trace recording started"))
+
+	@script(
+		# Translators: Describes a command which reports statistics of selected text.
+		description=_("Reports number of characters, words and lines of selected text shown in braille"),
+	)
+	def script_reportSelectionSummary(self, gesture: InputGesture) -> None:
+		region: ReviewTextInfoRegion | None = _regionRegistry.displayed() if _originalAttributes else None
+		if region is None or region._realSelection is None:
+			# Translators: Reported when there is no selection whose statistics could be reported.
+			ui.message(_("No selection"))
+			return
+		summary: _SelectionSummary = _summarizer.summarize(
+			region._realSelection,
+			lambda summary: ui.message(summary.message()),
+		)
+		if summary.complete:
+			ui.message(summary.message())
+		elif summary.characters:
+			# Translators: Reported when selected text is still being counted.
+			ui.message(_("Counting, {characters} characters so far").format(characters=summary.characters))
+		else:
+			# Translators: Reported when counting of selected text starts.
+			ui.message(_("Counting selection"))
+
+	@script(
+		# Translators: Describes a command which moves review cursor to start of selection.
+		description=_("Moves review cursor to start of selection shown in braille"),
+	)
+	def script_reviewSelectionStart(self, gesture: InputGesture) -> None:
+		self._reviewSelectionEdge(end=False)
+
+	@script(
+		# Translators: Describes a command which moves review cursor to end of selection.
+		description=_("Moves review cursor to last selected character shown in braille"),
+	)
+	def script_reviewSelectionEnd(self, gesture: InputGesture) -> None:
+		self._reviewSelectionEdge(end=True)
+
+	def _reviewSelectionEdge(self, end: bool) -> None:
+		region: ReviewTextInfoRegion | None = _regionRegistry.displayed() if _originalAttributes else None
+		if region is None or region._realSelection is None:
+			# Translators: Reported when there is no selection to which review cursor could be moved.
+			ui.message(_("No selection"))
+			return
+		api.setReviewPosition(region._realSelection.edge(end))
+
+	def event_textChange(self, obj: NVDAObject, nextHandler: Callable[[], None]) -> None:
+		if not _originalAttributes:
+			nextHandler()
+			return
+		# Offsets of cached selection may not be valid after text has changed.
+		_selectionCache.invalidate(discardLastKnown=True)
+		_summarizer.invalidate()
+		_prefetcher.cancel()
+		_snapshotCache.discard(obj)
+		nextHandler()
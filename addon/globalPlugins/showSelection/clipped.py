@@ -0,0 +1,94 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Reading units clipped to the first selected range."""
+
+import textInfos
+import UIAHandler
+import _ctypes
+
+from NVDAObjects.UIA import (
+	UIATextInfo,
+)
+from textInfos.offsets import (
+	OffsetsTextInfo,
+)
+
+from .spans import (
+	_SelectionRanges,
+)
+
+
+def _clippedToFirstRange(info: OffsetsTextInfo, ranges: _SelectionRanges) -> OffsetsTextInfo | None:
+	"""Clips part of reading unit to first range of multiple selection within it.
+	:param info: part of reading unit within all ranges, which is changed
+	:param ranges: ranges of selection
+	:return: info, or None if no range intersects reading unit
+	"""
+	intersecting: list[tuple[int, int]] = ranges.intersecting(info._startOffset, info._endOffset)
+	if not intersecting:
+		return None
+	info._startOffset, info._endOffset = intersecting[0]
+	return info
+
+
+def _uiaContains(info: UIATextInfo, position: UIATextInfo) -> bool:
+	"""Checks if position is within UIA text info by comparing endpoints of
+	text ranges directly.
+	:param info: text info which may contain position
+	:param position: collapsed position
+	:return: True if start of position is within text info
+	"""
+	start: int = UIAHandler.TextPatternRangeEndpoint_Start
+	try:
+		return (
+			position._rangeObj.CompareEndpoints(start, info._rangeObj, start) >= 0
+			and position._rangeObj.CompareEndpoints(start, info._rangeObj, UIAHandler.TextPatternRangeEndpoint_End) < 0
+		)
+	except (AttributeError, _ctypes.COMError):
+		return False
+
+
+class _ClippedReadingUnit:
+	"""Reading unit containing review position clipped to selection."""
+
+	__slots__ = ("selection", "unit", "reviewBookmark", "readingUnit", "clipped")
+
+	def __init__(
+		self,
+		selection: textInfos.TextInfo,
+		unit: str,
+		reviewBookmark: textInfos.Bookmark | None,
+		readingUnit: textInfos.TextInfo,
+		clipped: textInfos.TextInfo | None,
+	):
+		self.selection = selection
+		self.unit = unit
+		self.reviewBookmark = reviewBookmark
+		self.readingUnit = readingUnit
+		self.clipped = clipped
+
+	def matches(self, selection: textInfos.TextInfo, unit: str, reviewPos: textInfos.TextInfo) -> bool:
+		"""Checks if this can be used for review position.
+		:param selection: current selection
+		:param unit: current reading unit
+		:param reviewPos: current review position
+		:return: True if selection and reading unit are same, and review
+		position is within same reading unit
+		"""
+		if unit != self.unit:
+			return False
+		if selection is not self.selection and not (
+			isinstance(selection, OffsetsTextInfo)
+			and isinstance(self.selection, OffsetsTextInfo)
+			and selection.obj is self.selection.obj
+			and selection._startOffset == self.selection._startOffset
+			and selection._endOffset == self.selection._endOffset
+		):
+			return False
+		if isinstance(reviewPos, OffsetsTextInfo) and isinstance(self.readingUnit, OffsetsTextInfo):
+			return self.readingUnit._startOffset <= reviewPos._startOffset < self.readingUnit._endOffset
+		if isinstance(reviewPos, UIATextInfo) and isinstance(self.readingUnit, UIATextInfo):
+			return _uiaContains(self.readingUnit, reviewPos)
+		return reviewPos.bookmark == self.reviewBookmark
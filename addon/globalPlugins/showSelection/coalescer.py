@@ -0,0 +1,138 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Coalescing of review position updates caused by selection changes."""
+
+import braille
+import api
+import eventHandler
+import queueHandler
+import core
+
+from NVDAObjects import NVDAObject
+from treeInterceptorHandler import DocumentTreeInterceptor
+from typing import (
+	Callable,
+)
+
+from . import (
+	settings,
+	strategy,
+	trace,
+)
+from .spans import (
+	_Span,
+)
+
+
+class _ReviewPositionCoalescer:
+	"""Coalesces review position updates caused by selection changes, and
+	braille updates caused by caret events.
+	When selection changes rapidly (for example when shift+arrow key is held
+	down), only the newest review position is set, so braille is updated
+	once instead of replaying every step.
+	"""
+
+	def __init__(self):
+		self._reviewPos: _Span | None = None
+		self._scheduled: bool = False
+		self._pumpedObj: NVDAObject | None = None
+		#: Whether caret event handler is running, so that braille updates are deferred.
+		self._deferring: bool = False
+		#: Braille handler and its argument, when braille update was deferred.
+		self._deferredReviewMove: tuple[braille.BrailleHandler, bool] | None = None
+
+	def setReviewPosition(self, reviewPos: _Span) -> None:
+		"""Sets review position when pending updates are flushed.
+		:param reviewPos: new review position, replaces pending one
+		"""
+		self._reviewPos = reviewPos
+		self._schedule()
+
+	def queueCaretEvent(self, obj: NVDAObject | DocumentTreeInterceptor) -> None:
+		"""Queues caret event unless one is already pending for object.
+		:param obj: object for which caret event is queued
+		"""
+		if not eventHandler.isPendingEvents("caret", obj):
+			eventHandler.queueEvent("caret", obj)
+			if trace.recorder is not None:
+				trace.recorder.syntheticCaretEvents.add(id(obj))
+			if strategy.learner is not None:
+				strategy.learner.caretEventQueued(obj)
+
+	def processPendingEvents(self, obj: NVDAObject) -> None:
+		"""Processes pending events once per flush for object shown in braille.
+		:param obj: object whose caret event is pending
+		"""
+		if self._pumpedObj is obj:
+			return
+		self._pumpedObj = obj
+		self._schedule()
+		api.processPendingEvents(processEventQueue=False)
+
+	def deferBrailleUpdates(self, handler: Callable[[], None]) -> None:
+		"""Runs handler of caret event so that braille updates which it causes
+		are done when pending updates are flushed.
+		:param handler: next handler of caret event
+		"""
+		self._deferring = True
+		try:
+			handler()
+		finally:
+			self._deferring = False
+
+	def deferReviewMove(self, brailleHandler: braille.BrailleHandler, shouldAutoTether: bool) -> bool:
+		"""Defers braille update of review position when caret event handler
+		is running.
+		:param brailleHandler: braille handler whose update is deferred
+		:param shouldAutoTether: argument of deferred update
+		:return: True if update was deferred
+		"""
+		if not self._deferring:
+			return False
+		self._deferredReviewMove = (brailleHandler, shouldAutoTether)
+		self._schedule()
+		return True
+
+	def cancel(self) -> None:
+		"""Discards pending review position and braille update."""
+		self._reviewPos = None
+		self._deferredReviewMove = None
+
+	def _schedule(self) -> None:
+		if self._scheduled:
+			return
+		self._scheduled = True
+		latency: int = settings.current.coalesceLatency
+		if latency:
+			core.callLater(latency, self._flush)
+		else:
+			queueHandler.queueFunction(queueHandler.eventQueue, self._flush)
+
+	def _flush(self) -> None:
+		self._scheduled = False
+		self._pumpedObj = None
+		reviewPos: _Span | None = self._reviewPos
+		self._reviewPos = None
+		reviewMove: tuple[braille.BrailleHandler, bool] | None = self._deferredReviewMove
+		self._deferredReviewMove = None
+		# Setting review position updates braille also for deferred update.
+		if reviewPos is not None:
+			api.setReviewPosition(reviewPos.makeTextInfo())
+		elif reviewMove is not None:
+			brailleHandler, shouldAutoTether = reviewMove
+			braille.BrailleHandler._originalHandleReviewMove(brailleHandler, shouldAutoTether=shouldAutoTether)
+
+
+def handleReviewMove(self, shouldAutoTether: bool = True) -> None:
+	"""Updates braille when review position moves. Updates caused by caret
+	events are deferred until pending updates are flushed, so that braille is
+	updated once when caret moves rapidly.
+	:param shouldAutoTether: whether braille may be tethered to review
+	"""
+	if not _coalescer.deferReviewMove(self, shouldAutoTether):
+		braille.BrailleHandler._originalHandleReviewMove(self, shouldAutoTether=shouldAutoTether)
+
+
+_coalescer = _ReviewPositionCoalescer()
@@ -0,0 +1,105 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Timing of patched functions and counting of calls to provider."""
+
+import bisect
+import collections
+import functools
+import time
+
+from typing import (
+	Callable,
+)
+
+
+class _Instrumentation:
+	"""Collects call counts and latencies of patched functions, and counts of
+	calls to provider.
+	"""
+
+	#: Upper bounds of latency histogram buckets in microseconds. Last bucket
+	#: contains longer calls.
+	BUCKETS: tuple[int, ...] = tuple(2**exponent for exponent in range(21))
+
+	def __init__(self, bufferSize: int):
+		self.calls: collections.Counter[str] = collections.Counter()
+		self.providerCalls: collections.Counter[str] = collections.Counter()
+		self.histograms: dict[str, list[int]] = {}
+		#: Latest calls as (name, time, duration in microseconds).
+		self.samples: collections.deque[tuple[str, float, int]] = collections.deque(maxlen=bufferSize)
+
+	def record(self, name: str, duration: float) -> None:
+		"""Records call of patched function.
+		:param name: name of function
+		:param duration: duration of call in seconds
+		"""
+		microseconds: int = int(duration * 1000000)
+		self.calls[name] += 1
+		histogram: list[int] = self.histograms.setdefault(name, [0] * (len(self.BUCKETS) + 1))
+		histogram[bisect.bisect_left(self.BUCKETS, microseconds)] += 1
+		self.samples.append((name, time.time(), microseconds))
+
+	def countProviderCall(self, name: str) -> None:
+		"""Counts call to provider.
+		:param name: name of call
+		"""
+		self.providerCalls[name] += 1
+
+	def _percentile(self, histogram: list[int], fraction: float) -> str:
+		threshold: float = sum(histogram) * fraction
+		total: int = 0
+		for index, count in enumerate(histogram):
+			total += count
+			if total >= threshold:
+				return f"<={self.BUCKETS[index]}" if index < len(self.BUCKETS) else f">{self.BUCKETS[-1]}"
+		return "-"
+
+	def report(self) -> str:
+		"""Creates report of collected statistics.
+		:return: report as text
+		"""
+		lines: list[str] = ["Show selection statistics (latencies in microseconds):"]
+		for name, histogram in sorted(self.histograms.items()):
+			lines.append(
+				f"{name}: calls {self.calls[name]}, p50 {self._percentile(histogram, 0.5)}, "
+				f"p90 {self._percentile(histogram, 0.9)}, p99 {self._percentile(histogram, 0.99)}"
+			)
+		lines.append(
+			"Provider calls: "
+			+ (", ".join(f"{name} {count}" for name, count in sorted(self.providerCalls.items())) or "none")
+		)
+		slowest: list[tuple[str, float, int]] = sorted(self.samples, key=lambda sample: sample[2])[-10:]
+		lines.append(f"Slowest of latest {len(self.samples)} calls:")
+		lines.extend(
+			f"{name} {duration} at {time.strftime('%H:%M:%S', time.localtime(timestamp))}"
+			for name, timestamp, duration in reversed(slowest)
+		)
+		return "\n".join(lines)
+
+
+#: Instrumentation, None when it is disabled.
+current: _Instrumentation | None = None
+
+
+def _instrumented(name: str, func: Callable) -> Callable:
+	"""Wraps function so that its calls are recorded.
+	:param name: name used in statistics
+	:param func: function to wrap
+	:return: wrapper, or function itself when instrumentation is disabled,
+	so that disabled instrumentation causes no overhead
+	"""
+	instrumentation: _Instrumentation | None = current
+	if instrumentation is None:
+		return func
+
+	@functools.wraps(func)
+	def wrapper(*args, **kwargs):
+		start: float = time.perf_counter()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			instrumentation.record(name, time.perf_counter() - start)
+
+	return wrapper
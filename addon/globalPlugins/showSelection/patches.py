@@ -0,0 +1,289 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Hooks of commands and editable text, and installing of all patches."""
+
+import braille
+import api
+import textInfos
+import config
+import eventHandler
+import globalCommands
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from cursorManager import CursorManager
+from editableText import (
+	EditableText,
+	EditableTextWithoutAutoSelectDetection,
+)
+from globalCommands import GlobalCommands
+from inputCore import InputGesture
+from types import ModuleType
+
+from . import (
+	settings,
+	trace,
+	translation,
+)
+from .instrumentation import (
+	_instrumented,
+)
+from .spans import (
+	_Span,
+)
+from .strategy import (
+	_getAppPolicy,
+)
+from .selection import (
+	_fetcher,
+	_selectionCache,
+)
+from .trace import (
+	_TraceRecorder,
+)
+from .coalescer import (
+	handleReviewMove,
+	_coalescer,
+)
+from .summary import (
+	_summarizer,
+)
+from .translation import (
+	_TranslationCache,
+	_regionModule,
+	_render,
+)
+from .registry import (
+	_regionRegistry,
+)
+from .prefetch import (
+	_prefetcher,
+)
+from .snapshots import (
+	_snapshotCache,
+)
+from .region import (
+	_selectionHelper,
+	_clippedReadingUnit,
+	_virtualBufferSelectionHelper,
+	_getSelection,
+	_collapsedReviewPosition,
+	_reviewBrailleCursorPos,
+	update,
+	_updateRegion,
+	_storeRenderedReadingUnit,
+	_updateSelectionMask,
+	_applySelectionMask,
+	_routeToTextInfoHelper,
+	getTextInfoForBraillePos,
+	_setCursor,
+)
+
+
+def _selectionMovementScriptHelper(
+	self, unit: str | None = None, direction: int | None = None, toPosition: str | None = None
+) -> None:
+	"""Helper function.
+	:param unit: movement unit
+	:param direction: direction to move
+	:param toPosition: position to move
+	In addition, to execution of original function, review position is stored
+	and restored when appropriate.
+	"""
+	if not settings.current.brailleActive:
+		# Original function
+		CursorManager._originalSelectionMovementScriptHelper(self, unit, direction, toPosition)
+		return
+	_selectionCache.invalidate()
+	reviewPosition: _Span = _Span(api.getReviewPosition())
+	oldSelection: _Span = _Span(self.selection)
+	# Original function
+	CursorManager._originalSelectionMovementScriptHelper(self, unit, direction, toPosition)
+	currentSelection: _Span = _Span(self.selection)
+	if oldSelection.sameRange(currentSelection):
+		_coalescer.setReviewPosition(reviewPosition)
+	if trace.recorder is not None:
+		trace.recorder.record(
+			_TraceRecorder.SELECTION_MOVEMENT, self, currentSelection, unit=unit, direction=direction
+		)
+
+
+def detectPossibleSelectionChange(self) -> None:
+	"""If selection has changed, change is spoken and displayed in braille."""
+	_selectionCache.invalidate()
+	# Original function
+	EditableText._detectPossibleSelectionChange(self)
+	if not settings.current.brailleActive:
+		return
+	# Selection change was not always updated to braille.
+	# Processing pending events seems to help.
+	region: ReviewTextInfoRegion | None = _regionRegistry.get(self)
+	if (
+		region is not None
+		and region._realSelection is not None
+		and eventHandler.isPendingEvents("caret", self)
+	):
+		_coalescer.processPendingEvents(self)
+
+
+def reportSelectionChange(self, oldTextInfo: textInfos.TextInfo) -> None:
+	"""Reports selection change.
+	:param oldTextInfo: selection before change
+	"""
+	_selectionCache.invalidate()
+	# Original function
+	EditableTextWithoutAutoSelectDetection._reportSelectionChange(self, oldTextInfo)
+	if not settings.current.brailleActive:
+		return
+	# Braille did not always update at least in word 2019 with IAccessible
+	if _getAppPolicy(self.appModule).forceCaretEvent and not eventHandler.isPendingEvents("caret", self):
+		region: ReviewTextInfoRegion | None = _regionRegistry.displayed()
+		if region is not None and region._realSelection is not None:
+			_coalescer.queueCaretEvent(self)
+
+
+def script_navigatorObject_toFocus(self, gesture: InputGesture) -> None:
+	_selectionCache.invalidate()
+	region: ReviewTextInfoRegion | None = _regionRegistry.displayed()
+	# Set region._realSelection to None to finally set correct review position
+	if region is not None and region._realSelection is not None:
+		region._realSelection = None
+	GlobalCommands._script_navigatorObject_toFocus(self, gesture)
+
+
+#: Value of class attributes which did not exist before patches were installed.
+_MISSING = object()
+#: Original class attributes, when patches are installed.
+_originalAttributes: dict[tuple[type | ModuleType, str], object] = {}
+
+
+def _patches() -> list[tuple[type | ModuleType, str, object]]:
+	"""Gets class variables which are added and replaced to get selection to be shown.
+	:return: list of (class or module, name, value)
+	"""
+	patches: list[tuple[type | ModuleType, str, object]] = [
+		(ReviewTextInfoRegion, "_realSelection", None),
+		(ReviewTextInfoRegion, "_selectionRanges", None),
+		(ReviewTextInfoRegion, "_collapsedSelection", None),
+		(ReviewTextInfoRegion, "_reviewPos", None),
+		(ReviewTextInfoRegion, "_fakeSelection", None),
+		(ReviewTextInfoRegion, "_readingUnitContainsSelectedCharacters", False),
+		(ReviewTextInfoRegion, "_clippedReadingUnitCache", None),
+		(ReviewTextInfoRegion, "_renderedReadingUnit", None),
+		(ReviewTextInfoRegion, "_routingIndex", None),
+		(ReviewTextInfoRegion, "_originalRouteToTextInfo", ReviewTextInfoRegion._routeToTextInfo),
+		(
+			ReviewTextInfoRegion,
+			"_routeToTextInfo",
+			_instrumented("_routeToTextInfoHelper", _routeToTextInfoHelper),
+		),
+		(
+			ReviewTextInfoRegion,
+			"_originalGetTextInfoForBraillePos",
+			ReviewTextInfoRegion.getTextInfoForBraillePos,
+		),
+		(ReviewTextInfoRegion, "getTextInfoForBraillePos", getTextInfoForBraillePos),
+		(ReviewTextInfoRegion, "_originalSetCursor", ReviewTextInfoRegion._setCursor),
+		(ReviewTextInfoRegion, "_setCursor", _setCursor),
+		(ReviewTextInfoRegion, "_selectionHelper", _instrumented("_selectionHelper", _selectionHelper)),
+		(
+			ReviewTextInfoRegion,
+			"_collapsedReviewPosition",
+			_instrumented("_collapsedReviewPosition", _collapsedReviewPosition),
+		),
+		(ReviewTextInfoRegion, "_clippedReadingUnit", _clippedReadingUnit),
+		(ReviewTextInfoRegion, "_virtualBufferSelectionHelper", _virtualBufferSelectionHelper),
+		(ReviewTextInfoRegion, "_getSelection", _getSelection),
+		(ReviewTextInfoRegion, "_reviewBrailleCursorPos", _reviewBrailleCursorPos),
+		(ReviewTextInfoRegion, "_storeRenderedReadingUnit", _storeRenderedReadingUnit),
+		(ReviewTextInfoRegion, "_updateSelectionMask", _updateSelectionMask),
+		(ReviewTextInfoRegion, "_applySelectionMask", _applySelectionMask),
+		(ReviewTextInfoRegion, "_render", _render),
+		(ReviewTextInfoRegion, "_updateRegion", _updateRegion),
+		(ReviewTextInfoRegion, "update", _instrumented("update", update)),
+		(braille.BrailleHandler, "_originalHandleReviewMove", braille.BrailleHandler.handleReviewMove),
+		(braille.BrailleHandler, "handleReviewMove", handleReviewMove),
+		(
+			CursorManager,
+			"_originalSelectionMovementScriptHelper",
+			CursorManager._selectionMovementScriptHelper,
+		),
+		(
+			CursorManager,
+			"_selectionMovementScriptHelper",
+			_instrumented("_selectionMovementScriptHelper", _selectionMovementScriptHelper),
+		),
+		(EditableText, "_detectPossibleSelectionChange", EditableText.detectPossibleSelectionChange),
+		(
+			EditableText,
+			"detectPossibleSelectionChange",
+			_instrumented("detectPossibleSelectionChange", detectPossibleSelectionChange),
+		),
+		(
+			EditableTextWithoutAutoSelectDetection,
+			"_reportSelectionChange",
+			EditableTextWithoutAutoSelectDetection.reportSelectionChange,
+		),
+		(
+			EditableTextWithoutAutoSelectDetection,
+			"reportSelectionChange",
+			_instrumented("reportSelectionChange", reportSelectionChange),
+		),
+		(
+			GlobalCommands,
+			"_script_navigatorObject_toFocus",
+			GlobalCommands.script_navigatorObject_toFocus,
+		),
+		(
+			GlobalCommands,
+			"script_navigatorObject_toFocus",
+			_instrumented("script_navigatorObject_toFocus", script_navigatorObject_toFocus),
+		),
+	]
+	if translation.cache is not None:
+		patches.append((_regionModule(), "louisHelper", translation.cache))
+	return patches
+
+
+def _installPatches() -> None:
+	"""Adds and replaces class variables to get selection to be shown."""
+	regionModule = _regionModule()
+	size: int = config.conf["showSelection"]["translationCacheSize"]
+	if size and regionModule is not None:
+		translation.cache = _TranslationCache(regionModule.louisHelper, size)
+	for cls, name, value in _patches():
+		_originalAttributes[(cls, name)] = cls.__dict__.get(name, _MISSING)
+		setattr(cls, name, value)
+	globalCommands.commands = globalCommands.GlobalCommands()
+
+
+def _removePatches() -> None:
+	"""Restores class variables which were added and replaced."""
+	for (cls, name), value in reversed(_originalAttributes.items()):
+		if value is _MISSING:
+			delattr(cls, name)
+		else:
+			setattr(cls, name, value)
+	_originalAttributes.clear()
+	translation.cache = None
+	_selectionCache.invalidate(discardLastKnown=True)
+	_coalescer.cancel()
+	_summarizer.invalidate()
+	_prefetcher.cancel()
+	_snapshotCache.clear()
+	_fetcher.stop()
+	globalCommands.commands = globalCommands.GlobalCommands()
+
+
+def _updatePatches() -> None:
+	"""Installs patches when braille is enabled, it can be tethered to review
+	and it is not in speech output mode, and removes them otherwise.
+	"""
+	install: bool = settings.current.brailleActive and settings.current.tetheredToReview
+	if install and not _originalAttributes:
+		_installPatches()
+	elif not install and _originalAttributes:
+		_removePatches()
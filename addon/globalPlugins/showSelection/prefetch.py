@@ -0,0 +1,178 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Preparing previous and next reading units in advance."""
+
+import textInfos
+import core
+import _ctypes
+import weakref
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from logHandler import log
+from textInfos.offsets import (
+	OffsetsTextInfo,
+)
+
+from .registry import (
+	_regionRegistry,
+)
+from .rendered import (
+	_RenderedReadingUnit,
+)
+from .clipped import (
+	_clippedToFirstRange,
+	_ClippedReadingUnit,
+)
+
+
+class _Prefetcher:
+	"""Prepares previous and next reading units when review cursor is within
+	selection, so that moving line by line through selection shows them
+	without calls to provider and braille translation.
+	Reading units are clipped to selection and rendered to region which is not
+	shown, when NVDA is idle. Prepared reading units are discarded when
+	selection or caret changes.
+	"""
+
+	#: Milliseconds after update when reading units are prepared.
+	DELAY: int = 100
+	#: Maximum number of prepared reading units.
+	MAX_ENTRIES: int = 4
+	#: Maximum total length of prepared reading units.
+	MAX_CHARACTERS: int = 50000
+
+	def __init__(self):
+		self._region: weakref.ref | None = None
+		#: Incremented when preparing is scheduled or cancelled, so that
+		#: outdated scheduled calls do nothing.
+		self._token: int = 0
+		self._entries: list[tuple[_ClippedReadingUnit, _RenderedReadingUnit]] = []
+		self._characters: int = 0
+		self.hits: int = 0
+		self.prepared: int = 0
+
+	def schedule(self, region: ReviewTextInfoRegion) -> None:
+		"""Schedules preparing of reading units next to review position.
+		:param region: region whose review position is within selection
+		"""
+		self._region = weakref.ref(region)
+		self._token += 1
+		core.callLater(self.DELAY, self._prefetch, self._token)
+
+	def cancel(self) -> None:
+		"""Cancels preparing and discards prepared reading units."""
+		self._region = None
+		self._token += 1
+		self._entries.clear()
+		self._characters = 0
+
+	def take(
+		self,
+		region: ReviewTextInfoRegion,
+		selection: textInfos.TextInfo,
+		unit: str,
+		reviewPos: textInfos.TextInfo,
+	) -> bool:
+		"""Gives prepared reading unit containing review position to region.
+		:param region: region which is updated
+		:param selection: current selection
+		:param unit: current reading unit
+		:param reviewPos: current review position
+		:return: True if prepared reading unit was found
+		"""
+		for index, (clipped, rendered) in enumerate(self._entries):
+			if clipped.matches(selection, unit, reviewPos):
+				del self._entries[index]
+				self._characters -= len(rendered.text)
+				# Current reading unit is kept, so that moving back is fast too.
+				if region._clippedReadingUnitCache is not None and region._renderedReadingUnit is not None:
+					self._store(region._clippedReadingUnitCache, region._renderedReadingUnit)
+				region._clippedReadingUnitCache = clipped
+				region._renderedReadingUnit = rendered
+				self.hits += 1
+				return True
+		return False
+
+	def report(self) -> str:
+		"""Creates report of prefetching.
+		:return: report as text
+		"""
+		return (
+			f"Prefetch: {len(self._entries)} reading units, {self._characters} characters, "
+			f"prepared {self.prepared}, used {self.hits}"
+		)
+
+	def _store(self, clipped: _ClippedReadingUnit, rendered: _RenderedReadingUnit) -> None:
+		self._entries.append((clipped, rendered))
+		self._characters += len(rendered.text)
+		while len(self._entries) > self.MAX_ENTRIES or self._characters > self.MAX_CHARACTERS:
+			self._characters -= len(self._entries.pop(0)[1].text)
+
+	def _isPrepared(self, readingUnit: OffsetsTextInfo) -> bool:
+		return any(
+			clipped.readingUnit._startOffset == readingUnit._startOffset
+			and clipped.readingUnit._endOffset == readingUnit._endOffset
+			for clipped, _rendered in self._entries
+		)
+
+	def _prefetch(self, token: int) -> None:
+		region: ReviewTextInfoRegion | None = self._region() if self._region is not None else None
+		if token != self._token or region is None or _regionRegistry.displayed() is not region:
+			return
+		current: _ClippedReadingUnit | None = region._clippedReadingUnitCache
+		if (
+			not region._readingUnitContainsSelectedCharacters
+			or current is None
+			or not isinstance(current.readingUnit, OffsetsTextInfo)
+		):
+			return
+		try:
+			for direction in (1, -1):
+				self._prefetchNeighbour(region, current, direction)
+		except (LookupError, RuntimeError, _ctypes.COMError):
+			log.debugWarning("Cannot prefetch reading unit", exc_info=True)
+
+	def _prefetchNeighbour(
+		self,
+		region: ReviewTextInfoRegion,
+		current: _ClippedReadingUnit,
+		direction: int,
+	) -> None:
+		reviewPos: textInfos.TextInfo = current.readingUnit.copy()
+		reviewPos.collapse()
+		if not reviewPos.move(current.unit, direction):
+			return
+		readingUnit: textInfos.TextInfo = reviewPos.copy()
+		readingUnit.expand(current.unit)
+		selection: textInfos.TextInfo = current.selection
+		if (
+			self._isPrepared(readingUnit)
+			or readingUnit._endOffset - readingUnit._startOffset > self.MAX_CHARACTERS
+			# Reading unit is outside of selection.
+			or readingUnit.start >= selection.end
+			or readingUnit.end <= selection.start
+		):
+			return
+		clipped: textInfos.TextInfo = readingUnit.copy()
+		if clipped.start < selection.start:
+			clipped.start = selection.start
+		if clipped.end > selection.end:
+			clipped.end = selection.end
+		if region._selectionRanges is not None and _clippedToFirstRange(clipped, region._selectionRanges) is None:
+			return
+		shadow: ReviewTextInfoRegion = ReviewTextInfoRegion(region.obj)
+		shadow._render(clipped.copy())
+		if not isinstance(shadow._readingInfo, OffsetsTextInfo) or shadow.brailleSelectionStart is None:
+			return
+		self._store(
+			_ClippedReadingUnit(selection, current.unit, reviewPos.bookmark, readingUnit.copy(), clipped),
+			_RenderedReadingUnit(shadow, shadow._readingInfo),
+		)
+		self.prepared += 1
+
+
+_prefetcher = _Prefetcher()
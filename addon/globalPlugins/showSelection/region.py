@@ -0,0 +1,554 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Hooks of braille regions which show selection and route within it."""
+
+import api
+import textInfos
+import UIAHandler
+import _ctypes
+import bisect
+import time
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from NVDAObjects import NVDAObject
+from NVDAObjects.UIA import (
+	UIATextInfo,
+)
+from textInfos.offsets import (
+	Offsets,
+	OffsetsTextInfo,
+)
+from treeInterceptorHandler import DocumentTreeInterceptor
+from virtualBuffers import VirtualBuffer
+
+from . import (
+	settings,
+	instrumentation,
+	strategy,
+	trace,
+)
+from .spans import (
+	_Span,
+	_SelectionRanges,
+)
+from .strategy import (
+	_ReviewUpdate,
+	_getAppPolicy,
+)
+from .selection import (
+	_selectionCache,
+)
+from .trace import (
+	_TraceRecorder,
+)
+from .coalescer import (
+	_coalescer,
+)
+from .summary import (
+	_summarizer,
+)
+from .windows import (
+	_windowed,
+	_unwindowed,
+)
+from .registry import (
+	_regionRegistry,
+)
+from .rendered import (
+	_RenderedReadingUnit,
+	_RoutingIndex,
+)
+from .clipped import (
+	_clippedToFirstRange,
+	_ClippedReadingUnit,
+)
+from .prefetch import (
+	_prefetcher,
+)
+from .snapshots import (
+	_snapshotCache,
+)
+
+
+def _selectionHelper(self) -> textInfos.TextInfo:
+	"""Helper function for _getSelection function.
+	:return: may vary between real selection, part of real selection and
+	review position (when there is no selection or review position is
+	outside of selection).
+	"""
+	if isinstance(self.obj, VirtualBuffer) and not self.obj.passThrough:
+		position: textInfos.TextInfo = api.getReviewPosition()
+		if isinstance(position, OffsetsTextInfo) and position.obj is self.obj:
+			return self._virtualBufferSelectionHelper(position)
+	try:
+		info: textInfos.TextInfo = _selectionCache.get(self.obj)
+	except (LookupError, RuntimeError, _ctypes.COMError):
+		self._realSelection = self._reviewPos = None
+		return self._collapsedReviewPosition()
+	# Cursor, checked once for cached selection
+	if info is self._collapsedSelection or (
+		(self._realSelection is None or self._realSelection._info is not info) and info.isCollapsed
+	):
+		self._realSelection = self._reviewPos = None
+		self._collapsedSelection = info
+		return self._collapsedReviewPosition()
+	self._collapsedSelection = None
+	ranges: _SelectionRanges | None = (
+		_selectionCache.ranges(self.obj, info) if isinstance(info, OffsetsTextInfo) else None
+	)
+	# Selection changed
+	selection: _Span = _Span(info)
+	if (
+		self._realSelection is None
+		or not self._realSelection.sameRange(selection)
+		or (ranges is not self._selectionRanges and ranges != self._selectionRanges)
+	):
+		self._realSelection = selection
+		self._selectionRanges = ranges
+		_summarizer.cancel()
+		_prefetcher.cancel()
+		# Update also review position if review follows caret
+		if settings.current.followCaret:
+			if instrumentation.current is not None:
+				instrumentation.current.countProviderCall("copy")
+			reviewPos: textInfos.TextInfo = info.copy()
+			if self.obj.isTextSelectionAnchoredAtStart:
+				# The end of the range is exclusive, so make it inclusive first.
+				reviewPos.move(textInfos.UNIT_CHARACTER, -1, "end")
+			# Collapse the selection to the unanchored end which is also review position.
+			reviewPos.collapse(end=self.obj.isTextSelectionAnchoredAtStart)
+			self._reviewPos = _Span(reviewPos)
+			if strategy.learner is not None and isinstance(self.obj, NVDAObject):
+				strategy.learner.selectionChanged(self.obj)
+			# Block browse mode because there is no caret event.
+			# Update review position for browse mode and applications where
+			# caret event cannot be relied on.
+			if (
+				isinstance(self.obj, DocumentTreeInterceptor) and not self.obj.passThrough
+			) or _getAppPolicy(self.obj.appModule).reviewUpdate == _ReviewUpdate.QUEUED_REVIEW_POSITION:
+				_coalescer.setReviewPosition(self._reviewPos)
+			else:
+				_coalescer.queueCaretEvent(self.obj)
+			return info
+	# Selection unchanged or review does not follow caret
+	if ranges is not None:
+		# Reading unit is clipped to all ranges, and then to first range
+		# within it, so that other ranges can be shown with selection mask.
+		info = type(info)(self.obj, Offsets(ranges.start, ranges.end))
+	readingInfo: textInfos.TextInfo | None = self._clippedReadingUnit(info)
+	if readingInfo is not None and ranges is not None:
+		readingInfo = _clippedToFirstRange(readingInfo, ranges)
+	# Reading unit containing review position is outside of selection
+	if readingInfo is None:
+		return self._collapsedReviewPosition()
+	self._readingUnitContainsSelectedCharacters = True
+	return readingInfo
+
+
+def _clippedReadingUnit(self, selection: textInfos.TextInfo) -> textInfos.TextInfo | None:
+	"""Gets reading unit containing review position clipped to selection.
+	Result is cached so that reading unit is not expanded again when review
+	position moves within same reading unit and selection is unchanged.
+	:param selection: current selection
+	:return: reading unit which contains selected characters clipped to
+	selection, or None if reading unit is outside of selection
+	"""
+	unit: str = self._getReadingUnit()
+	reviewPos: textInfos.TextInfo = self._collapsedReviewPosition()
+	cached: _ClippedReadingUnit | None = self._clippedReadingUnitCache
+	if (cached is not None and cached.matches(selection, unit, reviewPos)) or (
+		_prefetcher.take(self, selection, unit, reviewPos)
+	):
+		cached = self._clippedReadingUnitCache
+		return cached.clipped.copy() if cached.clipped is not None else None
+	if instrumentation.current is not None:
+		instrumentation.current.countProviderCall("expand")
+	readingInfo: textInfos.TextInfo = _windowed(reviewPos.copy())
+	readingInfo.expand(unit)
+	readingUnit: textInfos.TextInfo = readingInfo.copy()
+	# Reading unit containing review position is outside of selection
+	if readingInfo.start > selection.end or readingInfo.end < selection.start:
+		clipped: textInfos.TextInfo | None = None
+	# Reading unit contains selected characters but all characters are not
+	# necessarily selected
+	else:
+		if readingInfo.start < selection.start:
+			readingInfo.start = selection.start
+		if readingInfo.end > selection.end:
+			readingInfo.end = selection.end
+		clipped = readingInfo
+	# Review position is compared with reading unit for UIA, and getting its
+	# bookmark would be a call to provider.
+	reviewBookmark: textInfos.Bookmark | None = (
+		None if isinstance(reviewPos, UIATextInfo) else reviewPos.bookmark
+	)
+	self._clippedReadingUnitCache = _ClippedReadingUnit(
+		selection, unit, reviewBookmark, readingUnit, clipped
+	)
+	return clipped.copy() if clipped is not None else None
+
+
+def _virtualBufferSelectionHelper(self, reviewPos: OffsetsTextInfo) -> textInfos.TextInfo:
+	"""Helper function for _selectionHelper function in browse mode of virtual
+	buffer. Virtual buffers report offsets, so selection, reading unit and
+	review position are handled as integers. Offsets are queried from buffer
+	with one text info; reading unit is queried only when review position has
+	moved outside of reading unit which is already known.
+	:param reviewPos: review position within virtual buffer
+	:return: may vary between real selection, part of real selection and
+	review position (when there is no selection or review position is
+	outside of selection).
+	"""
+	obj: VirtualBuffer = self.obj
+	infoClass: type[OffsetsTextInfo] = obj.TextInfo
+	reviewOffset: int = reviewPos._startOffset
+	collapsed: OffsetsTextInfo = infoClass(obj, Offsets(reviewOffset, reviewOffset))
+	probe: OffsetsTextInfo = _windowed(infoClass(obj, Offsets(reviewOffset, reviewOffset)))
+	if instrumentation.current is not None:
+		instrumentation.current.countProviderCall("selectionOffsets")
+	try:
+		start, end = probe._getSelectionOffsets()
+	except (LookupError, RuntimeError, _ctypes.COMError):
+		self._realSelection = self._reviewPos = None
+		return collapsed
+	# Cursor
+	if start == end:
+		self._realSelection = self._reviewPos = None
+		return collapsed
+	selection: OffsetsTextInfo = infoClass(obj, Offsets(start, end))
+	# Selection changed
+	span: _Span = _Span(selection)
+	if self._realSelection is None or not self._realSelection.sameRange(span):
+		self._realSelection = span
+		_summarizer.cancel()
+		_prefetcher.cancel()
+		if settings.current.followCaret:
+			if obj.isTextSelectionAnchoredAtStart:
+				# The end of the range is exclusive, so review position is at
+				# start of last selected character.
+				caretOffset: int = probe._getUnitOffsets(textInfos.UNIT_CHARACTER, end - 1)[0]
+			else:
+				caretOffset = start
+			self._reviewPos = _Span(infoClass(obj, Offsets(caretOffset, caretOffset)))
+			# Block browse mode because there is no caret event.
+			_coalescer.setReviewPosition(self._reviewPos)
+			return selection
+	# Selection unchanged or review does not follow caret
+	unit: str = self._getReadingUnit()
+	cached: _ClippedReadingUnit | None = self._clippedReadingUnitCache
+	if (cached is not None and cached.matches(selection, unit, collapsed)) or (
+		_prefetcher.take(self, selection, unit, collapsed)
+	):
+		cached = self._clippedReadingUnitCache
+		readingInfo: textInfos.TextInfo | None = cached.clipped.copy() if cached.clipped is not None else None
+	else:
+		# Reading unit is known when only selection has changed.
+		if (
+			cached is not None
+			and cached.unit == unit
+			and isinstance(cached.readingUnit, OffsetsTextInfo)
+			and cached.readingUnit._startOffset <= reviewOffset < cached.readingUnit._endOffset
+		):
+			unitStart, unitEnd = cached.readingUnit._startOffset, cached.readingUnit._endOffset
+		else:
+			if instrumentation.current is not None:
+				instrumentation.current.countProviderCall("unitOffsets")
+			unitStart, unitEnd = probe._getUnitOffsets(unit, reviewOffset)
+		readingUnit: OffsetsTextInfo = type(probe)(obj, Offsets(unitStart, unitEnd))
+		# Reading unit containing review position is outside of selection
+		if unitStart > end or unitEnd < start:
+			clipped: OffsetsTextInfo | None = None
+		else:
+			clipped = type(probe)(obj, Offsets(max(unitStart, start), min(unitEnd, end)))
+		self._clippedReadingUnitCache = _ClippedReadingUnit(
+			selection, unit, collapsed.bookmark, readingUnit, clipped
+		)
+		readingInfo = clipped.copy() if clipped is not None else None
+	# Reading unit containing review position is outside of selection
+	if readingInfo is None:
+		return collapsed
+	self._readingUnitContainsSelectedCharacters = True
+	return readingInfo
+
+
+def _getSelection(self) -> textInfos.TextInfo:
+	"""Gets selection for use in update function.
+	:return: if _fakeSelection is not None, it is returned. This makes possible
+	to pretend that there is no selection (needed in update function).
+	Logic which defines what to return, when _fakeSelection is None, is in
+	_selectionHelper function. Lines and paragraphs are split into windows
+	when they are longer than configured.
+	"""
+	if self._fakeSelection is not None:
+		return _windowed(self._fakeSelection)
+	return _windowed(self._selectionHelper())
+
+
+def _collapsedReviewPosition(self) -> textInfos.TextInfo:
+	"""Gets collapsed review position.
+	:return: collapsed review position
+	"""
+	if instrumentation.current is not None:
+		instrumentation.current.countProviderCall("copy")
+	info: textInfos.TextInfo = api.getReviewPosition().copy()
+	# Info should be collapsed, but it is not always, at least when
+	# switching from focus mode to browse mode.
+	if not info.isCollapsed:
+		info.collapse()
+	return info
+
+
+def _uiaContentPos(readingInfo: UIATextInfo, reviewPos: UIATextInfo) -> int | None:
+	"""Gets number of characters from start of reading unit to review position.
+	Text ranges are used directly, so that position is obtained with one text
+	query instead of rendering reading unit again.
+	:param readingInfo: rendered reading unit
+	:param reviewPos: review position
+	:return: number of characters, or None if review position is before
+	reading unit or text ranges cannot be used
+	"""
+	start: int = UIAHandler.TextPatternRangeEndpoint_Start
+	if instrumentation.current is not None:
+		instrumentation.current.countProviderCall("text")
+	try:
+		if reviewPos._rangeObj.CompareEndpoints(start, readingInfo._rangeObj, start) < 0:
+			return None
+		textRange = readingInfo._rangeObj.Clone()
+		textRange.MoveEndpointByRange(UIAHandler.TextPatternRangeEndpoint_End, reviewPos._rangeObj, start)
+		return len(textRange.GetText(-1))
+	except (AttributeError, _ctypes.COMError):
+		return None
+
+
+def _reviewBrailleCursorPos(self) -> int | None:
+	"""Gets braille position of review cursor in rendered reading unit.
+	Position is calculated from offsets of rendered reading unit, or from text
+	before review position for UIA, so that region does not need to be rendered
+	again with collapsed review position.
+	:return: braille position of review cursor, or None if it cannot be
+	calculated
+	"""
+	readingInfo: textInfos.TextInfo | None = getattr(self, "_readingInfo", None)
+	reviewPos: textInfos.TextInfo = api.getReviewPosition()
+	rendered: _RenderedReadingUnit | None = self._renderedReadingUnit
+	if isinstance(readingInfo, OffsetsTextInfo) and isinstance(reviewPos, OffsetsTextInfo):
+		# Offsets need not be characters, so they are converted with text of
+		# rendered reading unit.
+		if rendered is None or self.brailleCells is not rendered.cells:
+			return None
+		contentPos: int | None = rendered.contentPos(reviewPos._startOffset)
+	elif isinstance(readingInfo, UIATextInfo) and isinstance(reviewPos, UIATextInfo):
+		contentPos = _uiaContentPos(readingInfo, reviewPos)
+	else:
+		return None
+	if contentPos is None or contentPos < 0 or not self.brailleCells:
+		return None
+	rawPos: int = bisect.bisect_left(self._rawToContentPos, contentPos)
+	if rawPos >= len(self.rawToBraillePos):
+		return len(self.brailleCells) - 1
+	return self.rawToBraillePos[rawPos]
+
+
+def update(self) -> None:
+	"""Updates this region, and records update when trace is recorded."""
+	_regionRegistry.register(self)
+	if trace.recorder is None:
+		self._updateRegion()
+		return
+	start: float = time.perf_counter()
+	self._updateRegion()
+	trace.recorder.record(_TraceRecorder.UPDATE, self.obj, self._realSelection, time.perf_counter() - start)
+
+
+def _updateRegion(self) -> None:
+	"""Updates this region.
+	Within selection region is rendered once with selection, and braille
+	position of review cursor is calculated from offsets or UIA text ranges.
+	With other text infos region is rendered also with collapsed review
+	position to get braille position of review cursor.
+	"""
+	self._fakeSelection = None
+	self._routingIndex = None
+	self._readingUnitContainsSelectedCharacters = False
+	# Document got focus again, and its selection view is known
+	if _snapshotCache.restore(self):
+		return
+	fakeSelection: textInfos.TextInfo = self._getSelection()
+	# Selection changed, outside of selection or no selection
+	if not self._readingUnitContainsSelectedCharacters:
+		self._render(None)
+		return
+	# Within selection
+	if not settings.current.showSelection:
+		self._render(self._collapsedReviewPosition())
+		self.brailleSelectionStart = self.brailleSelectionEnd = None
+		return
+	brailleCursorPos: int | None = None
+	if not isinstance(fakeSelection, (OffsetsTextInfo, UIATextInfo)):
+		# Get braille cursor position so that braille can be scrolled correctly.
+		# It is obtained when parent class update function detects cursor.
+		# If it detects selection brailleCursorPos is None.
+		self._render(self._collapsedReviewPosition())
+		brailleCursorPos = self.brailleCursorPos
+	# Only selection changed within reading unit rendered earlier
+	if not self._updateSelectionMask(fakeSelection):
+		# Update region with selection
+		self._render(fakeSelection)
+		if self.brailleCursorPos is None:
+			self._storeRenderedReadingUnit()
+			if self._selectionRanges is not None and self._renderedReadingUnit is not None:
+				# Region is rendered with first range, and other ranges are
+				# shown with selection mask.
+				self._applySelectionMask(self._renderedReadingUnit, fakeSelection)
+	# Update succeeded
+	if self.brailleCursorPos is None:
+		if brailleCursorPos is None:
+			brailleCursorPos = self._reviewBrailleCursorPos()
+		if brailleCursorPos is None and (
+			isinstance(fakeSelection, UIATextInfo)
+			or (isinstance(fakeSelection, OffsetsTextInfo) and self._renderedReadingUnit is None)
+		):
+			# Text ranges or offsets could not be used, so render also with
+			# collapsed review position to get braille cursor position.
+			self._render(self._collapsedReviewPosition())
+			brailleCursorPos = self.brailleCursorPos
+			self._render(fakeSelection)
+		if brailleCursorPos is None:
+			brailleCursorPos = self.brailleSelectionStart or 0
+		# brailleSelectionStart and brailleSelectionEnd are set here to define
+		# appropriate braille display scrolling when moving to reading unit
+		# which contains one or more selected characters.
+		# They are then used in braille.BrailleHandler.scrollToCursorOrSelection
+		# function for this.
+		scrollPos: int = min(brailleCursorPos, len(self.brailleCells) - 1)
+		self.brailleSelectionStart = scrollPos
+		self.brailleSelectionEnd = scrollPos + 1
+		rendered: _RenderedReadingUnit | None = self._renderedReadingUnit
+		reviewPos: textInfos.TextInfo = api.getReviewPosition()
+		if rendered is not None and self.brailleCells is rendered.cells and isinstance(reviewPos, OffsetsTextInfo):
+			self._routingIndex = _RoutingIndex.create(rendered, type(self._readingInfo), reviewPos._startOffset)
+		if settings.current.prefetch:
+			_prefetcher.schedule(self)
+	# Failed to detect selection, revert to review position
+	else:
+		self._render(self._collapsedReviewPosition())
+
+
+def _storeRenderedReadingUnit(self) -> None:
+	"""Stores reading unit which was rendered with selection."""
+	readingUnit: textInfos.TextInfo | None = getattr(self, "_readingInfo", None)
+	if (
+		not isinstance(readingUnit, OffsetsTextInfo)
+		or self.brailleSelectionStart is None
+		or self.brailleSelectionEnd is None
+	):
+		self._renderedReadingUnit = None
+		return
+	try:
+		self._renderedReadingUnit = _RenderedReadingUnit(self, readingUnit)
+	except LookupError:
+		# Offsets cannot be converted to characters.
+		self._renderedReadingUnit = None
+
+
+def _updateSelectionMask(self, selection: textInfos.TextInfo) -> bool:
+	"""Updates only selection when text of reading unit is unchanged.
+	:param selection: reading unit clipped to selection
+	:return: True if region was updated, False if it has to be rendered
+	"""
+	rendered: _RenderedReadingUnit | None = self._renderedReadingUnit
+	cached: _ClippedReadingUnit | None = self._clippedReadingUnitCache
+	if (
+		rendered is None
+		or cached is None
+		or not isinstance(selection, OffsetsTextInfo)
+		or not isinstance(cached.readingUnit, OffsetsTextInfo)
+		or not rendered.matches(cached.readingUnit)
+	):
+		return False
+	return self._applySelectionMask(rendered, selection)
+
+
+def _applySelectionMask(self, rendered: _RenderedReadingUnit, selection: OffsetsTextInfo) -> bool:
+	"""Shows selection in rendered reading unit by updating selection mask.
+	With multiple selection all ranges within reading unit are shown.
+	:param rendered: rendered reading unit containing selection
+	:param selection: reading unit clipped to selection
+	:return: True if region was updated, False if it has to be rendered
+	"""
+	rawText: str = rendered.state["rawText"]
+	rawToContentPos: list[int] = rendered.state["_rawToContentPos"]
+	rawToBraillePos: list[int] = rendered.state["rawToBraillePos"]
+	ranges: list[tuple[int, int]] = (
+		[(selection._startOffset, selection._endOffset)]
+		if self._selectionRanges is None
+		else self._selectionRanges.intersecting(rendered.startOffset, rendered.endOffset)
+	)
+	rawSpans: list[tuple[int, int]] = []
+	spans: list[tuple[int, int]] = []
+	for startOffset, endOffset in ranges:
+		selectionStart: int = bisect.bisect_left(rawToContentPos, rendered.contentPos(startOffset))
+		selectionEnd: int = bisect.bisect_left(rawToContentPos, rendered.contentPos(endOffset))
+		if selectionStart >= len(rawToBraillePos):
+			break
+		start: int = rawToBraillePos[selectionStart]
+		end: int = len(rendered.cells) if selectionEnd >= len(rawText) else rawToBraillePos[selectionEnd]
+		rawSpans.append((selectionStart, selectionEnd))
+		# Ranges may share cell when it is contraction.
+		if spans and start <= spans[-1][1]:
+			spans[-1] = (spans[-1][0], max(end, spans[-1][1]))
+		else:
+			spans.append((start, end))
+	if not spans or not rendered.updateMask(spans):
+		return False
+	for name, value in rendered.state.items():
+		setattr(self, name, value)
+	self.brailleCells = rendered.cells
+	self.selectionStart, self.selectionEnd = rawSpans[0][0], rawSpans[-1][1]
+	self.brailleSelectionStart, self.brailleSelectionEnd = spans[0][0], spans[-1][1]
+	return True
+
+
+def _routeToTextInfoHelper(self, info: textInfos.TextInfo) -> None:
+	"""Helper function.
+	:param info: position where cursor should be moved
+	When within selection, function activates position with second press,
+	if routing does not move caret.
+	Then original function is executed.
+	"""
+	index: _RoutingIndex | None = self._routingIndex
+	if index is not None and index.isShown(self):
+		isReviewCursor: bool = index.isReviewCursor(info)
+	else:
+		isReviewCursor = (
+			self._readingUnitContainsSelectedCharacters and info.start == api.getReviewPosition().start
+		)
+	if isReviewCursor and not settings.current.routingMovesCaret:
+		info.activate()
+	ReviewTextInfoRegion._originalRouteToTextInfo(self, _unwindowed(info))
+
+
+def getTextInfoForBraillePos(self, braillePos: int) -> textInfos.TextInfo:
+	"""Gets text info at braille position.
+	Within selection it is looked up from routing index, otherwise it is moved
+	from start of reading unit as NVDA does.
+	:param braillePos: braille position
+	:return: collapsed text info, which is not split into windows
+	"""
+	index: _RoutingIndex | None = self._routingIndex
+	if index is not None and index.isShown(self):
+		info: OffsetsTextInfo | None = index.textInfo(self, braillePos)
+		if info is not None:
+			return info
+	return _unwindowed(ReviewTextInfoRegion._originalGetTextInfoForBraillePos(self, braillePos))
+
+
+def _setCursor(self, info: textInfos.TextInfo) -> None:
+	"""Moves review position, for example to next or previous line.
+	:param info: new review position
+	"""
+	ReviewTextInfoRegion._originalSetCursor(self, _unwindowed(info))
@@ -0,0 +1,97 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Registry of braille regions which show selection."""
+
+import braille
+import weakref
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from NVDAObjects import NVDAObject
+
+from .selection import (
+	_selectionCache,
+)
+from .summary import (
+	_summarizer,
+)
+
+
+class _RegionRegistry:
+	"""Weak registry of review regions. Regions are registered when they are
+	updated, and they are dropped when NVDA releases them, so that registry
+	does not keep them or text infos stored on them alive. Region of object is
+	looked up from braille buffer, so registry is only used to release caches
+	of regions and to report them.
+	"""
+
+	#: Attributes of region which store text infos only to avoid calls to provider.
+	CACHE_ATTRIBUTES: tuple[str, ...] = (
+		"_fakeSelection",
+		"_collapsedSelection",
+		"_clippedReadingUnitCache",
+		"_renderedReadingUnit",
+		"_routingIndex",
+	)
+
+	def __init__(self):
+		self._regions: weakref.WeakSet[ReviewTextInfoRegion] = weakref.WeakSet()
+
+	def register(self, region: ReviewTextInfoRegion) -> None:
+		"""Registers region.
+		:param region: region which is updated
+		"""
+		self._regions.add(region)
+
+	def displayed(self) -> ReviewTextInfoRegion | None:
+		"""Gets review region which is shown in braille.
+		:return: region, or None if review region is not shown
+		"""
+		regions: list = braille.handler.mainBuffer.regions
+		region = regions[-1] if regions else None
+		return region if isinstance(region, ReviewTextInfoRegion) else None
+
+	def get(self, obj: NVDAObject) -> ReviewTextInfoRegion | None:
+		"""Gets review region of object which is shown in braille.
+		:param obj: object
+		:return: region, or None if review region of object is not shown
+		"""
+		region: ReviewTextInfoRegion | None = self.displayed()
+		if region is None or (region.obj is not obj and region.obj != obj):
+			return None
+		return region
+
+	def release(self, obj: NVDAObject) -> None:
+		"""Releases cached text infos of regions of other objects, for example
+		when focus moves to object.
+		:param obj: object whose region keeps its caches
+		"""
+		for region in list(self._regions):
+			if region.obj is not obj:
+				for name in self.CACHE_ATTRIBUTES:
+					if name in region.__dict__:
+						delattr(region, name)
+
+	def report(self) -> str:
+		"""Creates report of memory retained by add-on.
+		:return: report as text
+		"""
+		regions: list[ReviewTextInfoRegion] = list(self._regions)
+		textInfoCount: int = sum(
+			getattr(region, name) is not None
+			for region in regions
+			for name in ("_realSelection", "_reviewPos") + self.CACHE_ATTRIBUTES
+		)
+		textInfoCount += _selectionCache._lastKnownSelection is not None
+		textInfoCount += _selectionCache._fetchedRanges is not None
+		cellCount: int = sum(len(region.brailleCells) for region in regions)
+		return (
+			f"Retained: {len(regions)} review regions, {textInfoCount} stored selections and caches, "
+			f"{cellCount} braille cells, {len(_summarizer._cache)} selection statistics"
+		)
+
+
+_regionRegistry = _RegionRegistry()
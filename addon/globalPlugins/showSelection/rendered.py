@@ -0,0 +1,248 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Reading units as rendered, and mapping of braille positions to offsets."""
+
+import braille
+import textInfos
+import bisect
+import codecs
+import itertools
+import re
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from textInfos.offsets import (
+	Offsets,
+	OffsetsTextInfo,
+)
+from typing import (
+	Callable,
+	Iterable,
+)
+
+from .windows import (
+	_WindowedTextInfo,
+)
+
+
+def _selectionShape() -> int:
+	"""Gets dots which are used to show selection.
+	:return: selection shape
+	"""
+	shape: int | Callable[[], int] = getattr(braille, "SELECTION_SHAPE", 0xC0)
+	return shape() if callable(shape) else shape
+
+
+#: Characters which take two code units in UTF-16.
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def _characterOffsets(info: OffsetsTextInfo, text: str) -> list[int] | None:
+	"""Gets offsets of characters of text relative to start of text info.
+	Offsets are counted in code units of encoding of text info, for example in
+	UTF-16 code units for IAccessible2 and virtual buffers and in bytes for
+	Scintilla with UTF-8.
+	:param info: text info whose text is given
+	:param text: text of info
+	:return: offset of each character and of end of text, or None if every
+	character is one offset
+	:raise LookupError: if encoding is not known
+	"""
+	encoding: str | None = getattr(info, "encoding", None)
+	if encoding is None or text.isascii():
+		return None
+	if codecs.lookup(encoding).name == "utf-16-le":
+		if _ASTRAL.search(text) is None:
+			return None
+		widths: Iterable[int] = (2 if ord(character) > 0xFFFF else 1 for character in text)
+	else:
+		widths = (len(character.encode(encoding, errors="replace")) for character in text)
+	return list(itertools.accumulate(widths, initial=0))
+
+
+class _RenderedReadingUnit:
+	"""Reading unit rendered with selection.
+	When only selection changes within reading unit, its text and braille
+	translation are reused and only cells whose selection state changes are
+	updated.
+	"""
+
+	#: Region attributes which are set when region is rendered.
+	RENDERED_ATTRIBUTES: tuple[str, ...] = (
+		"rawText",
+		"rawTextTypeforms",
+		"cursorPos",
+		"brailleToRawPos",
+		"rawToBraillePos",
+		"brailleCursorPos",
+		"_rawToContentPos",
+		"_readingInfo",
+	)
+
+	__slots__ = (
+		"startOffset",
+		"endOffset",
+		"text",
+		"table",
+		"state",
+		"cells",
+		"unmaskedCells",
+		"spans",
+		"characterOffsets",
+		"offsets",
+	)
+
+	def __init__(self, region: ReviewTextInfoRegion, readingUnit: OffsetsTextInfo):
+		self.startOffset: int = readingUnit._startOffset
+		self.endOffset: int = readingUnit._endOffset
+		self.text: str = readingUnit.text
+		self.table: str = braille.handler.table.fileName
+		self.state: dict[str, object] = {name: getattr(region, name) for name in self.RENDERED_ATTRIBUTES}
+		self.cells: list[int] = region.brailleCells
+		start: int = region.brailleSelectionStart
+		end: int = region.brailleSelectionEnd
+		#: Selected braille positions as sorted spans (end exclusive).
+		self.spans: list[tuple[int, int]] = [(start, end)]
+		# Cells without selection shape. Selected cells are not known, because
+		# selection shape cannot be separated from dots of the character.
+		self.unmaskedCells: list[int | None] = list(self.cells)
+		self.unmaskedCells[start:end] = [None] * (end - start)
+		#: Offset of each character relative to start of reading unit, or None
+		#: if characters and offsets are same.
+		self.characterOffsets: list[int] | None = _characterOffsets(readingUnit, self.text)
+		# Text offset of each cell, so that routing needs no calls to provider.
+		# When offsets are not characters, routing moves text info as NVDA does.
+		self.offsets: list[int] | None = None
+		if self.characterOffsets is None:
+			rawToContentPos: list[int] = region._rawToContentPos
+			self.offsets = [self.startOffset + rawToContentPos[rawPos] for rawPos in region.brailleToRawPos]
+
+	def contentPos(self, offset: int) -> int:
+		"""Gets number of characters from start of reading unit to offset.
+		:param offset: text offset
+		:return: position of character in text of reading unit
+		"""
+		if self.characterOffsets is None:
+			return offset - self.startOffset
+		return bisect.bisect_left(self.characterOffsets, offset - self.startOffset)
+
+	def matches(self, readingUnit: OffsetsTextInfo) -> bool:
+		"""Checks if reading unit has same text and translation.
+		:param readingUnit: reading unit containing review position
+		:return: True if rendered reading unit can be reused
+		"""
+		return (
+			readingUnit._startOffset == self.startOffset
+			and readingUnit._endOffset == self.endOffset
+			and braille.handler.table.fileName == self.table
+			and readingUnit.text == self.text
+		)
+
+	def updateMask(self, spans: list[tuple[int, int]]) -> bool:
+		"""Updates cells whose selection state changes.
+		:param spans: sorted spans of braille positions which are selected
+		(end exclusive)
+		:return: False if unselected cell is not known and mask cannot be
+		updated, otherwise True
+		"""
+		toggled: list[tuple[int, int, bool]] = _toggledSpans(self.spans, spans)
+		if any(
+			self.unmaskedCells[pos] is None
+			for start, end, selected in toggled
+			if not selected
+			for pos in range(start, end)
+		):
+			return False
+		shape: int = _selectionShape()
+		for start, end, selected in toggled:
+			for pos in range(start, end):
+				if selected:
+					self.cells[pos] |= shape
+				else:
+					self.cells[pos] = self.unmaskedCells[pos]
+		self.spans = spans
+		return True
+
+
+def _toggledSpans(old: list[tuple[int, int]], new: list[tuple[int, int]]) -> list[tuple[int, int, bool]]:
+	"""Gets parts of braille whose selection state differs between two lists of
+	spans. Only boundaries of spans are visited, so cost does not depend on
+	length of spans.
+	:param old: sorted disjoint spans which are selected
+	:param new: sorted disjoint spans which become selected
+	:return: (start, end, selected) for each part, where selected tells
+	whether part becomes selected
+	"""
+	oldStarts: list[int] = [start for start, _end in old]
+	newStarts: list[int] = [start for start, _end in new]
+
+	def covers(spans: list[tuple[int, int]], starts: list[int], pos: int) -> bool:
+		index: int = bisect.bisect_right(starts, pos) - 1
+		return index >= 0 and pos < spans[index][1]
+
+	points: list[int] = sorted({pos for span in old + new for pos in span})
+	toggled: list[tuple[int, int, bool]] = []
+	for start, end in zip(points, points[1:]):
+		selected: bool = covers(new, newStarts, start)
+		if selected != covers(old, oldStarts, start):
+			toggled.append((start, end, selected))
+	return toggled
+
+
+class _RoutingIndex:
+	"""Text offsets of braille cells of reading unit shown with selection, and
+	offset of review cursor. Routing within selection is answered from it, so
+	that text info is not moved character by character from start of reading
+	unit, and second press on review cursor is detected without comparing text
+	infos. Index is made only when each offset is one character.
+	"""
+
+	__slots__ = ("rendered", "infoClass", "reviewOffset")
+
+	def __init__(self, rendered: _RenderedReadingUnit, infoClass: type[OffsetsTextInfo], reviewOffset: int):
+		self.rendered = rendered
+		# Routed position is not split into windows.
+		self.infoClass = infoClass.unwindowedClass if issubclass(infoClass, _WindowedTextInfo) else infoClass
+		self.reviewOffset = reviewOffset
+
+	@classmethod
+	def create(
+		cls, rendered: _RenderedReadingUnit, infoClass: type[OffsetsTextInfo], reviewOffset: int
+	) -> "_RoutingIndex | None":
+		"""Creates index of rendered reading unit.
+		:param rendered: rendered reading unit
+		:param infoClass: class of text info of reading unit
+		:param reviewOffset: offset of review cursor
+		:return: index, or None if offsets of reading unit are not characters
+		"""
+		if rendered.offsets is None:
+			return None
+		return cls(rendered, infoClass, reviewOffset)
+
+	def isShown(self, region: ReviewTextInfoRegion) -> bool:
+		"""Checks if region still shows indexed reading unit.
+		:param region: region whose index this is
+		:return: True if cells of region are indexed cells
+		"""
+		return region.brailleCells is self.rendered.cells
+
+	def textInfo(self, region: ReviewTextInfoRegion, braillePos: int) -> OffsetsTextInfo | None:
+		"""Gets collapsed text info at braille position.
+		:param region: region whose index this is
+		:param braillePos: braille position
+		:return: text info, or None if position is not indexed
+		"""
+		if not 0 <= braillePos < len(self.rendered.offsets):
+			return None
+		offset: int = self.rendered.offsets[braillePos]
+		return self.infoClass(region.obj, Offsets(offset, offset))
+
+	def isReviewCursor(self, info: textInfos.TextInfo) -> bool:
+		"""Checks if text info starts at review cursor.
+		:param info: routed position
+		:return: True if routed position is review cursor
+		"""
+		return isinstance(info, OffsetsTextInfo) and info._startOffset == self.reviewOffset
@@ -0,0 +1,375 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Obtaining selection from providers, in background thread when configured, and caching it."""
+
+import braille
+import textInfos
+import queueHandler
+import watchdog
+import _ctypes
+import comtypes
+import concurrent.futures
+import queue
+import threading
+import time
+
+from cursorManager import CursorManager
+from logHandler import log
+from NVDAObjects import NVDAObject
+from NVDAObjects.IAccessible import IAccessible
+from NVDAObjects.UIA import (
+	UIA,
+)
+from NVDAObjects.window.scintilla import Scintilla
+from textInfos.offsets import (
+	OffsetsTextInfo,
+)
+from treeInterceptorHandler import DocumentTreeInterceptor
+
+from . import (
+	settings,
+	instrumentation,
+	strategy,
+)
+from .spans import (
+	_SelectionRanges,
+)
+
+
+class _SelectionTimeout(RuntimeError):
+	"""Raised when selection is not obtained before deadline."""
+
+
+class _SelectionFetcher:
+	"""Obtains selection in background thread with deadline.
+	Slow providers would otherwise block main thread. Only UIA objects are
+	supported, because UIA elements can be used from any thread while other
+	COM objects are bound to main thread. Text pattern is got in main thread,
+	background thread only calls its GetSelection method, and text info is
+	made in main thread. Selection which arrives after deadline is stored to
+	selection cache, and braille is updated. Worker whose call does not return
+	is replaced, so that later requests are not queued behind it.
+	"""
+
+	#: Maximum number of replaced workers whose call has not returned. When it
+	#: is reached, selection is not requested until one of them returns.
+	MAX_STUCK_WORKERS: int = 4
+
+	def __init__(self):
+		self._requests: queue.Queue | None = None
+		self._obj: NVDAObject | None = None
+		self._future: concurrent.futures.Future | None = None
+		#: Requests whose result was not waited for, and their cache generations.
+		self._late: dict[concurrent.futures.Future, int] = {}
+		#: Futures of replaced workers whose call has not returned.
+		self._stuck: set[concurrent.futures.Future] = set()
+
+	@staticmethod
+	def isSupported(obj: NVDAObject | DocumentTreeInterceptor) -> bool:
+		"""Checks if selection of object can be obtained in background thread.
+		:param obj: object whose selection is needed
+		:return: True if background thread is used for object
+		"""
+		return settings.current.selectionTimeout > 0 and isinstance(obj, UIA)
+
+	def fetch(self, obj: NVDAObject, generation: int) -> textInfos.TextInfo:
+		"""Gets selection of object, waiting at most selection timeout.
+		:param obj: object whose selection is needed
+		:param generation: generation of selection cache when request is made
+		:return: selection
+		:raise _SelectionTimeout: if selection is not obtained before deadline
+		:raise LookupError, RuntimeError, _ctypes.COMError: if object cannot
+		provide selection
+		"""
+		# Wait for earlier request of same object instead of making new one.
+		if self._future is None or self._obj is not obj or self._future.done():
+			if self._future is not None and not self._future.done():
+				self._replaceWorker()
+			if len(self._stuck) >= self.MAX_STUCK_WORKERS:
+				raise _SelectionTimeout
+			textPattern = obj.UIATextPattern
+			if textPattern is None:
+				raise RuntimeError("No text pattern")
+			if self._requests is None:
+				self._requests = queue.Queue()
+				threading.Thread(target=self._run, args=(self._requests,), name="showSelection", daemon=True).start()
+			self._obj = obj
+			self._future = concurrent.futures.Future()
+			self._requests.put((self._future, textPattern))
+		future: concurrent.futures.Future = self._future
+		# Request which has already missed its deadline is not waited again.
+		late: bool = future in self._late
+		try:
+			textRange = future.result(timeout=0 if late else settings.current.selectionTimeout / 1000)
+		except concurrent.futures.TimeoutError:
+			self._late[future] = generation
+			if not late:
+				future.add_done_callback(
+					lambda future: queueHandler.queueFunction(queueHandler.eventQueue, self._deliver, obj, future),
+				)
+			raise _SelectionTimeout
+		return self._textInfo(obj, textRange)
+
+	def stop(self) -> None:
+		"""Stops background thread. Call which does not return keeps thread alive
+		until it returns.
+		"""
+		if self._requests is not None:
+			self._requests.put(None)
+			self._requests = None
+		self._obj = self._future = None
+		self._late.clear()
+		self._stuck.clear()
+
+	def _replaceWorker(self) -> None:
+		"""Stops worker whose call has not returned, so that next request is made
+		to new worker. Its late result is not delivered.
+		"""
+		future: concurrent.futures.Future = self._future
+		self._late.pop(future, None)
+		self._stuck.add(future)
+		future.add_done_callback(self._stuck.discard)
+		self._requests.put(None)
+		self._requests = None
+		self._obj = self._future = None
+
+	@staticmethod
+	def _textInfo(obj: NVDAObject, textRange) -> textInfos.TextInfo:
+		"""Makes selection from text range obtained in background thread.
+		:param obj: object whose selection it is
+		:param textRange: first selected text range, or None if there is no
+		selection
+		:return: selection
+		:raise RuntimeError: if there is no selection
+		"""
+		if textRange is None:
+			raise RuntimeError("No selection available")
+		return obj.TextInfo(obj, None, _rangeObj=textRange)
+
+	def _deliver(self, obj: NVDAObject, future: concurrent.futures.Future) -> None:
+		generation: int | None = self._late.pop(future, None)
+		if generation is None or future.exception() is not None:
+			return
+		try:
+			selection: textInfos.TextInfo = self._textInfo(obj, future.result())
+		except (LookupError, RuntimeError, _ctypes.COMError):
+			return
+		if _selectionCache.store(obj, selection, generation):
+			braille.handler.handleUpdate(obj)
+
+	@staticmethod
+	def _run(requests: queue.Queue) -> None:
+		comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+		try:
+			while (request := requests.get()) is not None:
+				future, textPattern = request
+				if not future.set_running_or_notify_cancel():
+					continue
+				try:
+					selections = textPattern.GetSelection()
+					future.set_result(selections.GetElement(0) if selections.length > 0 else None)
+				except Exception as e:
+					future.set_exception(e)
+		finally:
+			comtypes.CoUninitialize()
+
+
+_fetcher = _SelectionFetcher()
+
+
+#: Scintilla messages which get number of selections and offsets of selection.
+_SCI_GETSELECTIONS: int = 2570
+_SCI_GETSELECTIONNSTART: int = 2585
+_SCI_GETSELECTIONNEND: int = 2587
+
+
+def _getSelectionCount(obj: NVDAObject | DocumentTreeInterceptor) -> int:
+	"""Gets number of ranges of selection from controls which report them as
+	offsets.
+	:param obj: object whose selection is shown
+	:return: number of ranges, or 1 if control cannot report several
+	:raise LookupError, RuntimeError, OSError, _ctypes.COMError,
+	watchdog.CallCancelled: if object cannot provide selection
+	"""
+	if isinstance(obj, Scintilla):
+		return watchdog.cancellableSendMessage(obj.windowHandle, _SCI_GETSELECTIONS, 0, 0)
+	# Only IAccessible2 objects have text object.
+	textObject = getattr(obj, "IAccessibleTextObject", None) if isinstance(obj, IAccessible) else None
+	if textObject is not None:
+		return textObject.nSelections
+	return 1
+
+
+def _getSelectionRanges(obj: NVDAObject | DocumentTreeInterceptor, count: int) -> _SelectionRanges | None:
+	"""Gets ranges of multiple selection from controls which report them as
+	offsets. Each range is a call to provider.
+	:param obj: object whose selection is shown
+	:param count: number of ranges got with _getSelectionCount
+	:return: ranges, or None if they merge to one range
+	:raise LookupError, RuntimeError, OSError, _ctypes.COMError,
+	watchdog.CallCancelled: if object cannot provide selection
+	"""
+	if isinstance(obj, Scintilla):
+		ranges: _SelectionRanges = _SelectionRanges(
+			(
+				watchdog.cancellableSendMessage(obj.windowHandle, _SCI_GETSELECTIONNSTART, index, 0),
+				watchdog.cancellableSendMessage(obj.windowHandle, _SCI_GETSELECTIONNEND, index, 0),
+			)
+			for index in range(count)
+		)
+	else:
+		textObject = obj.IAccessibleTextObject
+		ranges = _SelectionRanges(textObject.selection(index) for index in range(count))
+	return ranges if len(ranges) > 1 else None
+
+
+class _SelectionCache:
+	"""Caches selection of object shown in braille.
+	Getting selection is a cross-process call for many providers, and selection
+	cannot change when only review position is moved. Cached selection is
+	therefore used until caret, focus or selection change invalidates it.
+	Objects with cursor manager (such as browse mode) do not fire caret events
+	when selection changes, so their selection is not cached.
+	Last known selection is used when selection is not obtained before deadline.
+	Ranges of multiple selection are fetched again only when their number or
+	main selection changes.
+	"""
+
+	#: Maximum number of ranges of multiple selection which are fetched. Each
+	#: range is two synchronous calls to provider in main thread, so only main
+	#: selection is shown when there are more.
+	MAX_RANGES: int = 200
+
+	def __init__(self):
+		self._obj: NVDAObject | DocumentTreeInterceptor | None = None
+		self._selection: textInfos.TextInfo | None = None
+		self._lastKnownObj: NVDAObject | DocumentTreeInterceptor | None = None
+		self._lastKnownSelection: textInfos.TextInfo | None = None
+		self._rangesObj: NVDAObject | DocumentTreeInterceptor | None = None
+		self._ranges: _SelectionRanges | None = None
+		#: Object, number of ranges, offsets of main selection and ranges, when
+		#: ranges were fetched.
+		self._fetchedRanges: (
+			tuple[NVDAObject | DocumentTreeInterceptor, int, tuple[int, int], _SelectionRanges | None] | None
+		) = None
+		#: Incremented when cache is invalidated.
+		self._generation: int = 0
+
+	def get(self, obj: NVDAObject | DocumentTreeInterceptor) -> textInfos.TextInfo:
+		"""Gets selection of object.
+		:param obj: object whose selection is needed
+		:return: cached selection if it is still valid, otherwise selection
+		obtained from object, or last known selection if it was not obtained
+		before deadline
+		:raise LookupError, RuntimeError, _ctypes.COMError: if object cannot
+		provide selection
+		"""
+		if self._selection is not None and self._obj is obj:
+			return self._selection
+		if instrumentation.current is not None:
+			instrumentation.current.countProviderCall("makeTextInfo")
+		start: float = time.perf_counter()
+		if _fetcher.isSupported(obj):
+			try:
+				selection: textInfos.TextInfo = _fetcher.fetch(obj, self._generation)
+			except _SelectionTimeout:
+				if instrumentation.current is not None:
+					instrumentation.current.countProviderCall("selectionTimeout")
+				if strategy.learner is not None:
+					strategy.learner.selectionQueried(obj, time.perf_counter() - start, None)
+				if self._lastKnownSelection is not None and self._lastKnownObj is obj:
+					return self._lastKnownSelection
+				raise
+		else:
+			selection = obj.makeTextInfo(textInfos.POSITION_SELECTION)
+		if strategy.learner is not None and isinstance(obj, NVDAObject):
+			strategy.learner.selectionQueried(obj, time.perf_counter() - start, selection)
+		if not isinstance(obj, CursorManager):
+			self._obj = self._lastKnownObj = obj
+			self._selection = self._lastKnownSelection = selection
+		return selection
+
+	def ranges(
+		self,
+		obj: NVDAObject | DocumentTreeInterceptor,
+		selection: OffsetsTextInfo,
+	) -> _SelectionRanges | None:
+		"""Gets ranges of multiple selection of object, which are cached like
+		selection. When cache is invalidated, only number of ranges is queried
+		if main selection has not changed.
+		:param obj: object whose selection is offset based
+		:param selection: main selection of object
+		:return: ranges, or None if object has one selection, cannot report
+		several or has more than MAX_RANGES
+		"""
+		if self._rangesObj is obj:
+			return self._ranges
+		if instrumentation.current is not None:
+			instrumentation.current.countProviderCall("selectionCount")
+		try:
+			count: int = _getSelectionCount(obj)
+			mainSelection: tuple[int, int] = (selection._startOffset, selection._endOffset)
+			fetched = self._fetchedRanges
+			if count < 2 or count > self.MAX_RANGES:
+				ranges: _SelectionRanges | None = None
+			elif fetched is not None and fetched[0] is obj and fetched[1] == count and fetched[2] == mainSelection:
+				ranges = fetched[3]
+			else:
+				if instrumentation.current is not None:
+					instrumentation.current.countProviderCall("selectionRanges")
+				ranges = _getSelectionRanges(obj, count)
+				self._fetchedRanges = (obj, count, mainSelection, ranges)
+		except (LookupError, RuntimeError, OSError, _ctypes.COMError, watchdog.CallCancelled):
+			log.debugWarning("Cannot get ranges of selection", exc_info=True)
+			ranges = None
+		if not isinstance(obj, CursorManager):
+			self._rangesObj = obj
+			self._ranges = ranges
+		return ranges
+
+	def store(
+		self,
+		obj: NVDAObject | DocumentTreeInterceptor,
+		selection: textInfos.TextInfo,
+		generation: int,
+	) -> bool:
+		"""Stores selection which was obtained after deadline.
+		:param obj: object whose selection it is
+		:param selection: selection of object
+		:param generation: generation of cache when selection was requested
+		:return: True if selection was stored, False if cache has been
+		invalidated after request
+		"""
+		if generation != self._generation:
+			return False
+		self._obj = self._lastKnownObj = obj
+		self._selection = self._lastKnownSelection = selection
+		return True
+
+	def invalidate(self, discardLastKnown: bool = False) -> None:
+		"""Invalidates cached selection.
+		:param discardLastKnown: whether also last known selection is
+		discarded, for example when its offsets may not be valid any more
+		"""
+		self._obj = self._selection = None
+		self._rangesObj = self._ranges = None
+		self._generation += 1
+		if discardLastKnown:
+			self._lastKnownObj = self._lastKnownSelection = None
+			self._fetchedRanges = None
+
+	def release(self, obj: NVDAObject) -> None:
+		"""Discards last known selection and fetched ranges of other object than
+		focused one, so that previous document is not kept alive after focus
+		changes.
+		:param obj: object which got focus
+		"""
+		if self._lastKnownObj is not obj:
+			self._lastKnownObj = self._lastKnownSelection = None
+		if self._fetchedRanges is not None and self._fetchedRanges[0] is not obj:
+			self._fetchedRanges = None
+
+
+_selectionCache = _SelectionCache()
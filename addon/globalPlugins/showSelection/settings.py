@@ -0,0 +1,115 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Configuration of the add-on and snapshot of settings it depends on."""
+
+import braille
+import config
+import winVersion
+import dataclasses
+
+from braille.regions._routing import (
+	_routingShouldMoveSystemCaret,
+)
+from config.configFlags import (
+	BrailleMode,
+	TetherTo,
+)
+
+
+confspec: dict[str, str] = {
+	# Milliseconds during which review position updates caused by selection
+	# changes are coalesced. With 0 they are coalesced until the event queue
+	# is processed next time.
+	"coalesceLatency": "integer(default=0, min=0, max=1000)",
+	# Whether calls of patched functions are timed. Takes effect when NVDA
+	# is restarted.
+	"instrumentation": "boolean(default=False)",
+	# Number of latest calls stored for statistics.
+	"instrumentationBufferSize": "integer(default=4096, min=16, max=1000000)",
+	# Milliseconds during which selection is waited for when it is obtained in
+	# background thread. With 0 selection is obtained in main thread.
+	"selectionTimeout": "integer(default=0, min=0, max=2000)",
+	# Whether the way review position is updated when selection changes is
+	# chosen per application according to measured behaviour of application.
+	"adaptiveStrategy": "boolean(default=False)",
+	# Maximum number of characters of line or paragraph which are rendered at
+	# once. Longer ones are rendered in parts as braille display is scrolled.
+	# With 0 whole line or paragraph is rendered.
+	"readingUnitWindow": "integer(default=0, min=0, max=100000)",
+	# Number of braille translations which are cached. With 0 translations
+	# are not cached.
+	"translationCacheSize": "integer(default=256, min=0, max=100000)",
+	# Whether previous and next reading units are prepared in advance when
+	# review cursor is within selection.
+	"prefetch": "boolean(default=True)",
+}
+config.conf.spec["showSelection"] = confspec
+
+
+@dataclasses.dataclass(frozen=True)
+class _Settings:
+	"""Snapshot of settings used in hooks, so that layered configuration is not
+	looked up on every event and update. Snapshot is refreshed when
+	configuration or braille display changes, when braille or review cursor
+	setting is toggled with command, and when focus changes after settings
+	have been changed in settings dialog.
+	"""
+
+	#: Configured braille tether.
+	tetherTo: str = ""
+	#: Configured braille mode.
+	brailleMode: str = ""
+	#: Whether braille is enabled and not in speech output mode.
+	brailleActive: bool = False
+	#: Whether braille can be tethered to review.
+	tetheredToReview: bool = False
+	showSelection: bool = True
+	followCaret: bool = True
+	followFocus: bool = True
+	#: Whether routing review cursor moves also system caret.
+	routingMovesCaret: bool = False
+	#: Whether MS Word document controls are accessed without UIA.
+	wordWithoutUIA: bool = False
+	coalesceLatency: int = 0
+	selectionTimeout: int = 0
+	readingUnitWindow: int = 0
+	prefetch: bool = True
+
+	@classmethod
+	def fromConfig(cls) -> "_Settings":
+		"""Takes snapshot of current configuration.
+		:return: snapshot
+		"""
+		brailleConfig = config.conf["braille"]
+		reviewCursorConfig = config.conf["reviewCursor"]
+		showSelectionConfig = config.conf["showSelection"]
+		# At least in word 2019 caret events are fired also when not using UIA
+		# and moving review cursor. Therefore caret event cannot be relied on.
+		if winVersion.getWinVer() >= winVersion.WIN11:
+			wordWithoutUIA: bool = config.conf["UIA"]["allowInMSWord"] == 1
+		else:
+			wordWithoutUIA = config.conf["UIA"]["allowInMSWord"] < 3
+		return cls(
+			tetherTo=brailleConfig["tetherTo"],
+			brailleMode=brailleConfig["mode"],
+			brailleActive=(
+				braille.handler is not None
+				and braille.handler.enabled
+				and brailleConfig["mode"] != BrailleMode.SPEECH_OUTPUT.value
+			),
+			tetheredToReview=brailleConfig["tetherTo"] in (TetherTo.REVIEW.value, TetherTo.AUTO.value),
+			showSelection=brailleConfig["showSelection"],
+			followCaret=reviewCursorConfig["followCaret"],
+			followFocus=reviewCursorConfig["followFocus"],
+			routingMovesCaret=braille.handler is not None and _routingShouldMoveSystemCaret(),
+			wordWithoutUIA=wordWithoutUIA,
+			coalesceLatency=showSelectionConfig["coalesceLatency"],
+			selectionTimeout=showSelectionConfig["selectionTimeout"],
+			readingUnitWindow=showSelectionConfig["readingUnitWindow"],
+			prefetch=showSelectionConfig["prefetch"],
+		)
+
+
+current: _Settings = _Settings()
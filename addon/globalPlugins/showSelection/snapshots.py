@@ -0,0 +1,351 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Restoring selection shown in braille when focus returns to a document."""
+
+import api
+import textInfos
+import _ctypes
+import collections
+import copy
+import weakref
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from NVDAObjects import NVDAObject
+from NVDAObjects.IAccessible import IAccessible
+from textInfos.offsets import (
+	Offsets,
+	OffsetsTextInfo,
+)
+from treeInterceptorHandler import DocumentTreeInterceptor
+
+from . import (
+	instrumentation,
+)
+from .spans import (
+	_Span,
+	_SelectionRanges,
+)
+from .selection import (
+	_selectionCache,
+)
+from .coalescer import (
+	_coalescer,
+)
+from .rendered import (
+	_RenderedReadingUnit,
+	_RoutingIndex,
+)
+from .clipped import (
+	_ClippedReadingUnit,
+)
+
+
+class _SelectionSnapshot:
+	"""Selection view of object which was shown in braille when focus moved
+	away from it. Text ranges are stored as text info class and offsets, so
+	that snapshot does not keep object alive, and text infos are made for
+	object which gets focus when snapshot is restored.
+	"""
+
+	#: Region attributes which define selected and scrolled braille positions.
+	POSITION_ATTRIBUTES: tuple[str, ...] = (
+		"selectionStart",
+		"selectionEnd",
+		"brailleSelectionStart",
+		"brailleSelectionEnd",
+	)
+
+	__slots__ = (
+		"selectionRange",
+		"reviewRange",
+		"readingRange",
+		"clippedRanges",
+		"ranges",
+		"rendered",
+		"positions",
+		"selection",
+		"reviewPos",
+		"clipped",
+	)
+
+	def __init__(self, region: ReviewTextInfoRegion, reviewPos: OffsetsTextInfo):
+		selection: _Span = region._realSelection
+		self.selectionRange: tuple[type[OffsetsTextInfo], int, int] = (
+			selection._infoClass,
+			selection.start,
+			selection.end,
+		)
+		self.reviewRange: tuple[type[OffsetsTextInfo], int, int] = (
+			type(reviewPos),
+			reviewPos._startOffset,
+			reviewPos._startOffset,
+		)
+		self.readingRange: tuple[type[OffsetsTextInfo], int, int] = self._range(
+			region._renderedReadingUnit.state["_readingInfo"],
+		)
+		clipped: _ClippedReadingUnit | None = region._clippedReadingUnitCache
+		#: Unit, selection, reading unit, clipped reading unit and review
+		#: bookmark of clipped reading unit, when they are offset based.
+		self.clippedRanges: tuple | None = None
+		if (
+			clipped is not None
+			and isinstance(clipped.selection, OffsetsTextInfo)
+			and isinstance(clipped.readingUnit, OffsetsTextInfo)
+			and isinstance(clipped.clipped, (OffsetsTextInfo, type(None)))
+		):
+			self.clippedRanges = (
+				clipped.unit,
+				self._range(clipped.selection),
+				self._range(clipped.readingUnit),
+				self._range(clipped.clipped) if clipped.clipped is not None else None,
+				clipped.reviewBookmark,
+			)
+		self.ranges: _SelectionRanges | None = region._selectionRanges
+		# Rendered reading unit is copied without its text info, and region
+		# keeps original.
+		self.rendered: _RenderedReadingUnit = copy.copy(region._renderedReadingUnit)
+		self.rendered.state = {name: value for name, value in self.rendered.state.items() if name != "_readingInfo"}
+		self.positions: dict[str, int | None] = {
+			name: getattr(region, name, None) for name in self.POSITION_ATTRIBUTES
+		}
+		#: Selection, review position and clipped reading unit, when snapshot
+		#: is bound to object.
+		self.selection: _Span | None = None
+		self.reviewPos: _Span | None = None
+		self.clipped: _ClippedReadingUnit | None = None
+
+	@staticmethod
+	def _range(info: OffsetsTextInfo) -> tuple[type[OffsetsTextInfo], int, int]:
+		return type(info), info._startOffset, info._endOffset
+
+	@staticmethod
+	def _makeTextInfo(
+		obj: NVDAObject | DocumentTreeInterceptor,
+		textRange: tuple[type[OffsetsTextInfo], int, int],
+	) -> OffsetsTextInfo:
+		infoClass, start, end = textRange
+		return infoClass(obj, Offsets(start, end))
+
+	def hasSelection(self, obj: NVDAObject | DocumentTreeInterceptor) -> bool:
+		"""Checks if selection of object is still selection of snapshot. Only
+		offsets of selection are queried, so that snapshot is not shown for
+		document whose selection has changed.
+		:param obj: object whose snapshot is restored
+		:return: True if selection has same offsets
+		"""
+		infoClass, start, end = self.selectionRange
+		if instrumentation.current is not None:
+			instrumentation.current.countProviderCall("selectionOffsets")
+		try:
+			return tuple(infoClass(obj, Offsets(start, start))._getSelectionOffsets()) == (start, end)
+		except (LookupError, RuntimeError, _ctypes.COMError):
+			return False
+
+	def bind(self, obj: NVDAObject | DocumentTreeInterceptor) -> None:
+		"""Makes text infos of snapshot for object which got focus.
+		:param obj: object whose snapshot is restored
+		"""
+		self.selection = _Span(self._makeTextInfo(obj, self.selectionRange))
+		self.reviewPos = _Span(self._makeTextInfo(obj, self.reviewRange))
+		self.rendered.state["_readingInfo"] = self._makeTextInfo(obj, self.readingRange)
+		if self.clippedRanges is not None:
+			unit, selectionRange, readingRange, clippedRange, reviewBookmark = self.clippedRanges
+			self.clipped = _ClippedReadingUnit(
+				self._makeTextInfo(obj, selectionRange),
+				unit,
+				reviewBookmark,
+				self._makeTextInfo(obj, readingRange),
+				self._makeTextInfo(obj, clippedRange) if clippedRange is not None else None,
+			)
+
+	def apply(self, region: ReviewTextInfoRegion) -> None:
+		"""Shows snapshot in region without calls to provider. Snapshot must be
+		bound to object of region.
+		:param region: new region of object
+		"""
+		rendered: _RenderedReadingUnit = self.rendered
+		for name, value in rendered.state.items():
+			setattr(region, name, value)
+		for name, value in self.positions.items():
+			setattr(region, name, value)
+		region.brailleCells = rendered.cells
+		region._realSelection = self.selection
+		region._selectionRanges = self.ranges
+		# Review position is set again after caret event fired on focus.
+		region._reviewPos = self.reviewPos
+		region._clippedReadingUnitCache = self.clipped
+		region._renderedReadingUnit = rendered
+		region._readingUnitContainsSelectedCharacters = True
+		region._routingIndex = _RoutingIndex.create(rendered, self.readingRange[0], self.reviewRange[1])
+
+
+class _SnapshotCache:
+	"""Least recently used snapshots of selection views of documents which lost
+	focus, by window and control. When document gets focus again, first update of its
+	region shows snapshot without calls to provider, and review position within
+	selection is restored. Selection and text are checked when restored review
+	position is shown, and region is rendered again if they have changed.
+	"""
+
+	#: Maximum number of snapshots.
+	MAX_ENTRIES: int = 8
+	#: Maximum total length of reading units of snapshots.
+	MAX_CHARACTERS: int = 50000
+
+	def __init__(self):
+		self._snapshots: collections.OrderedDict[tuple[int, bool, object], _SelectionSnapshot] = (
+			collections.OrderedDict()
+		)
+		self._characters: int = 0
+		#: Whether next update restores snapshot, set when focus changes.
+		self._armed: bool = False
+		#: Region and snapshot which is shown until restored review position is.
+		self._pending: tuple[weakref.ref, _SelectionSnapshot] | None = None
+		#: Region which shows restored snapshot until caret event is checked.
+		self._restored: weakref.ref | None = None
+		self.restores: int = 0
+
+	@staticmethod
+	def _windowKey(obj: NVDAObject | DocumentTreeInterceptor) -> tuple[int, bool]:
+		if isinstance(obj, DocumentTreeInterceptor):
+			return obj.rootNVDAObject.windowHandle, True
+		return getattr(obj, "windowHandle", 0) or 0, False
+
+	@classmethod
+	def _key(cls, obj: NVDAObject | DocumentTreeInterceptor) -> tuple[int, bool, object]:
+		"""Gets key of object which stays same when object is created again for
+		same control, and differs between controls which share window.
+		:param obj: object or browse mode document
+		:return: window handle, whether object is browse mode document, and
+		IAccessible2 unique ID, or None when control has no unique ID
+		"""
+		control: NVDAObject = obj.rootNVDAObject if isinstance(obj, DocumentTreeInterceptor) else obj
+		uniqueID: int | None = None
+		if isinstance(control, IAccessible):
+			try:
+				uniqueID = control.IA2UniqueID
+			except _ctypes.COMError:
+				pass
+		return (*cls._windowKey(obj), uniqueID)
+
+	def save(self, region: ReviewTextInfoRegion | None) -> None:
+		"""Saves selection view of region which loses focus, when review
+		position is within selection shown with offsets.
+		:param region: region shown in braille, or None
+		"""
+		if region is None or region._realSelection is None or region._realSelection._info is not None:
+			return
+		rendered: _RenderedReadingUnit | None = region._renderedReadingUnit
+		reviewPos: textInfos.TextInfo | None = api.getReviewPosition()
+		if (
+			rendered is None
+			or region.brailleCells is not rendered.cells
+			or not isinstance(reviewPos, OffsetsTextInfo)
+			or reviewPos.obj is not region.obj
+			or len(rendered.text) > self.MAX_CHARACTERS
+		):
+			return
+		key: tuple[int, bool, object] = self._key(region.obj)
+		previous: _SelectionSnapshot | None = self._snapshots.pop(key, None)
+		if previous is not None:
+			self._characters -= len(previous.rendered.text)
+		self._snapshots[key] = _SelectionSnapshot(region, reviewPos)
+		self._characters += len(rendered.text)
+		while len(self._snapshots) > self.MAX_ENTRIES or self._characters > self.MAX_CHARACTERS:
+			self._characters -= len(self._snapshots.popitem(last=False)[1].rendered.text)
+
+	def arm(self) -> None:
+		"""Lets next update of region restore snapshot, when focus has moved."""
+		self._armed = True
+		self._pending = self._restored = None
+
+	def restore(self, region: ReviewTextInfoRegion) -> bool:
+		"""Shows snapshot of object of region from first update after focus
+		change until restored review position is shown.
+		:param region: region which is updated
+		:return: True if snapshot was shown
+		"""
+		obj: NVDAObject | DocumentTreeInterceptor = region.obj
+		if self._armed:
+			self._armed = False
+			if not self._snapshots:
+				return False
+			snapshot: _SelectionSnapshot | None = self._snapshots.pop(self._key(obj), None)
+			if snapshot is None:
+				return False
+			self._characters -= len(snapshot.rendered.text)
+			# Selection changed while document did not have focus.
+			if not snapshot.hasSelection(obj):
+				return False
+			snapshot.bind(obj)
+			self._pending = (weakref.ref(region), snapshot)
+			self._restored = weakref.ref(region)
+			self.restores += 1
+			_coalescer.setReviewPosition(snapshot.reviewPos)
+		elif self._pending is None or self._pending[0]() is not region:
+			return False
+		snapshot = self._pending[1]
+		reviewPos: textInfos.TextInfo | None = api.getReviewPosition()
+		if (
+			isinstance(reviewPos, OffsetsTextInfo)
+			and reviewPos.obj is obj
+			and reviewPos._startOffset == snapshot.reviewPos.start
+		):
+			# Restored review position is shown, so selection and text are checked.
+			self._pending = None
+			return False
+		snapshot.apply(region)
+		return True
+
+	def keepsReviewPosition(self, region: ReviewTextInfoRegion) -> bool:
+		"""Checks if review position of region is set again on caret event.
+		Review position restored from snapshot is kept only if selection has
+		not changed, so that caret event fired on focus does not move review
+		position to caret, but caret movement does. Check is done once after
+		restore.
+		:param region: region whose object got caret event
+		:return: False if region shows restored snapshot whose selection has
+		changed, otherwise True
+		"""
+		restored: weakref.ref | None = self._restored
+		self._restored = None
+		if restored is None or restored() is not region:
+			return True
+		try:
+			selection: textInfos.TextInfo = _selectionCache.get(region.obj)
+		except (LookupError, RuntimeError, _ctypes.COMError):
+			return False
+		return region._realSelection is not None and region._realSelection.sameRange(_Span(selection))
+
+	def discard(self, obj: NVDAObject | DocumentTreeInterceptor) -> None:
+		"""Discards snapshots of window of object, for example when its text
+		has changed. Controls are not told apart, so that no calls to provider
+		are made.
+		:param obj: object
+		"""
+		windowKey: tuple[int, bool] = self._windowKey(obj)
+		for key in [key for key in self._snapshots if key[:2] == windowKey]:
+			self._characters -= len(self._snapshots.pop(key).rendered.text)
+
+	def clear(self) -> None:
+		"""Discards all snapshots."""
+		self._snapshots.clear()
+		self._characters = 0
+		self._armed = False
+		self._pending = self._restored = None
+
+	def report(self) -> str:
+		"""Creates report of snapshots.
+		:return: report as text
+		"""
+		return (
+			f"Selection snapshots: {len(self._snapshots)} documents, {self._characters} characters, "
+			f"restored {self.restores}"
+		)
+
+
+_snapshotCache = _SnapshotCache()
@@ -0,0 +1,140 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Selected spans of text and sets of selected ranges."""
+
+import textInfos
+import bisect
+
+from NVDAObjects import NVDAObject
+from textInfos.offsets import (
+	Offsets,
+	OffsetsTextInfo,
+)
+from treeInterceptorHandler import DocumentTreeInterceptor
+from typing import (
+	Iterable,
+)
+
+
+class _Span:
+	"""Range of text stored as offsets.
+	Offset based text infos are stored as integers, so that ranges can be
+	compared without calls to provider, and text info is built only when it
+	is handed to NVDA. Other text infos are stored as such, and they must not
+	be changed afterwards.
+	"""
+
+	__slots__ = ("obj", "start", "end", "_infoClass", "_info")
+
+	def __init__(self, info: textInfos.TextInfo):
+		self.obj: NVDAObject | DocumentTreeInterceptor = info.obj
+		if isinstance(info, OffsetsTextInfo):
+			self.start: int | None = info._startOffset
+			self.end: int | None = info._endOffset
+			self._infoClass: type[OffsetsTextInfo] | None = type(info)
+			self._info: textInfos.TextInfo | None = None
+		else:
+			self.start = self.end = self._infoClass = None
+			self._info = info
+
+	def sameRange(self, other: "_Span") -> bool:
+		"""Checks if span covers same range as other span.
+		:param other: span to compare
+		:return: True if ranges are same
+		"""
+		if self._info is None and other._info is None:
+			return self.obj is other.obj and self.start == other.start and self.end == other.end
+		if self._info is not None and other._info is not None:
+			# Cached selection is same text info until it is invalidated, and
+			# comparing its endpoints would be calls to provider.
+			return self._info is other._info or (
+				self.obj is other.obj
+				and self._info.start == other._info.start
+				and self._info.end == other._info.end
+			)
+		return False
+
+	def makeTextInfo(self, start: int | None = None, end: int | None = None) -> textInfos.TextInfo:
+		"""Makes text info of this span.
+		:param start: start offset of part of offset based span, by default
+		start of span
+		:param end: end offset of part of offset based span, by default end
+		of span
+		:return: new text info
+		"""
+		if self._info is not None:
+			return self._info.copy()
+		return self._infoClass(
+			self.obj,
+			Offsets(self.start if start is None else start, self.end if end is None else end),
+		)
+
+	def edge(self, end: bool) -> textInfos.TextInfo:
+		"""Makes collapsed text info at start of span or at its last character.
+		:param end: whether last character is used instead of start
+		:return: new text info
+		"""
+		if self._info is None:
+			offset: int = max(self.start, self.end - 1) if end else self.start
+			return self.makeTextInfo(offset, offset)
+		info: textInfos.TextInfo = self._info.copy()
+		if end:
+			# The end of the range is exclusive, so make it inclusive first.
+			info.move(textInfos.UNIT_CHARACTER, -1, "end")
+		info.collapse(end=end)
+		return info
+
+
+class _SelectionRanges:
+	"""Ranges of multiple selection as sorted offsets.
+	Overlapping ranges are merged, so that both start and end offsets are
+	sorted, and ranges which intersect reading unit are found with binary
+	search also when there are thousands of them, for example when all
+	occurrences of a word are selected.
+	"""
+
+	__slots__ = ("starts", "ends")
+
+	def __init__(self, ranges: Iterable[tuple[int, int]]):
+		self.starts: list[int] = []
+		self.ends: list[int] = []
+		for start, end in sorted(ranges):
+			# Carets of multiple selection are not shown.
+			if start >= end:
+				continue
+			if self.ends and start <= self.ends[-1]:
+				self.ends[-1] = max(self.ends[-1], end)
+			else:
+				self.starts.append(start)
+				self.ends.append(end)
+
+	def __len__(self) -> int:
+		return len(self.starts)
+
+	def __eq__(self, other: object) -> bool:
+		return isinstance(other, _SelectionRanges) and self.starts == other.starts and self.ends == other.ends
+
+	@property
+	def start(self) -> int:
+		"""Start offset of first range."""
+		return self.starts[0]
+
+	@property
+	def end(self) -> int:
+		"""End offset of last range."""
+		return self.ends[-1]
+
+	def intersecting(self, start: int, end: int) -> list[tuple[int, int]]:
+		"""Gets ranges which intersect range.
+		:param start: start offset of range
+		:param end: end offset of range (exclusive)
+		:return: intersecting ranges clipped to range
+		"""
+		first: int = bisect.bisect_right(self.ends, start)
+		last: int = bisect.bisect_left(self.starts, end)
+		return [
+			(max(rangeStart, start), min(rangeEnd, end))
+			for rangeStart, rangeEnd in zip(self.starts[first:last], self.ends[first:last])
+		]
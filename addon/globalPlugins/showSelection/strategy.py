@@ -0,0 +1,337 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Policies for updating review position, chosen per application."""
+
+import textInfos
+import dataclasses
+import json
+import time
+
+from logHandler import log
+from NVDAObjects import NVDAObject
+from treeInterceptorHandler import DocumentTreeInterceptor
+from appModuleHandler import AppModule
+from enum import Enum
+from typing import (
+	Callable,
+)
+
+from . import (
+	settings,
+)
+from .spans import (
+	_Span,
+)
+
+
+class _ReviewUpdate(Enum):
+	"""How review position is updated when selection changes."""
+
+	#: Caret event is queued, and review position is updated when it is handled.
+	CARET_EVENT = "caretEvent"
+	#: Caret events cannot be relied on, review position is updated with
+	#: queued api.setReviewPosition call.
+	QUEUED_REVIEW_POSITION = "queuedReviewPosition"
+
+
+@dataclasses.dataclass(frozen=True)
+class _AppPolicy:
+	"""Defines how selection changes are handled in an application."""
+
+	#: How review position is updated when selection changes.
+	reviewUpdate: _ReviewUpdate = _ReviewUpdate.CARET_EVENT
+	#: Whether caret event is forced when selection change is reported,
+	#: because braille is not otherwise always updated.
+	forceCaretEvent: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class _AppPolicyRule:
+	"""Policy which applies to an application when condition is met."""
+
+	appName: str
+	policy: _AppPolicy
+	condition: Callable[[], bool] = lambda: True
+
+
+def _wordWithoutUIA() -> bool:
+	"""Checks if MS Word document controls are accessed without UIA.
+	At least in word 2019 caret events are fired also when not using UIA
+	and moving review cursor. Therefore caret event cannot be relied on.
+	"""
+	return settings.current.wordWithoutUIA
+
+
+_DEFAULT_POLICY = _AppPolicy()
+#: Application specific policies. First rule whose application name matches
+#: and whose condition is met is used.
+_APP_POLICY_RULES: tuple[_AppPolicyRule, ...] = (
+	_AppPolicyRule(
+		appName="winword",
+		policy=_AppPolicy(reviewUpdate=_ReviewUpdate.QUEUED_REVIEW_POSITION, forceCaretEvent=True),
+		condition=_wordWithoutUIA,
+	),
+)
+#: Incremented when configuration profile is switched so that policies cached
+#: on app modules are resolved again.
+_policyGeneration: int = 0
+
+
+def _invalidatePolicies() -> None:
+	"""Invalidates policies cached on app modules."""
+	global _policyGeneration
+	_policyGeneration += 1
+
+
+class _AppStatistics:
+	"""Measured behaviour of application."""
+
+	#: Weight of new sample in moving averages.
+	SMOOTHING: float = 0.1
+	#: Number of checked caret events needed before statistics are used.
+	MIN_SAMPLES: int = 20
+	#: Number of checked caret events after which counts are halved.
+	MAX_SAMPLES: int = 200
+	#: Share of caret events which do not change selection above which caret
+	#: events cannot be relied on.
+	MAX_SPURIOUS_RATIO: float = 0.5
+	#: Milliseconds which review position update may take with caret events.
+	LATENCY_BUDGET: float = 100.0
+
+	def __init__(self, data: dict[str, float] | None = None):
+		data = data or {}
+		#: Moving average of selection query time in milliseconds.
+		self.selectionQueryTime: float = data.get("selectionQueryTime", 0.0)
+		#: Moving average of time from selection change to caret event in milliseconds.
+		self.caretLatency: float = data.get("caretLatency", 0.0)
+		#: Caret events which were checked while selection was shown.
+		self.caretChecks: int = int(data.get("caretChecks", 0))
+		#: Checked caret events which did not change selection.
+		self.spuriousCaretEvents: int = int(data.get("spuriousCaretEvents", 0))
+
+	def asDict(self) -> dict[str, float]:
+		"""Gets statistics for storing.
+		:return: statistics as dictionary
+		"""
+		return {
+			"selectionQueryTime": self.selectionQueryTime,
+			"caretLatency": self.caretLatency,
+			"caretChecks": self.caretChecks,
+			"spuriousCaretEvents": self.spuriousCaretEvents,
+		}
+
+	@classmethod
+	def _average(cls, average: float, sample: float) -> float:
+		return sample if not average else average + cls.SMOOTHING * (sample - average)
+
+	def recordSelectionQuery(self, duration: float) -> None:
+		"""Records time taken by selection query.
+		:param duration: duration in seconds
+		"""
+		self.selectionQueryTime = self._average(self.selectionQueryTime, duration * 1000)
+
+	def recordCaretLatency(self, duration: float) -> None:
+		"""Records time from selection change to caret event.
+		:param duration: duration in seconds
+		"""
+		self.caretLatency = self._average(self.caretLatency, duration * 1000)
+
+	def recordCaretCheck(self, spurious: bool) -> None:
+		"""Records caret event which was checked while selection was shown.
+		:param spurious: whether caret event did not change selection
+		"""
+		# Older samples are weighted less, so that changed behaviour is learned.
+		if self.caretChecks >= self.MAX_SAMPLES:
+			self.caretChecks //= 2
+			self.spuriousCaretEvents //= 2
+		self.caretChecks += 1
+		self.spuriousCaretEvents += spurious
+
+	def reviewUpdate(self) -> _ReviewUpdate | None:
+		"""Chooses how review position is updated.
+		:return: cheapest way which works in application, or None if there are
+		not enough samples
+		"""
+		if self.caretChecks < self.MIN_SAMPLES:
+			return None
+		if (
+			self.spuriousCaretEvents / self.caretChecks > self.MAX_SPURIOUS_RATIO
+			or self.caretLatency + self.selectionQueryTime > self.LATENCY_BUDGET
+		):
+			return _ReviewUpdate.QUEUED_REVIEW_POSITION
+		return _ReviewUpdate.CARET_EVENT
+
+
+class _StrategyLearner:
+	"""Measures behaviour of applications to choose how review position is
+	updated when selection changes. Statistics are stored per application in
+	NVDA user configuration directory.
+	"""
+
+	#: Seconds after which caret event is not counted as caused by selection
+	#: change, because it is likely caused by next key press. Longer than
+	#: latency budget, so that slow caret events are still measured.
+	MAX_CARET_LATENCY: float = 0.25
+	#: Seconds after which changed statistics are written when focus changes.
+	SAVE_INTERVAL: float = 300.0
+
+	def __init__(self, path: str):
+		self.path: str = path
+		self.statistics: dict[str, _AppStatistics] = {}
+		#: Latest selection change as (object, time).
+		self._selectionChange: tuple[NVDAObject, float] | None = None
+		#: Objects for which this add-on has queued caret event.
+		self._syntheticCaretEvents: set[int] = set()
+		#: Object which fired caret event and selection shown for it, checked
+		#: when selection of object is queried next time.
+		self._caretCheck: "tuple[NVDAObject, _Span] | None" = None
+		#: Whether statistics have changed since they were written.
+		self._dirty: bool = False
+		self._savedAt: float = time.perf_counter()
+		try:
+			with open(path, encoding="utf-8") as file:
+				data: dict[str, dict[str, float]] = json.load(file)
+			self.statistics = {appName: _AppStatistics(appData) for appName, appData in data.items()}
+		except FileNotFoundError:
+			pass
+		except (OSError, ValueError, AttributeError):
+			log.warning(f"Cannot read {path}", exc_info=True)
+
+	def save(self) -> None:
+		"""Writes statistics to file."""
+		self._dirty = False
+		self._savedAt = time.perf_counter()
+		try:
+			with open(self.path, "w", encoding="utf-8") as file:
+				json.dump(
+					{appName: statistics.asDict() for appName, statistics in self.statistics.items()},
+					file,
+					indent="\t",
+				)
+		except OSError:
+			log.warning(f"Cannot write {self.path}", exc_info=True)
+
+	def _getStatistics(self, obj: NVDAObject) -> _AppStatistics:
+		return self.statistics.setdefault(obj.appModule.appName, _AppStatistics())
+
+	def _record(self, obj: NVDAObject, record: Callable[[_AppStatistics], None]) -> None:
+		statistics: _AppStatistics = self._getStatistics(obj)
+		reviewUpdate: _ReviewUpdate | None = statistics.reviewUpdate()
+		record(statistics)
+		self._dirty = True
+		if statistics.reviewUpdate() != reviewUpdate:
+			log.debug(f"Review update of {obj.appModule.appName} changed to {statistics.reviewUpdate()}")
+			_invalidatePolicies()
+
+	def selectionQueried(
+		self, obj: NVDAObject, duration: float, selection: textInfos.TextInfo | None = None
+	) -> None:
+		"""Records selection query, and checks whether caret event fired before
+		it changed selection.
+		:param obj: object whose selection was queried
+		:param duration: duration of query in seconds
+		:param selection: obtained selection, or None if it was not obtained
+		"""
+		self._record(obj, lambda statistics: statistics.recordSelectionQuery(duration))
+		check: tuple[NVDAObject, _Span] | None = self._caretCheck
+		if check is None or check[0] is not obj:
+			return
+		self._caretCheck = None
+		if selection is not None:
+			# Caret event which does not change selection is spurious.
+			spurious: bool = check[1].sameRange(_Span(selection))
+			self._record(obj, lambda statistics: statistics.recordCaretCheck(spurious))
+
+	def focusChanged(self) -> None:
+		"""Forgets selection change when focus changes, so that object is not kept
+		alive, and writes statistics when they have changed and were written
+		long ago.
+		"""
+		self._selectionChange = self._caretCheck = None
+		self._syntheticCaretEvents.clear()
+		if self._dirty and time.perf_counter() - self._savedAt > self.SAVE_INTERVAL:
+			self.save()
+
+	def selectionChanged(self, obj: NVDAObject) -> None:
+		"""Records selection change, so that latency of caret event can be measured.
+		:param obj: object whose selection changed
+		"""
+		self._selectionChange = (obj, time.perf_counter())
+
+	def caretEventQueued(self, obj: NVDAObject | DocumentTreeInterceptor) -> None:
+		"""Records that this add-on queued caret event after selection change.
+		Its latency and whether it changes selection depend on this add-on, so
+		it is not measured.
+		:param obj: object for which caret event was queued
+		"""
+		self._selectionChange = None
+		self._syntheticCaretEvents.add(id(obj))
+
+	def caretEvent(self, obj: NVDAObject, shownSelection: "_Span | None") -> None:
+		"""Records caret event.
+		:param obj: object which fired caret event
+		:param shownSelection: selection shown in braille for object, if any
+		"""
+		self._caretCheck = None
+		if id(obj) in self._syntheticCaretEvents:
+			self._syntheticCaretEvents.discard(id(obj))
+			return
+		if self._selectionChange is not None and self._selectionChange[0] is obj:
+			latency: float = time.perf_counter() - self._selectionChange[1]
+			self._selectionChange = None
+			if latency <= self.MAX_CARET_LATENCY:
+				self._record(obj, lambda statistics: statistics.recordCaretLatency(latency))
+			return
+		if shownSelection is not None:
+			# Selection is not queried for the check, but compared when braille
+			# queries it.
+			self._caretCheck = (obj, shownSelection)
+
+	def reviewUpdate(self, appModule: AppModule) -> _ReviewUpdate | None:
+		"""Gets learned way to update review position.
+		:param appModule: app module of application
+		:return: learned way, or None if there is not enough data
+		"""
+		statistics: _AppStatistics | None = self.statistics.get(appModule.appName)
+		return statistics.reviewUpdate() if statistics is not None else None
+
+	def report(self) -> str:
+		"""Creates report of learned strategies.
+		:return: report as text
+		"""
+		lines: list[str] = ["Show selection strategies (times in milliseconds):"]
+		lines.extend(
+			f"{appName}: {getattr(statistics.reviewUpdate(), 'value', 'rules')}, selection query {statistics.selectionQueryTime:.1f}, "
+			f"caret latency {statistics.caretLatency:.1f}, "
+			f"spurious caret events {statistics.spuriousCaretEvents}/{statistics.caretChecks}"
+			for appName, statistics in sorted(self.statistics.items())
+		)
+		return "\n".join(lines)
+
+
+#: Strategy learner, None when adaptive strategy is disabled.
+learner: _StrategyLearner | None = None
+
+
+def _getAppPolicy(appModule: AppModule) -> _AppPolicy:
+	"""Gets policy of application.
+	Policy is resolved once per app module and configuration profile, and
+	cached on app module. Rules are used until enough behaviour of
+	application has been measured.
+	:param appModule: app module of application
+	:return: policy which applies to application
+	"""
+	cached: tuple[int, _AppPolicy] | None = getattr(appModule, "_showSelectionPolicy", None)
+	if cached is not None and cached[0] == _policyGeneration:
+		return cached[1]
+	policy: _AppPolicy = next(
+		(rule.policy for rule in _APP_POLICY_RULES if rule.appName == appModule.appName and rule.condition()),
+		_DEFAULT_POLICY,
+	)
+	reviewUpdate: _ReviewUpdate | None = learner.reviewUpdate(appModule) if learner is not None else None
+	if reviewUpdate is not None and reviewUpdate != policy.reviewUpdate:
+		policy = dataclasses.replace(policy, reviewUpdate=reviewUpdate)
+	appModule._showSelectionPolicy = (_policyGeneration, policy)
+	return policy
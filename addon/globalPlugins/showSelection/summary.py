@@ -0,0 +1,200 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Counting of characters, words and lines of selected text."""
+
+import addonHandler
+import textInfos
+import queueHandler
+import _ctypes
+import collections
+import re
+import time
+
+from logHandler import log
+from NVDAObjects import NVDAObject
+from typing import (
+	Callable,
+	Iterator,
+)
+
+from .spans import (
+	_Span,
+)
+
+addonHandler.initTranslation()
+
+
+class _SelectionSummary:
+	"""Statistics of selected text, which are counted chunk by chunk."""
+
+	#: Number of characters at start and end of selection which are reported.
+	CONTEXT_LENGTH: int = 40
+	_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+	_WORD = re.compile(r"\S+")
+
+	def __init__(self):
+		self.characters: int = 0
+		self.words: int = 0
+		self.lineBreaks: int = 0
+		self.start: str = ""
+		self.end: str = ""
+		#: Whether whole selection has been counted.
+		self.complete: bool = False
+
+	@property
+	def lines(self) -> int:
+		"""Number of lines, including line which is not ended with line break."""
+		if not self.end:
+			return 0
+		return self.lineBreaks + (self.end[-1] not in "\r\n")
+
+	def add(self, text: str) -> None:
+		"""Adds next chunk of selected text to statistics.
+		:param text: chunk of text
+		"""
+		if not text:
+			return
+		self.characters += len(text)
+		self.words += len(self._WORD.findall(text))
+		self.lineBreaks += len(self._LINE_BREAK.findall(text))
+		if self.end:
+			# Word or line break which continues from previous chunk is counted once.
+			if not self.end[-1].isspace() and not text[0].isspace():
+				self.words -= 1
+			if self.end[-1] == "\r" and text[0] == "\n":
+				self.lineBreaks -= 1
+		if len(self.start) < self.CONTEXT_LENGTH:
+			self.start = (self.start + text)[: self.CONTEXT_LENGTH]
+		self.end = (self.end + text)[-self.CONTEXT_LENGTH :]
+
+	def message(self) -> str:
+		"""Gets statistics as message for user.
+		:return: message
+		"""
+		# Translators: Reports statistics of selected text.
+		return _(
+			"{characters} characters, {words} words, {lines} lines. Starts with {start}. Ends with {end}"
+		).format(
+			characters=self.characters,
+			words=self.words,
+			lines=self.lines,
+			start=self.start.strip(),
+			end=self.end.strip(),
+		)
+
+
+def _selectionChunks(selection: _Span, length: int) -> Iterator[str]:
+	"""Gets text of selection in chunks.
+	:param selection: selection
+	:param length: length of chunk in characters for offset based selection,
+	other selections are read paragraph by paragraph
+	:return: iterator of chunks
+	"""
+	if selection.start is not None:
+		for start in range(selection.start, selection.end, length):
+			yield selection.makeTextInfo(start, min(start + length, selection.end)).text
+		return
+	info: textInfos.TextInfo = selection.makeTextInfo()
+	chunk: textInfos.TextInfo = info.copy()
+	chunk.collapse()
+	while chunk.compareEndPoints(info, "startToEnd") < 0:
+		moved: int = chunk.move(textInfos.UNIT_PARAGRAPH, 1, endPoint="end")
+		if not moved or chunk.compareEndPoints(info, "endToEnd") > 0:
+			chunk.setEndPoint(info, "endToEnd")
+		yield chunk.text
+		chunk.collapse(end=True)
+
+
+class _SelectionSummarizer:
+	"""Counts statistics of selection in chunks in main thread, so that
+	NVDA stays responsive when large selection is counted. Counting is
+	cancelled when selection changes, and statistics of latest selections are
+	cached.
+	"""
+
+	#: Length of chunk in characters.
+	CHUNK_LENGTH: int = 10000
+	#: Seconds spent in counting before other events are processed.
+	TIME_BUDGET: float = 0.01
+	#: Number of cached statistics.
+	CACHE_SIZE: int = 8
+
+	def __init__(self):
+		self._selection: _Span | None = None
+		self._summary: _SelectionSummary | None = None
+		self._chunks: Iterator[str] | None = None
+		self._onComplete: Callable[[_SelectionSummary], None] | None = None
+		self._cache: collections.deque[tuple[_Span, _SelectionSummary]] = collections.deque(
+			maxlen=self.CACHE_SIZE
+		)
+
+	def summarize(
+		self,
+		selection: _Span,
+		onComplete: Callable[[_SelectionSummary], None],
+	) -> _SelectionSummary:
+		"""Gets statistics of selection, and starts counting them if needed.
+		:param selection: selection
+		:param onComplete: called when counting started by this call completes
+		:return: statistics which are complete if they were cached, otherwise
+		statistics counted so far
+		"""
+		for cachedSelection, summary in self._cache:
+			if cachedSelection.sameRange(selection):
+				return summary
+		if self._selection is not None and self._selection.sameRange(selection):
+			return self._summary
+		self.cancel()
+		self._selection = selection
+		self._summary = _SelectionSummary()
+		self._chunks = _selectionChunks(selection, self.CHUNK_LENGTH)
+		self._onComplete = onComplete
+		queueHandler.queueFunction(queueHandler.eventQueue, self._count, self._chunks)
+		return self._summary
+
+	def cancel(self) -> None:
+		"""Cancels counting."""
+		self._selection = self._summary = self._chunks = self._onComplete = None
+
+	def invalidate(self) -> None:
+		"""Cancels counting and discards cached statistics, for example when
+		text has changed.
+		"""
+		self.cancel()
+		self._cache.clear()
+
+	def release(self, obj: NVDAObject) -> None:
+		"""Discards cached statistics of other objects, so that their text infos
+		are not kept alive.
+		:param obj: object whose statistics are kept
+		"""
+		kept: list[tuple[_Span, _SelectionSummary]] = [entry for entry in self._cache if entry[0].obj is obj]
+		self._cache.clear()
+		self._cache.extend(kept)
+
+	def _count(self, chunks: Iterator[str]) -> None:
+		# Counting has been cancelled or restarted.
+		if chunks is not self._chunks:
+			return
+		deadline: float = time.perf_counter() + self.TIME_BUDGET
+		try:
+			for chunk in chunks:
+				self._summary.add(chunk)
+				if time.perf_counter() > deadline:
+					queueHandler.queueFunction(queueHandler.eventQueue, self._count, chunks)
+					return
+		except (LookupError, RuntimeError, _ctypes.COMError):
+			log.debugWarning("Cannot count selection", exc_info=True)
+			self.cancel()
+			return
+		summary: _SelectionSummary = self._summary
+		onComplete: Callable[[_SelectionSummary], None] = self._onComplete
+		summary.complete = True
+		self._cache.append((self._selection, summary))
+		self.cancel()
+		onComplete(summary)
+
+
+_summarizer = _SelectionSummarizer()
@@ -0,0 +1,138 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Recording of selection traces for replay."""
+
+import api
+import textInfos
+import _ctypes
+import struct
+import time
+
+from NVDAObjects import NVDAObject
+from textInfos.offsets import (
+	OffsetsTextInfo,
+)
+from treeInterceptorHandler import DocumentTreeInterceptor
+
+from .spans import (
+	_Span,
+)
+from .selection import (
+	_selectionCache,
+)
+
+
+class _TraceRecorder:
+	"""Records caret, focus, selection movement and region update events to a
+	binary trace file, so that sessions can be replayed with benchmarks/replay.py.
+	"""
+
+	MAGIC: bytes = b"SSTR"
+	VERSION: int = 1
+	HEADER: struct.Struct = struct.Struct("<4sH")
+	#: kind, flags, seconds since start, duration in microseconds, object,
+	#: selection start, selection end, review position, unit, direction
+	RECORD: struct.Struct = struct.Struct("<BBdfIiiiBb")
+	CARET: int = 1
+	GAIN_FOCUS: int = 2
+	SELECTION_MOVEMENT: int = 3
+	UPDATE: int = 4
+	#: Flag of objects in browse mode.
+	FLAG_BROWSE_MODE: int = 1
+	#: Flag of selections which are anchored at start.
+	FLAG_ANCHORED_AT_START: int = 2
+	#: Flag of caret events queued by this add-on.
+	FLAG_SYNTHETIC: int = 4
+	#: Units of selection movement scripts. Other movements are recorded as
+	#: UNIT_OTHER.
+	UNITS: tuple[str, ...] = (
+		textInfos.UNIT_CHARACTER,
+		textInfos.UNIT_WORD,
+		textInfos.UNIT_LINE,
+		textInfos.UNIT_PARAGRAPH,
+	)
+	UNIT_OTHER: int = 255
+
+	def __init__(self, path: str):
+		self.path: str = path
+		self._file = open(path, "wb")
+		self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+		self._start: float = time.perf_counter()
+		#: Objects for which this add-on has queued caret event.
+		self.syntheticCaretEvents: set[int] = set()
+
+	def close(self) -> None:
+		"""Closes trace file."""
+		self._file.close()
+
+	@staticmethod
+	def _offset(span: "_Span | None") -> tuple[int, int]:
+		if span is None or span.start is None:
+			return -1, -1
+		return span.start, span.end
+
+	def _objectKey(self, obj: NVDAObject | DocumentTreeInterceptor) -> tuple[int, int]:
+		flags: int = self.FLAG_ANCHORED_AT_START if getattr(obj, "isTextSelectionAnchoredAtStart", True) else 0
+		if isinstance(obj, DocumentTreeInterceptor):
+			return obj.rootNVDAObject.windowHandle & 0xFFFFFFFF, flags | self.FLAG_BROWSE_MODE
+		return (getattr(obj, "windowHandle", 0) or 0) & 0xFFFFFFFF, flags
+
+	def record(
+		self,
+		kind: int,
+		obj: NVDAObject | DocumentTreeInterceptor,
+		selection: "_Span | None" = None,
+		duration: float = 0.0,
+		unit: str | None = None,
+		direction: int | None = None,
+		flags: int = 0,
+	) -> None:
+		"""Records event.
+		:param kind: kind of event
+		:param obj: object of event
+		:param selection: selection after event, if known
+		:param duration: duration in seconds, if measured
+		:param unit: unit of selection movement
+		:param direction: direction of selection movement
+		:param flags: additional flags
+		"""
+		objectKey, objectFlags = self._objectKey(obj)
+		flags |= objectFlags
+		start, end = self._offset(selection)
+		reviewPos: textInfos.TextInfo | None = api.getReviewPosition()
+		review: int = reviewPos._startOffset if isinstance(reviewPos, OffsetsTextInfo) else -1
+		self._file.write(
+			self.RECORD.pack(
+				kind,
+				flags,
+				time.perf_counter() - self._start,
+				duration * 1000000,
+				objectKey,
+				start,
+				end,
+				review,
+				self.UNITS.index(unit) if unit in self.UNITS else self.UNIT_OTHER,
+				direction or 0,
+			)
+		)
+
+	def recordSelection(self, kind: int, obj: NVDAObject | DocumentTreeInterceptor) -> None:
+		"""Records event with current selection of object.
+		:param kind: kind of event
+		:param obj: object of event
+		"""
+		try:
+			selection: _Span | None = _Span(_selectionCache.get(obj))
+		except (LookupError, RuntimeError, NotImplementedError, _ctypes.COMError):
+			selection = None
+		flags: int = 0
+		if kind == self.CARET and id(obj) in self.syntheticCaretEvents:
+			self.syntheticCaretEvents.discard(id(obj))
+			flags = self.FLAG_SYNTHETIC
+		self.record(kind, obj, selection, flags=flags)
+
+
+#: Trace recorder, None when trace is not recorded.
+recorder: _TraceRecorder | None = None
@@ -0,0 +1,144 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Caching of braille translations."""
+
+import textInfos
+import louis
+import collections
+import sys
+
+from braille.regions.textInfo import (
+	ReviewTextInfoRegion,
+)
+from types import ModuleType
+
+from . import (
+	instrumentation,
+)
+
+
+class _TranslationCache:
+	"""Least recently used cache of braille translations.
+	Same reading unit is translated again when it is rendered without and with
+	selection, and when braille display is scrolled back and forth. Cache
+	replaces louisHelper module in module of braille region class, and it is
+	used only when review region is rendered by this add-on. Cursor and
+	selection are not part of key unless cursor affects translation, because
+	region marks them after translation.
+	"""
+
+	#: Maximum total length of cached texts, so that long reading units do
+	#: not fill memory.
+	MAX_CHARACTERS: int = 1000000
+
+	def __init__(self, louisHelper: ModuleType, size: int):
+		self._louisHelper = louisHelper
+		self._size: int = size
+		self._translations: collections.OrderedDict[
+			tuple, tuple[list[int], list[int], list[int], int | None]
+		] = collections.OrderedDict()
+		self._characters: int = 0
+		#: Whether translations are cached, set while review region is rendered.
+		self.active: bool = False
+		self.hits: int = 0
+		self.misses: int = 0
+		self.evictions: int = 0
+
+	def __getattr__(self, name: str):
+		return getattr(self._louisHelper, name)
+
+	def translate(
+		self,
+		tableList: list[str],
+		inbuf: str,
+		typeform: list[int] | None = None,
+		cursorPos: int | None = None,
+		mode: int = 0,
+	) -> tuple[list[int], list[int], list[int], int | None]:
+		"""Translates text to braille, or gets earlier translation of it.
+		Parameters and return value are same as in louisHelper.translate.
+		"""
+		if not self.active:
+			return self._louisHelper.translate(tableList, inbuf, typeform=typeform, cursorPos=cursorPos, mode=mode)
+		cursorAffectsTranslation: bool = bool(mode & louis.compbrlAtCursor)
+		key: tuple = (
+			tuple(tableList),
+			inbuf,
+			tuple(typeform) if typeform else None,
+			mode,
+			cursorPos if cursorAffectsTranslation else None,
+		)
+		translation: tuple[list[int], list[int], list[int], int | None] | None = self._translations.get(key)
+		if translation is not None:
+			self.hits += 1
+			self._translations.move_to_end(key)
+			brailleCells, brailleToRawPos, rawToBraillePos, brailleCursorPos = translation
+			if cursorPos is None:
+				brailleCursorPos = None
+			elif not cursorAffectsTranslation:
+				brailleCursorPos = rawToBraillePos[cursorPos] if cursorPos < len(rawToBraillePos) else None
+		else:
+			self.misses += 1
+			brailleCells, brailleToRawPos, rawToBraillePos, brailleCursorPos = self._louisHelper.translate(
+				tableList, inbuf, typeform=typeform, cursorPos=cursorPos, mode=mode
+			)
+			self._store(key, (brailleCells.copy(), brailleToRawPos.copy(), rawToBraillePos.copy(), brailleCursorPos))
+		# Region marks selection to cells, so cached lists are not handed out.
+		return brailleCells.copy(), brailleToRawPos.copy(), rawToBraillePos.copy(), brailleCursorPos
+
+	def _store(self, key: tuple, translation: tuple[list[int], list[int], list[int], int | None]) -> None:
+		characters: int = len(key[1])
+		if characters > self.MAX_CHARACTERS:
+			return
+		self._translations[key] = translation
+		self._characters += characters
+		while len(self._translations) > self._size or self._characters > self.MAX_CHARACTERS:
+			evictedKey, _translation = self._translations.popitem(last=False)
+			self._characters -= len(evictedKey[1])
+			self.evictions += 1
+
+	def report(self) -> str:
+		"""Creates report of cache usage.
+		:return: report as text
+		"""
+		return (
+			f"Translation cache: {len(self._translations)} entries, {self._characters} characters, "
+			f"hits {self.hits}, misses {self.misses}, evictions {self.evictions}"
+		)
+
+
+#: Translation cache, None when translations are not cached.
+cache: _TranslationCache | None = None
+
+
+def _regionModule() -> ModuleType | None:
+	"""Gets module in which braille region class is defined.
+	:return: module, or None if it does not use louisHelper module
+	"""
+	for cls in ReviewTextInfoRegion.__mro__:
+		if cls.__name__ == "Region":
+			module = sys.modules.get(cls.__module__)
+			if hasattr(module, "louisHelper"):
+				return module
+	return None
+
+
+def _render(self, selection: textInfos.TextInfo | None) -> None:
+	"""Renders region with update function of parent class.
+	:param selection: selection which is used by parent class, or None to
+	let _selectionHelper function define it
+	"""
+	if instrumentation.current is not None:
+		instrumentation.current.countProviderCall("render")
+	self._fakeSelection = selection
+	translationCache: _TranslationCache | None = cache
+	if translationCache is None:
+		super(ReviewTextInfoRegion, self).update()
+		return
+	translationCache.active = True
+	try:
+		super(ReviewTextInfoRegion, self).update()
+	finally:
+		translationCache.active = False
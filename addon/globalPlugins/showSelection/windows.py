@@ -0,0 +1,102 @@
+# Show selection when braille tethered to review
+# Copyright 2024 Burman's Computer and Education Ltd.
+# Released under GPL v2.
+
+"""Rendering long reading units in parts."""
+
+import textInfos
+
+from textInfos.offsets import (
+	Offsets,
+	OffsetsTextInfo,
+)
+
+from . import (
+	settings,
+)
+
+
+class _WindowedTextInfo(OffsetsTextInfo):
+	"""Offset based text info whose lines and paragraphs are split into
+	windows of limited length. Region expands only window containing review
+	position, so text of huge reading unit is not fetched and translated at
+	once, and moving to next or previous line moves to next or previous window.
+	Subclasses are created for each offset based text info class.
+	"""
+
+	#: Maximum length of window.
+	windowLength: int = 0
+	#: Class which this class splits into windows.
+	unwindowedClass: type[OffsetsTextInfo] = OffsetsTextInfo
+
+	def _windowStart(self, unitStart: int, unitEnd: int, index: int) -> int:
+		"""Gets start of window of reading unit. Windows start from start of
+		reading unit at multiples of window length, which are moved back to start
+		of word when it is within half of window, otherwise to start of
+		character, so that window does not split word or character.
+		:param unitStart: start offset of reading unit
+		:param unitEnd: end offset of reading unit
+		:param index: index of window
+		:return: start offset of window
+		"""
+		edge: int = unitStart + index * self.windowLength
+		if index <= 0 or edge >= unitEnd:
+			return min(edge, unitEnd)
+		wordStart: int = super()._getUnitOffsets(textInfos.UNIT_WORD, edge)[0]
+		if edge - self.windowLength // 2 < wordStart <= edge:
+			return wordStart
+		characterStart: int = super()._getUnitOffsets(textInfos.UNIT_CHARACTER, edge)[0]
+		if edge - self.windowLength < characterStart <= edge:
+			return characterStart
+		return edge
+
+	def _getUnitOffsets(self, unit: str, offset: int) -> tuple[int, int]:
+		start, end = super()._getUnitOffsets(unit, offset)
+		if unit in (textInfos.UNIT_LINE, textInfos.UNIT_PARAGRAPH) and end - start > self.windowLength:
+			offset = min(offset, end - 1)
+			index: int = (offset - start) // self.windowLength
+			windowEnd: int = self._windowStart(start, end, index + 1)
+			# Window edges are moved back, so offset may be in next window.
+			if offset >= windowEnd:
+				index += 1
+				windowEnd = self._windowStart(start, end, index + 1)
+			start, end = self._windowStart(start, end, index), windowEnd
+		return start, end
+
+
+#: Windowed subclasses of offset based text info classes.
+_windowedClasses: dict[type[OffsetsTextInfo], type[_WindowedTextInfo]] = {}
+
+
+def _windowed(info: textInfos.TextInfo) -> textInfos.TextInfo:
+	"""Gets text info whose lines and paragraphs are split into windows.
+	:param info: text info
+	:return: windowed copy of offset based text info, or info itself if
+	windows are disabled or text info is not offset based
+	"""
+	windowLength: int = settings.current.readingUnitWindow
+	if not windowLength or not isinstance(info, OffsetsTextInfo):
+		return info
+	if isinstance(info, _WindowedTextInfo) and info.windowLength == windowLength:
+		return info
+	infoClass: type[OffsetsTextInfo] = info.unwindowedClass if isinstance(info, _WindowedTextInfo) else type(info)
+	windowedClass: type[_WindowedTextInfo] | None = _windowedClasses.get(infoClass)
+	if windowedClass is None or windowedClass.windowLength != windowLength:
+		windowedClass = _windowedClasses[infoClass] = type(
+			f"Windowed{infoClass.__name__}",
+			(_WindowedTextInfo, infoClass),
+			{"windowLength": windowLength, "unwindowedClass": infoClass},
+		)
+	return windowedClass(info.obj, Offsets(info._startOffset, info._endOffset))
+
+
+def _unwindowed(info: textInfos.TextInfo) -> textInfos.TextInfo:
+	"""Gets text info which is not split into windows, so that windows do not
+	leak to review position.
+	:param info: text info
+	:return: copy of info as instance of its original class, or info itself if
+	it is not windowed
+	"""
+	if not isinstance(info, _WindowedTextInfo):
+		return info
+	return info.unwindowedClass(info.obj, Offsets(info._startOffset, info._endOffset))
@@ -0,0 +1,441 @@
+"""Benchmarks selection hooks of the add-on against synthetic documents.
+
+Usage: python benchmarks/benchmark.py [--sizes 1K,1M,50M] [--steps 200] [--window 0] [--json FILE]
+	[--record-output FILE | --check-output FILE]
+"""
+
+import argparse
+import collections
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import environment
+
+Operation = Callable[[], None]
+#: Workload gets document size and number of steps, and returns operations to time.
+Workload = Callable[[int, int], list[Operation]]
+
+_UNITS: dict[str, int] = {"K": 1024, "M": 1024 * 1024}
+
+
+def parseSize(size: str) -> int:
+	"""Parses size such as 1K or 50M.
+	:param size: size with optional K or M suffix
+	:return: size in characters
+	"""
+	size = size.strip().upper()
+	if size[-1] in _UNITS:
+		return int(float(size[:-1]) * _UNITS[size[-1]])
+	return int(size)
+
+
+def shiftArrowSweep(size: int, steps: int) -> list[Operation]:
+	"""Selection is extended character by character, as with shift+right arrow."""
+	from documents import Document, makeText
+
+	document = Document(makeText(size))
+	environment.focus(document)
+	anchor: int = size // 2
+
+	def extend(end: int) -> Operation:
+		def operation() -> None:
+			document.select(anchor, end)
+			environment.caret(document)
+
+		return operation
+
+	return [extend(min(anchor + step, size)) for step in range(1, steps + 1)]
+
+
+def selectAllAndPan(size: int, steps: int) -> list[Operation]:
+	"""Everything is selected, and review cursor is moved line by line."""
+	from documents import Document, makeText
+
+	document = Document(makeText(size))
+	environment.focus(document)
+	# Caret at start of document so that review cursor can move forward.
+	document.select(0, size, anchoredAtStart=False)
+	environment.caret(document)
+
+	def pan() -> None:
+		environment.region().nextLine()
+		environment.flush()
+
+	return [pan] * steps
+
+
+def routeWithinSelection(size: int, steps: int) -> list[Operation]:
+	"""Routing buttons are pressed within selected text."""
+	from documents import Document, makeText
+
+	document = Document(makeText(size))
+	environment.focus(document)
+	document.select(0, min(size, 2000))
+	environment.caret(document)
+	environment.region().previousLine()
+	environment.flush()
+
+	def route(braillePos: int) -> Operation:
+		def operation() -> None:
+			region = environment.region()
+			region.routeTo(min(braillePos, len(region.brailleCells) - 1))
+			environment.flush()
+
+		return operation
+
+	return [route(step % 40) for step in range(steps)]
+
+
+def focusSwitch(size: int, steps: int) -> list[Operation]:
+	"""Focus moves between two documents which both have selection."""
+	from documents import Document, makeText
+
+	documents = [Document(makeText(size), windowHandle=handle) for handle in (1, 2)]
+	for document in documents:
+		environment.focus(document)
+		document.select(0, min(size, 500))
+		environment.caret(document)
+
+	def switch(document) -> Operation:
+		return lambda: environment.focus(document)
+
+	return [switch(documents[step % 2]) for step in range(steps)]
+
+
+def longLineSweep(size: int, steps: int) -> list[Operation]:
+	"""Selection is extended character by character within document which is
+	one line, such as minified code.
+	"""
+	from documents import Document, makeText
+
+	document = Document(makeText(size).replace("\n", " "))
+	environment.focus(document)
+	anchor: int = size // 2
+
+	def extend(end: int) -> Operation:
+		def operation() -> None:
+			document.select(anchor, end)
+			environment.caret(document)
+
+		return operation
+
+	return [extend(min(anchor + step, size)) for step in range(1, steps + 1)]
+
+
+def browseModeSelectAndPan(size: int, steps: int) -> list[Operation]:
+	"""Selection is extended line by line in browse mode, and review cursor is
+	moved line by line within selected text after each extension.
+	"""
+	import textInfos
+	from documents import BrowseModeDocument, makeText
+
+	document = BrowseModeDocument(makeText(size))
+	environment.focus(document)
+
+	def extend() -> None:
+		document._selectionMovementScriptHelper(textInfos.UNIT_LINE, 1)
+		environment.flush()
+
+	def pan() -> None:
+		environment.region().previousLine()
+		environment.flush()
+
+	return [extend if step % 2 == 0 else pan for step in range(steps)]
+
+
+def uiaSelectAndPan(size: int, steps: int) -> list[Operation]:
+	"""Everything is selected in control accessed with UIA, and review cursor is
+	moved line by line.
+	"""
+	from documents import UIADocument, makeText
+
+	document = UIADocument(makeText(size))
+	environment.focus(document)
+	document.select(0, size, anchoredAtStart=False)
+	environment.caret(document)
+
+	def pan() -> None:
+		environment.region().nextLine()
+		environment.flush()
+
+	return [pan] * steps
+
+
+def multiSelectAndPan(size: int, steps: int) -> list[Operation]:
+	"""All occurrences of a word are selected in Scintilla control, and review
+	cursor is moved line by line.
+	"""
+	from documents import ScintillaDocument, makeText
+
+	document = ScintillaDocument(makeText(size))
+	environment.focus(document)
+	document.selectOccurrences("amet")
+	environment.caret(document)
+
+	def pan() -> None:
+		environment.region().nextLine()
+		environment.flush()
+
+	return [pan] * steps
+
+
+def multiSelectCaretEvents(size: int, steps: int) -> list[Operation]:
+	"""All occurrences of a word are selected in Scintilla control, and
+	application fires caret events which do not change selection.
+	"""
+	from documents import ScintillaDocument, makeText
+
+	document = ScintillaDocument(makeText(size))
+	environment.focus(document)
+	document.selectOccurrences("amet")
+	environment.caret(document)
+
+	def caret() -> None:
+		environment.caret(document)
+
+	return [caret] * steps
+
+
+def nonAsciiSweep(size: int, steps: int) -> list[Operation]:
+	"""Selection is extended character by character within text which has
+	accented letters and characters outside basic multilingual plane, and whose
+	offsets are UTF-16 code units as with IAccessible2.
+	"""
+	from documents import NON_ASCII_WORDS, Document, makeText
+
+	document = Document(makeText(size, words=NON_ASCII_WORDS), encoding="utf_16_le")
+	environment.focus(document)
+	anchor: int = size // 2
+
+	def extend(end: int) -> Operation:
+		def operation() -> None:
+			document.select(document.offset(anchor), document.offset(end))
+			environment.caret(document)
+
+		return operation
+
+	return [extend(min(anchor + step, size)) for step in range(1, steps + 1)]
+
+
+def nonAsciiRoute(size: int, steps: int) -> list[Operation]:
+	"""Routing buttons are pressed within selected text which has characters
+	outside basic multilingual plane, and whose offsets are UTF-16 code units.
+	"""
+	from documents import NON_ASCII_WORDS, Document, makeText
+
+	document = Document(makeText(size, words=NON_ASCII_WORDS), encoding="utf_16_le")
+	environment.focus(document)
+	document.select(0, document.offset(min(size, 2000)))
+	environment.caret(document)
+	environment.region().previousLine()
+	environment.flush()
+
+	def route(braillePos: int) -> Operation:
+		def operation() -> None:
+			region = environment.region()
+			region.routeTo(min(braillePos, len(region.brailleCells) - 1))
+			environment.flush()
+
+		return operation
+
+	return [route(step % 40) for step in range(steps)]
+
+
+def nonAsciiMultiSelectAndPan(size: int, steps: int) -> list[Operation]:
+	"""All occurrences of a word are selected in Scintilla control whose offsets
+	are UTF-8 bytes, and review cursor is moved line by line.
+	"""
+	from documents import NON_ASCII_WORDS, ScintillaDocument, makeText
+
+	document = ScintillaDocument(makeText(size, words=NON_ASCII_WORDS), encoding="utf_8")
+	environment.focus(document)
+	document.selectOccurrences("kůň")
+	environment.caret(document)
+
+	def pan() -> None:
+		environment.region().nextLine()
+		environment.flush()
+
+	return [pan] * steps
+
+
+WORKLOADS: dict[str, Workload] = {
+	"shiftArrowSweep": shiftArrowSweep,
+	"selectAllAndPan": selectAllAndPan,
+	"routeWithinSelection": routeWithinSelection,
+	"focusSwitch": focusSwitch,
+	"longLineSweep": longLineSweep,
+	"browseModeSelectAndPan": browseModeSelectAndPan,
+	"uiaSelectAndPan": uiaSelectAndPan,
+	"multiSelectAndPan": multiSelectAndPan,
+	"multiSelectCaretEvents": multiSelectCaretEvents,
+	"nonAsciiSweep": nonAsciiSweep,
+	"nonAsciiRoute": nonAsciiRoute,
+	"nonAsciiMultiSelectAndPan": nonAsciiMultiSelectAndPan,
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+	"""Gets percentile of values.
+	:param values: sorted values
+	:param fraction: percentile as fraction
+	:return: value at percentile
+	"""
+	return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(
+	name: str,
+	size: int,
+	steps: int,
+	traceMemory: bool,
+	outputs: list[list[object]] | None = None,
+) -> dict[str, object]:
+	"""Runs workload and measures its operations.
+	:param name: name of workload
+	:param size: document size
+	:param steps: number of operations
+	:param traceMemory: whether peak memory is measured with tracemalloc
+	:param outputs: if given, braille output after each operation is appended
+	:return: results
+	"""
+	import louisHelper
+	from textInfos import providerCalls
+
+	operations: list[Operation] = WORKLOADS[name](size, steps)
+	environment.idle()
+	calls: collections.Counter[str] = collections.Counter()
+	idleCalls: collections.Counter[str] = collections.Counter()
+	translations: int = louisHelper.translations
+	latencies: list[float] = []
+	blocks: list[int] = []
+	for operation in operations:
+		allocatedBlocks: int = sys.getallocatedblocks()
+		before: collections.Counter[str] = collections.Counter(providerCalls)
+		start: float = time.perf_counter()
+		operation()
+		latencies.append((time.perf_counter() - start) * 1000000)
+		blocks.append(sys.getallocatedblocks() - allocatedBlocks)
+		calls.update(collections.Counter(providerCalls) - before)
+		# Work which is done when NVDA is idle is not part of latency.
+		before = collections.Counter(providerCalls)
+		environment.idle()
+		idleCalls.update(collections.Counter(providerCalls) - before)
+		if outputs is not None:
+			outputs.append(environment.output())
+	latencies.sort()
+	result: dict[str, object] = {
+		"workload": name,
+		"size": size,
+		"operations": len(operations),
+		"p50": percentile(latencies, 0.5),
+		"p90": percentile(latencies, 0.9),
+		"p99": percentile(latencies, 0.99),
+		"max": latencies[-1],
+		# Net change of allocated blocks, which is negative when operation frees
+		# more than it allocates.
+		"netBlocksPerOperation": statistics.mean(blocks),
+		"providerCallsPerOperation": {key: count / len(operations) for key, count in calls.items()},
+		"idleProviderCallsPerOperation": {key: count / len(operations) for key, count in idleCalls.items()},
+		"translationsPerOperation": (louisHelper.translations - translations) / len(operations),
+	}
+	if traceMemory:
+		operations = WORKLOADS[name](size, steps)
+		tracemalloc.start()
+		for operation in operations:
+			operation()
+			environment.idle()
+		result["peakKiB"] = tracemalloc.get_traced_memory()[1] / 1024
+		tracemalloc.stop()
+	return result
+
+
+def compareOutputs(expected: dict[str, list[list[object]]], actual: dict[str, list[list[object]]]) -> list[str]:
+	"""Compares braille output of workloads.
+	:param expected: outputs by workload and size, recorded earlier
+	:param actual: outputs of this run
+	:return: description of first difference of each workload which differs
+	"""
+	mismatches: list[str] = []
+	for key, outputs in actual.items():
+		if key not in expected:
+			mismatches.append(f"{key} was not recorded")
+			continue
+		if len(outputs) != len(expected[key]):
+			mismatches.append(f"{key} has {len(outputs)} operations, recorded {len(expected[key])}")
+			continue
+		for index, (old, new) in enumerate(zip(expected[key], outputs)):
+			if old != new:
+				mismatches.append(
+					f"{key} operation {index}: review offset {new[0]}, selection {new[1]}-{new[2]}, "
+					f"recorded review offset {old[0]}, selection {old[1]}-{old[2]}"
+					+ (", cells differ" if old[3] != new[3] else "")
+				)
+				break
+	return mismatches
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--sizes", default="1K,1M,50M", help="comma separated document sizes")
+	parser.add_argument("--steps", type=int, default=200, help="operations per workload")
+	parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma separated workloads")
+	parser.add_argument("--trace-memory", action="store_true", help="measure peak memory with tracemalloc")
+	parser.add_argument("--json", help="write results to this file")
+	parser.add_argument(
+		"--window", type=int, default=0, help="maximum characters of reading unit rendered at once"
+	)
+	parser.add_argument(
+		"--record-output", help="write braille output after each operation to this file, for --check-output"
+	)
+	parser.add_argument(
+		"--check-output",
+		help="compare braille output after each operation with file written by --record-output, "
+		"and exit with status 1 if it differs",
+	)
+	args = parser.parse_args()
+	environment.load({"readingUnitWindow": args.window})
+	results: list[dict[str, object]] = []
+	outputs: dict[str, list[list[object]]] = {}
+	recordOutputs: bool = bool(args.record_output or args.check_output)
+	print(
+		f"{'workload':<22}{'size':>10}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}"
+		f"{'net blk':>8}{'calls':>8}{'idle':>8}{'transl':>8}"
+	)
+	for size in map(parseSize, args.sizes.split(",")):
+		for name in args.workloads.split(","):
+			workloadOutputs: list[list[object]] | None = [] if recordOutputs else None
+			result = run(name, size, args.steps, args.trace_memory, workloadOutputs)
+			if workloadOutputs is not None:
+				outputs[f"{name}/{size}"] = workloadOutputs
+			results.append(result)
+			print(
+				f"{name:<22}{size:>10}{result['p50']:>10.0f}{result['p90']:>10.0f}{result['p99']:>10.0f}"
+				f"{result['max']:>10.0f}{result['netBlocksPerOperation']:>8.1f}"
+				f"{sum(result['providerCallsPerOperation'].values()):>8.1f}"
+				f"{sum(result['idleProviderCallsPerOperation'].values()):>8.1f}"
+				f"{result['translationsPerOperation']:>8.2f}"
+			)
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as file:
+			json.dump(results, file, indent="\t")
+	if args.record_output:
+		with open(args.record_output, "w", encoding="utf-8") as file:
+			json.dump(outputs, file)
+	if args.check_output:
+		with open(args.check_output, encoding="utf-8") as file:
+			expected: dict[str, list[list[object]]] = json.load(file)
+		mismatches: list[str] = compareOutputs(expected, outputs)
+		for mismatch in mismatches:
+			print(f"MISMATCH: {mismatch}")
+		if mismatches:
+			sys.exit(1)
+		print("Output matches")
+
+
+if __name__ == "__main__":
+	main()
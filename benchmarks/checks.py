@@ -0,0 +1,293 @@
+"""Checks results of helpers and hooks of the add-on directly against stand-ins
+of NVDA modules, including documents whose offsets are not characters.
+
+Usage: python benchmarks/checks.py [-v] [unittest arguments]
+"""
+
+import time
+import unittest
+
+import environment
+
+showSelection = environment.load()
+
+import api
+import config
+import textInfos
+from documents import NON_ASCII_WORDS, Document, ScintillaDocument, UIADocument, makeText
+from textInfos.offsets import Offsets
+
+
+def _configure(section: str, **values: object) -> dict[str, object]:
+	"""Changes configuration and refreshes settings of the add-on.
+	:param section: configuration section
+	:param values: new values
+	:return: previous values, for restoring them
+	"""
+	previous: dict[str, object] = {name: config.conf[section][name] for name in values}
+	config.conf[section].update(values)
+	showSelection._refreshSettings()
+	return previous
+
+
+def _expectedCursor(region) -> int:
+	"""Gets braille position of review cursor counted from characters of text."""
+	reviewPos = api.getReviewPosition()
+	readingInfo = region._readingInfo
+	contentPos: int = reviewPos._strOffset(reviewPos._startOffset) - readingInfo._strOffset(readingInfo._startOffset)
+	return region.rawToBraillePos[contentPos]
+
+
+def _expectedSelectedCells(region, ranges: list[tuple[int, int]]) -> set[int]:
+	"""Gets braille positions of characters whose offsets are within ranges."""
+	readingInfo = region._readingInfo
+	start: int = readingInfo._strOffset(readingInfo._startOffset)
+	return {
+		region.rawToBraillePos[rawPos]
+		for rawPos, contentPos in enumerate(region._rawToContentPos[: len(region.rawToBraillePos)])
+		if any(rangeStart <= readingInfo._encodedOffset(start + contentPos) < rangeEnd for rangeStart, rangeEnd in ranges)
+	}
+
+
+class ToggledSpansTest(unittest.TestCase):
+	def test_unchanged(self):
+		self.assertEqual(showSelection.rendered._toggledSpans([(2, 5)], [(2, 5)]), [])
+
+	def test_extended(self):
+		self.assertEqual(showSelection.rendered._toggledSpans([(2, 5)], [(2, 8)]), [(5, 8, True)])
+
+	def test_shrunk(self):
+		self.assertEqual(showSelection.rendered._toggledSpans([(2, 8)], [(4, 8)]), [(2, 4, False)])
+
+	def test_disjoint(self):
+		self.assertEqual(
+			showSelection.rendered._toggledSpans([(0, 2), (10, 12)], [(5, 6)]),
+			[(0, 2, False), (5, 6, True), (10, 12, False)],
+		)
+
+	def test_moved_to_adjacent(self):
+		self.assertEqual(showSelection.rendered._toggledSpans([(0, 3)], [(3, 6)]), [(0, 3, False), (3, 6, True)])
+
+
+class SelectionRangesTest(unittest.TestCase):
+	def test_merges_overlapping_and_drops_carets(self):
+		ranges = showSelection.spans._SelectionRanges([(10, 20), (5, 12), (30, 30), (25, 28)])
+		self.assertEqual((ranges.starts, ranges.ends), ([5, 25], [20, 28]))
+		self.assertEqual((len(ranges), ranges.start, ranges.end), (2, 5, 28))
+
+	def test_intersecting_is_clipped(self):
+		ranges = showSelection.spans._SelectionRanges([(0, 4), (6, 10), (20, 30)])
+		self.assertEqual(ranges.intersecting(2, 25), [(2, 4), (6, 10), (20, 25)])
+
+	def test_intersecting_excludes_touching(self):
+		ranges = showSelection.spans._SelectionRanges([(0, 4), (10, 12)])
+		self.assertEqual(ranges.intersecting(4, 10), [])
+
+
+class SelectionSummaryTest(unittest.TestCase):
+	def summarize(self, *chunks: str):
+		summary = showSelection.summary._SelectionSummary()
+		for chunk in chunks:
+			summary.add(chunk)
+		return summary
+
+	def test_chunks_count_like_whole_text(self):
+		text: str = "lorem ipsum\r\ndolor sit amet\r\nconsectetur"
+		whole = self.summarize(text)
+		for split in range(1, len(text)):
+			chunked = self.summarize(text[:split], text[split:])
+			self.assertEqual(
+				(chunked.characters, chunked.words, chunked.lines),
+				(whole.characters, whole.words, whole.lines),
+				split,
+			)
+		self.assertEqual((whole.characters, whole.words, whole.lines), (len(text), 6, 3))
+
+	def test_context(self):
+		summary = self.summarize("a" * 30, "b" * 30, "c" * 30)
+		self.assertEqual(summary.start, "a" * 30 + "b" * 10)
+		self.assertEqual(summary.end, "b" * 10 + "c" * 30)
+
+	def test_line_ended_with_line_break(self):
+		self.assertEqual(self.summarize("lorem\n", "ipsum\n").lines, 2)
+
+
+class CharacterOffsetsTest(unittest.TestCase):
+	def info(self, encoding: str | None):
+		document = Document("", encoding=encoding)
+		return document.makeTextInfo(Offsets(0, 0))
+
+	def test_one_offset_per_character(self):
+		self.assertIsNone(showSelection.rendered._characterOffsets(self.info(None), "kůň 😀"))
+		self.assertIsNone(showSelection.rendered._characterOffsets(self.info("utf_8"), "lorem"))
+		self.assertIsNone(showSelection.rendered._characterOffsets(self.info("utf_16_le"), "kůň"))
+
+	def test_astral_characters_in_utf16(self):
+		self.assertEqual(showSelection.rendered._characterOffsets(self.info("utf_16_le"), "a😀b"), [0, 1, 3, 4])
+
+	def test_multibyte_characters_in_utf8(self):
+		self.assertEqual(showSelection.rendered._characterOffsets(self.info("utf_8"), "kůň😀"), [0, 1, 3, 5, 9])
+
+
+class WindowedTextInfoTest(unittest.TestCase):
+	WINDOW: int = 50
+
+	def setUp(self):
+		self.previous = _configure("showSelection", readingUnitWindow=self.WINDOW)
+
+	def tearDown(self):
+		_configure("showSelection", **self.previous)
+
+	def windows(self, document) -> list:
+		info = showSelection.windows._windowed(document.makeTextInfo(Offsets(0, 0)))
+		self.assertIsInstance(info, showSelection.windows._WindowedTextInfo)
+		windows: list = []
+		while info._startOffset < info._getStoryLength():
+			info.expand(textInfos.UNIT_LINE)
+			windows.append(info.copy())
+			info.collapse(end=True)
+		return windows
+
+	def checkWindows(self, document) -> list:
+		windows: list = self.windows(document)
+		self.assertEqual("".join(window.text for window in windows), document.documentText)
+		for window in windows:
+			self.assertLessEqual(window._endOffset - window._startOffset, self.WINDOW * 3 // 2)
+			# Every offset within window expands to same window.
+			for offset in range(window._startOffset, window._endOffset):
+				info = window.copy()
+				info._startOffset = info._endOffset = offset
+				info.expand(textInfos.UNIT_LINE)
+				self.assertEqual((info._startOffset, info._endOffset), (window._startOffset, window._endOffset))
+		return windows
+
+	def test_windows_start_at_words(self):
+		document = Document(makeText(2000).replace("\n", " "))
+		for window in self.checkWindows(document)[1:]:
+			self.assertEqual(document.documentText[window._startOffset - 1], " ")
+
+	def test_windows_do_not_split_characters(self):
+		for encoding in ("utf_16_le", "utf_8"):
+			with self.subTest(encoding=encoding):
+				document = Document(makeText(2000, words=NON_ASCII_WORDS).replace("\n", " "), encoding=encoding)
+				self.checkWindows(document)
+
+	def test_short_line_is_not_split(self):
+		document = Document(makeText(200, lineLength=30))
+		info = showSelection.windows._windowed(document.makeTextInfo(Offsets(0, 0)))
+		info.expand(textInfos.UNIT_LINE)
+		self.assertEqual(info.text, document.documentText.split("\n")[0] + "\n")
+
+	def test_unwindowed(self):
+		document = Document(makeText(200))
+		info = showSelection.windows._unwindowed(showSelection.windows._windowed(document.makeTextInfo(Offsets(3, 5))))
+		self.assertIs(type(info), document.TextInfo)
+		self.assertEqual((info._startOffset, info._endOffset), (3, 5))
+
+
+class NonAsciiDocumentTest(unittest.TestCase):
+	"""Braille shows review cursor and selection on characters whose offsets are
+	UTF-16 code units or UTF-8 bytes.
+	"""
+
+	def document(self, encoding: str, documentClass=Document):
+		document = documentClass(makeText(3000, words=NON_ASCII_WORDS), encoding=encoding)
+		environment.focus(document)
+		return document
+
+	def checkRegion(self, ranges: list[tuple[int, int]]) -> None:
+		region = environment.region()
+		self.assertEqual(region.brailleSelectionStart, _expectedCursor(region))
+		self.assertEqual(set(environment.selectedCells(region)), _expectedSelectedCells(region, ranges))
+
+	def test_extend_selection(self):
+		for encoding in ("utf_16_le", "utf_8"):
+			with self.subTest(encoding=encoding):
+				document = self.document(encoding)
+				anchor: int = 1500
+				for end in range(anchor + 1, anchor + 40):
+					document.select(document.offset(anchor), document.offset(end))
+					environment.caret(document)
+					environment.idle()
+					self.checkRegion([document.selectionOffsets])
+
+	def test_route_within_selection(self):
+		document = self.document("utf_16_le")
+		document.select(0, document.offset(2000))
+		environment.caret(document)
+		environment.region().previousLine()
+		environment.flush()
+		for braillePos in range(40):
+			region = environment.region()
+			readingInfo = region._readingInfo
+			contentPos: int = region._rawToContentPos[region.brailleToRawPos[braillePos]]
+			expected: int = readingInfo._encodedOffset(readingInfo._strOffset(readingInfo._startOffset) + contentPos)
+			region.routeTo(braillePos)
+			environment.flush()
+			self.assertEqual(api.getReviewPosition()._startOffset, expected, braillePos)
+
+	def test_multiple_selection(self):
+		document = self.document("utf_8", ScintillaDocument)
+		document.selectOccurrences("kůň")
+		environment.caret(document)
+		for _step in range(20):
+			environment.region().nextLine()
+			environment.flush()
+			environment.idle()
+			region = environment.region()
+			self.assertEqual(set(environment.selectedCells(region)), _expectedSelectedCells(region, document.selections))
+
+
+class SettingsTest(unittest.TestCase):
+	def test_settings_changed_in_dialog_apply_on_focus(self):
+		documents = [Document(makeText(4096), windowHandle=handle) for handle in (1, 2)]
+		for document in documents:
+			environment.focus(document)
+			document.select(0, 500)
+			environment.caret(document)
+		environment.focus(documents[0])
+		environment.idle()
+		reviewCursor = {name: config.conf["reviewCursor"][name] for name in ("followCaret",)}
+		braille = {name: config.conf["braille"][name] for name in ("showSelection",)}
+		try:
+			# Settings dialog changes configuration without notification.
+			config.conf["reviewCursor"]["followCaret"] = False
+			config.conf["braille"]["showSelection"] = False
+			environment.focus(documents[1])
+			environment.focus(documents[0])
+			documents[0].select(0, 560)
+			environment.caret(documents[0])
+			environment.idle()
+			self.assertEqual(environment.output()[0], 499)
+			self.assertEqual(environment.selectedCells(environment.region()), [])
+		finally:
+			config.conf["reviewCursor"].update(reviewCursor)
+			config.conf["braille"].update(braille)
+			showSelection._refreshSettings()
+
+
+class SelectionFetcherTest(unittest.TestCase):
+	def setUp(self):
+		self.previous = _configure("showSelection", selectionTimeout=50)
+		self.fetcher = showSelection.selection._SelectionFetcher()
+
+	def tearDown(self):
+		self.fetcher.stop()
+		_configure("showSelection", **self.previous)
+
+	def test_stuck_worker_is_replaced(self):
+		stuck = UIADocument(makeText(1000), windowHandle=1)
+		stuck.selectionDelay = 0.5
+		document = UIADocument(makeText(1000), windowHandle=2)
+		document.select(5, 20)
+		with self.assertRaises(showSelection.selection._SelectionTimeout):
+			self.fetcher.fetch(stuck, 0)
+		selection = self.fetcher.fetch(document, 0)
+		self.assertEqual((selection._rangeObj.start, selection._rangeObj.end), (5, 20))
+		self.assertEqual((len(self.fetcher._stuck), len(self.fetcher._late)), (1, 0))
+		time.sleep(0.6)
+		self.assertEqual(len(self.fetcher._stuck), 0)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,166 @@
+"""Synthetic documents which provide offset based text infos to the patched hooks."""
+
+import functools
+
+import textInfos
+from appModuleHandler import AppModule
+from editableText import EditableText
+from NVDAObjects import NVDAObject
+from NVDAObjects.UIA import UIA
+from NVDAObjects.window.scintilla import Scintilla
+from textInfos import providerCalls
+from textInfos.offsets import Offsets, OffsetsTextInfo
+from virtualBuffers import VirtualBuffer
+
+_WORDS: tuple[str, ...] = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+#: Words whose characters take several bytes in UTF-8, and two code units in
+#: UTF-16 outside basic multilingual plane.
+NON_ASCII_WORDS: tuple[str, ...] = ("příliš", "žluťoučký", "kůň", "úpěl", "ďábelské", "ódy", "😀👍", "𝒳𝒴𝒵")
+
+
+def makeText(size: int, lineLength: int = 60, words: tuple[str, ...] = _WORDS) -> str:
+	"""Makes text of given size.
+	:param size: number of characters
+	:param lineLength: approximate number of characters in line
+	:param words: words which are repeated
+	:return: text whose lines end with line feed
+	"""
+	lines: list[str] = []
+	index: int = 0
+	while len(lines) < len(words):
+		lineWords: list[str] = []
+		length: int = 0
+		while length < lineLength:
+			word: str = words[index % len(words)]
+			index += 1
+			lineWords.append(word)
+			length += len(word) + 1
+		lines.append(" ".join(lineWords) + "\n")
+	block: str = "".join(lines)
+	return (block * (size // len(block) + 1))[:size]
+
+
+class DocumentTextInfo(OffsetsTextInfo):
+	pass
+
+
+@functools.cache
+def _encodedTextInfo(infoClass: type[OffsetsTextInfo], encoding: str) -> type[OffsetsTextInfo]:
+	"""Gets subclass of text info class whose offsets count code units of encoding."""
+	return type(f"{infoClass.__name__}_{encoding}", (infoClass,), {"encoding": encoding})
+
+
+class _SelectableDocument:
+	TextInfo = DocumentTextInfo
+
+	def _initDocument(self, text: str, appName: str, windowHandle: int, encoding: str | None = None) -> None:
+		if encoding is not None:
+			self.TextInfo = _encodedTextInfo(self.TextInfo, encoding)
+		self.documentText = text
+		self.selectionOffsets = (0, 0)
+		self.caretOffset = 0
+		self.appModule = AppModule(appName)
+		self.windowHandle = windowHandle
+		self.isTextSelectionAnchoredAtStart = True
+
+	def makeTextInfo(self, position):
+		providerCalls["makeTextInfo"] += 1
+		return self.TextInfo(self, position)
+
+	def offset(self, index: int) -> int:
+		"""Gets offset of character of text, which is index itself unless document
+		has encoding.
+		:param index: index of character in text
+		:return: offset
+		"""
+		return self.TextInfo(self, Offsets(0, 0))._encodedOffset(index)
+
+	def select(self, start: int, end: int, anchoredAtStart: bool = True) -> None:
+		"""Sets selection like an application does.
+		:param start: start offset
+		:param end: end offset (exclusive)
+		:param anchoredAtStart: whether caret is at end of selection
+		"""
+		self.selectionOffsets = (start, end)
+		self.isTextSelectionAnchoredAtStart = anchoredAtStart
+		self.caretOffset = end if anchoredAtStart else start
+
+
+class Document(_SelectableDocument, EditableText, NVDAObject):
+	"""Edit control which fires caret events like applications do."""
+
+	def __init__(self, text: str, appName: str = "notepad", windowHandle: int = 1, encoding: str | None = None):
+		super().__init__()
+		self._initDocument(text, appName, windowHandle, encoding)
+
+	def event_caret(self) -> None:
+		import api
+		import braille
+		import config
+
+		if config.conf["reviewCursor"]["followCaret"]:
+			api.setReviewPosition(self.makeTextInfo(textInfos.POSITION_CARET), isCaret=True)
+		braille.handler.handleCaretMove(self)
+
+	def event_gainFocus(self) -> None:
+		import api
+		import braille
+
+		api.setNavigatorObject(self)
+		braille.handler.handleGainFocus(self)
+
+
+class UIADocument(Document, UIA):
+	"""Edit control accessed with UIA, whose text infos make calls to text ranges."""
+
+	TextInfo = UIA.TextInfo
+
+	def __init__(self, text: str, appName: str = "notepad", windowHandle: int = 1):
+		super().__init__(text, appName, windowHandle)
+
+
+class ScintillaDocument(Document, Scintilla):
+	"""Scintilla edit control which can have several selections."""
+
+	def __init__(
+		self, text: str, appName: str = "notepad++", windowHandle: int = 4, encoding: str | None = None
+	):
+		super().__init__(text, appName, windowHandle, encoding)
+		self.register()
+
+	def select(self, start: int, end: int, anchoredAtStart: bool = True) -> None:
+		super().select(start, end, anchoredAtStart)
+		self.selections = ((start, end),)
+
+	def selectOccurrences(self, word: str) -> int:
+		"""Selects all occurrences of word like multiple selection does. First
+		occurrence is main selection.
+		:param word: word to select
+		:return: number of selections
+		"""
+		text: str = self.documentText
+		selections: list[tuple[int, int]] = []
+		start: int = text.find(word)
+		while start >= 0:
+			selections.append((self.offset(start), self.offset(start + len(word))))
+			start = text.find(word, start + len(word))
+		super().select(*selections[0])
+		self.selections = tuple(selections)
+		return len(selections)
+
+
+class BrowseModeDocument(_SelectableDocument, VirtualBuffer):
+	"""Browse mode document of virtual buffer, which does not fire caret events."""
+
+	TextInfo = VirtualBuffer.TextInfo
+
+	def __init__(self, text: str, appName: str = "firefox", windowHandle: int = 2):
+		self._initDocument(text, appName, windowHandle)
+		self.rootNVDAObject = self
+
+	def event_gainFocus(self) -> None:
+		import api
+		import braille
+
+		api.setNavigatorObject(self)
+		braille.handler.handleGainFocus(self)
@@ -0,0 +1,120 @@
+"""Loads the add-on against stand-ins of NVDA modules.
+
+Stand-ins implement only what the add-on uses, so that its hooks can be driven
+on a machine without NVDA. Results show cost of the add-on and number of calls
+to the provider; they do not include real cross-process costs.
+"""
+
+import os
+import sys
+
+_BENCHMARKS_DIR: str = os.path.dirname(os.path.abspath(__file__))
+_PLUGINS_DIR: str = os.path.join(os.path.dirname(_BENCHMARKS_DIR), "addon", "globalPlugins")
+
+_plugin = None
+
+
+def load(config: dict[str, object] | None = None):
+	"""Imports the add-on and starts its global plugin once.
+	:param config: values for showSelection section of configuration
+	:return: show selection package
+	"""
+	global _plugin
+	for path in (_PLUGINS_DIR, os.path.join(_BENCHMARKS_DIR, "nvdaStandIns"), _BENCHMARKS_DIR):
+		if path not in sys.path:
+			sys.path.insert(0, path)
+	import _ctypes
+
+	if not hasattr(_ctypes, "COMError"):
+		_ctypes.COMError = type("COMError", (Exception,), {})
+	import addonHandler
+
+	addonHandler.initTranslation()
+	import showSelection
+
+	if _plugin is None:
+		import config as nvdaConfig
+
+		# Versions of the add-on older than its configuration have no section.
+		if "showSelection" in nvdaConfig.conf.spec:
+			nvdaConfig.conf["showSelection"].update(config or {})
+		_plugin = showSelection.GlobalPlugin()
+	return showSelection
+
+
+def flush() -> None:
+	"""Processes queued events and functions."""
+	import queueHandler
+
+	queueHandler.flushQueue(queueHandler.eventQueue)
+
+
+def idle() -> None:
+	"""Runs delayed functions as if time has passed without input."""
+	import core
+	import queueHandler
+
+	while core.timers or queueHandler.eventQueue:
+		timers = list(core.timers)
+		core.timers.clear()
+		for func, args, kwargs in timers:
+			func(*args, **kwargs)
+		flush()
+
+
+def focus(document) -> None:
+	"""Moves focus to document.
+	:param document: document to focus
+	"""
+	import eventHandler
+
+	eventHandler.queueEvent("gainFocus", document)
+	flush()
+
+
+def caret(document) -> None:
+	"""Fires caret event like an application does after selection change.
+	:param document: document whose caret moved
+	"""
+	import eventHandler
+
+	eventHandler.queueEvent("caret", document)
+	flush()
+
+
+def region():
+	"""Gets braille region of review position.
+	:return: region or None
+	"""
+	import braille
+
+	regions = braille.handler.mainBuffer.regions
+	return regions[-1] if regions else None
+
+
+def selectedCells(reg) -> list[int]:
+	"""Gets braille positions shown as selected.
+	:param reg: braille region
+	:return: positions whose cells have selection dots
+	"""
+	return [pos for pos, cell in enumerate(reg.brailleCells) if cell & 0xC0 == 0xC0]
+
+
+def output() -> list[object]:
+	"""Gets what braille shows, so that output of two versions of the add-on
+	can be compared.
+	:return: review offset, braille selection start and end, and braille cells
+	"""
+	import api
+
+	reg = region()
+	reviewPos = api.getReviewPosition() if api.getNavigatorObject() is not None else None
+	if hasattr(reviewPos, "_startOffset"):
+		reviewOffset: int = reviewPos._startOffset
+	elif hasattr(reviewPos, "_rangeObj"):
+		reviewOffset = reviewPos._rangeObj.start
+	else:
+		reviewOffset = -1
+	if reg is None:
+		return [reviewOffset, None, None, []]
+	return [reviewOffset, reg.brailleSelectionStart, reg.brailleSelectionEnd, list(reg.brailleCells)]
@@ -0,0 +1,7 @@
+"""Stand-in for NVDA module NVDAObjects.IAccessible, used by benchmarks."""
+
+from NVDAObjects import NVDAObject
+
+
+class IAccessible(NVDAObject):
+	IA2UniqueID = None
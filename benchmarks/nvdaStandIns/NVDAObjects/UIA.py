@@ -0,0 +1,209 @@
+"""Stand-in for NVDA module NVDAObjects.UIA, used by benchmarks."""
+
+import time
+
+import textInfos
+import UIAHandler
+from NVDAObjects import NVDAObject
+from textInfos import providerCalls
+from textInfos.offsets import Offsets, OffsetsTextInfo
+
+_UNITS = {unit: name for name, unit in UIAHandler.NVDAUnitsToUIAUnits.items()}
+
+
+class _TextRange:
+	"""Text range of provider. Each method is a cross-process call in NVDA."""
+
+	def __init__(self, obj, start, end):
+		self.obj = obj
+		self.start = start
+		self.end = end
+
+	def _offsets(self):
+		return OffsetsTextInfo(self.obj, Offsets(self.start, self.end))
+
+	def Clone(self):
+		providerCalls["UIA_Clone"] += 1
+		return _TextRange(self.obj, self.start, self.end)
+
+	def Compare(self, other):
+		providerCalls["UIA_Compare"] += 1
+		return (self.start, self.end) == (other.start, other.end)
+
+	def CompareEndpoints(self, endpoint, other, otherEndpoint):
+		providerCalls["UIA_CompareEndpoints"] += 1
+		a = self.start if endpoint == UIAHandler.TextPatternRangeEndpoint_Start else self.end
+		b = other.start if otherEndpoint == UIAHandler.TextPatternRangeEndpoint_Start else other.end
+		return a - b
+
+	def MoveEndpointByRange(self, endpoint, other, otherEndpoint):
+		providerCalls["UIA_MoveEndpointByRange"] += 1
+		offset = other.start if otherEndpoint == UIAHandler.TextPatternRangeEndpoint_Start else other.end
+		if endpoint == UIAHandler.TextPatternRangeEndpoint_Start:
+			self.start, self.end = offset, max(self.end, offset)
+		else:
+			self.start, self.end = min(self.start, offset), offset
+
+	def ExpandToEnclosingUnit(self, unit):
+		providerCalls["UIA_ExpandToEnclosingUnit"] += 1
+		self.start, self.end = self._offsets()._getUnitOffsets(_UNITS[unit], self.start)
+
+	def Move(self, unit, count):
+		providerCalls["UIA_Move"] += 1
+		info = self._offsets()
+		info.collapse()
+		moved = info.move(_UNITS[unit], count)
+		self.start, self.end = info._getUnitOffsets(_UNITS[unit], info._startOffset)
+		return moved
+
+	def MoveEndpointByUnit(self, endpoint, unit, count):
+		providerCalls["UIA_MoveEndpointByUnit"] += 1
+		info = self._offsets()
+		moved = info.move(
+			_UNITS[unit], count, "start" if endpoint == UIAHandler.TextPatternRangeEndpoint_Start else "end"
+		)
+		self.start, self.end = info._startOffset, info._endOffset
+		return moved
+
+	def GetText(self, maxLength):
+		providerCalls["UIA_GetText"] += 1
+		return self.obj.documentText[self.start : self.end]
+
+	def Select(self):
+		providerCalls["UIA_Select"] += 1
+		self.obj.selectionOffsets = (self.start, self.end)
+		self.obj.caretOffset = self.start
+
+
+class _TextRangeArray:
+	def __init__(self, ranges):
+		self._ranges = ranges
+		self.length = len(ranges)
+
+	def GetElement(self, index):
+		return self._ranges[index]
+
+
+class _TextPattern:
+	"""Text pattern of provider, which can be called from any thread."""
+
+	def __init__(self, obj):
+		self.obj = obj
+
+	def GetSelection(self):
+		providerCalls["UIA_GetSelection"] += 1
+		if self.obj.selectionDelay:
+			time.sleep(self.obj.selectionDelay)
+		start, end = self.obj.selectionOffsets
+		return _TextRangeArray([_TextRange(self.obj, start, end)])
+
+
+class UIATextInfo(textInfos.TextInfo):
+	def __init__(self, obj, position, _rangeObj=None):
+		super().__init__(obj, position)
+		if _rangeObj is not None:
+			self._rangeObj = _rangeObj.Clone()
+			return
+		if position == textInfos.POSITION_SELECTION:
+			selections = obj.UIATextPattern.GetSelection()
+			if selections.length == 0:
+				raise RuntimeError("No selection available")
+			self._rangeObj = selections.GetElement(0)
+			return
+		if position == textInfos.POSITION_CARET:
+			start = end = obj.caretOffset
+		elif position == textInfos.POSITION_FIRST:
+			start = end = 0
+		elif position == textInfos.POSITION_ALL:
+			start, end = 0, len(obj.documentText)
+		elif isinstance(position, Offsets):
+			start, end = position.startOffset, position.endOffset
+		else:
+			raise NotImplementedError(position)
+		self._rangeObj = _TextRange(obj, start, end)
+
+	def copy(self):
+		return self.__class__(self.obj, None, _rangeObj=self._rangeObj)
+
+	@property
+	def bookmark(self):
+		return self.copy()
+
+	def __eq__(self, other):
+		return self is other or (
+			isinstance(other, UIATextInfo) and self.obj == other.obj and self._rangeObj.Compare(other._rangeObj)
+		)
+
+	__hash__ = object.__hash__
+
+	@property
+	def isCollapsed(self):
+		return self._rangeObj.CompareEndpoints(
+			UIAHandler.TextPatternRangeEndpoint_Start, self._rangeObj, UIAHandler.TextPatternRangeEndpoint_End
+		) == 0
+
+	def collapse(self, end=False):
+		if end:
+			self._rangeObj.MoveEndpointByRange(
+				UIAHandler.TextPatternRangeEndpoint_Start, self._rangeObj, UIAHandler.TextPatternRangeEndpoint_End
+			)
+		else:
+			self._rangeObj.MoveEndpointByRange(
+				UIAHandler.TextPatternRangeEndpoint_End, self._rangeObj, UIAHandler.TextPatternRangeEndpoint_Start
+			)
+
+	def expand(self, unit):
+		self._rangeObj.ExpandToEnclosingUnit(UIAHandler.NVDAUnitsToUIAUnits[unit])
+
+	def move(self, unit, direction, endPoint=None):
+		uiaUnit = UIAHandler.NVDAUnitsToUIAUnits[unit]
+		if endPoint == "start":
+			return self._rangeObj.MoveEndpointByUnit(UIAHandler.TextPatternRangeEndpoint_Start, uiaUnit, direction)
+		if endPoint == "end":
+			return self._rangeObj.MoveEndpointByUnit(UIAHandler.TextPatternRangeEndpoint_End, uiaUnit, direction)
+		moved = self._rangeObj.Move(uiaUnit, direction)
+		self.collapse()
+		return moved
+
+	@staticmethod
+	def _endpoint(name):
+		return UIAHandler.TextPatternRangeEndpoint_Start if name == "start" else UIAHandler.TextPatternRangeEndpoint_End
+
+	def compareEndPoints(self, other, which):
+		selfEndPoint, otherEndPoint = which.split("To")
+		result = self._rangeObj.CompareEndpoints(
+			self._endpoint(selfEndPoint), other._rangeObj, self._endpoint(otherEndPoint.lower())
+		)
+		return (result > 0) - (result < 0)
+
+	def setEndPoint(self, other, which):
+		selfEndPoint, otherEndPoint = which.split("To")
+		self._rangeObj.MoveEndpointByRange(
+			self._endpoint(selfEndPoint), other._rangeObj, self._endpoint(otherEndPoint.lower())
+		)
+
+	@property
+	def text(self):
+		return self._rangeObj.GetText(-1)
+
+	def getTextWithFields(self, formatConfig=None):
+		text = self.text
+		return [text] if text else []
+
+	def updateCaret(self):
+		info = self.copy()
+		info.collapse()
+		info._rangeObj.Select()
+
+	def updateSelection(self):
+		self._rangeObj.Select()
+
+
+class UIA(NVDAObject):
+	TextInfo = UIATextInfo
+	#: Seconds which provider takes to answer selection.
+	selectionDelay = 0
+
+	@property
+	def UIATextPattern(self):
+		return _TextPattern(self)
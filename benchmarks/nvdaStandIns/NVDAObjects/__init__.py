@@ -0,0 +1,13 @@
+"""Stand-in for NVDA module NVDAObjects, used by benchmarks."""
+
+class NVDAObject:
+	windowHandle = 0
+	name = ""
+	role = 0
+	isTextSelectionAnchoredAtStart = True
+
+	def __init__(self):
+		self.treeInterceptor = None
+
+	def makeTextInfo(self, position):
+		raise NotImplementedError
@@ -0,0 +1,7 @@
+"""Stand-in for NVDA module NVDAObjects.window, used by benchmarks."""
+
+from NVDAObjects import NVDAObject
+
+
+class Window(NVDAObject):
+	pass
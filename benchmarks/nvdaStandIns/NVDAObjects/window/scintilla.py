@@ -0,0 +1,32 @@
+"""Stand-in for NVDA module NVDAObjects.window.scintilla, used by benchmarks."""
+
+import watchdog
+from textInfos import providerCalls
+
+from . import Window
+
+SCI_GETSELECTIONS = 2570
+SCI_GETSELECTIONNSTART = 2585
+SCI_GETSELECTIONNEND = 2587
+
+
+class Scintilla(Window):
+	"""Scintilla control whose selections are answered to window messages."""
+
+	#: Selections as (start, end), main selection first.
+	selections = ()
+
+	def register(self):
+		watchdog.windows[self.windowHandle] = self
+
+	def sendMessage(self, msg, wParam, lParam):
+		if msg == SCI_GETSELECTIONS:
+			providerCalls["SCI_GETSELECTIONS"] += 1
+			return max(1, len(self.selections))
+		if msg == SCI_GETSELECTIONNSTART:
+			providerCalls["SCI_GETSELECTIONNSTART"] += 1
+			return self.selections[wParam][0]
+		if msg == SCI_GETSELECTIONNEND:
+			providerCalls["SCI_GETSELECTIONNEND"] += 1
+			return self.selections[wParam][1]
+		raise NotImplementedError(msg)
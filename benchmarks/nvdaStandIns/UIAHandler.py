@@ -0,0 +1,22 @@
+"""Stand-in for NVDA module UIAHandler, used by benchmarks."""
+
+import textInfos
+
+TextPatternRangeEndpoint_Start = 0
+TextPatternRangeEndpoint_End = 1
+
+TextUnit_Character = 0
+TextUnit_Format = 1
+TextUnit_Word = 2
+TextUnit_Line = 3
+TextUnit_Paragraph = 4
+TextUnit_Page = 5
+TextUnit_Document = 6
+
+NVDAUnitsToUIAUnits = {
+	textInfos.UNIT_CHARACTER: TextUnit_Character,
+	textInfos.UNIT_WORD: TextUnit_Word,
+	textInfos.UNIT_LINE: TextUnit_Line,
+	textInfos.UNIT_PARAGRAPH: TextUnit_Paragraph,
+	textInfos.UNIT_STORY: TextUnit_Document,
+}
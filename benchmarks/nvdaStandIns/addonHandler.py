@@ -0,0 +1,17 @@
+"""Stand-in for NVDA module addonHandler, used by benchmarks."""
+
+import builtins
+
+
+def initTranslation():
+	builtins._ = lambda s: s
+	builtins.pgettext = lambda c, s: s
+	builtins.ngettext = lambda s, p, n: s if n == 1 else p
+
+
+class _Addon:
+	manifest = {"summary": "Show selection when braille is tethered to review", "name": "showSelectionWhenBrailleTetheredToReview"}
+
+
+def getCodeAddon(obj=None, frameDist=1):
+	return _Addon()
@@ -0,0 +1,48 @@
+"""Stand-in for NVDA module api, used by benchmarks."""
+
+_reviewPosition = None
+_focusObject = None
+_navigatorObject = None
+
+
+def getReviewPosition():
+	global _reviewPosition
+	if _reviewPosition is None:
+		import textInfos
+
+		_reviewPosition = _navigatorObject.makeTextInfo(textInfos.POSITION_CARET)
+	return _reviewPosition
+
+
+def setReviewPosition(reviewPosition, clearNavigatorObject=True, isCaret=False, isMouse=False):
+	global _reviewPosition
+	import braille
+
+	_reviewPosition = reviewPosition.copy()
+	braille.handler.handleReviewMove(shouldAutoTether=not isCaret)
+	return True
+
+
+def getFocusObject():
+	return _focusObject
+
+
+def getNavigatorObject():
+	return _navigatorObject
+
+
+def setNavigatorObject(obj, isFocus=False):
+	global _navigatorObject, _reviewPosition
+	_navigatorObject = obj
+	_reviewPosition = None
+	import braille
+
+	braille.handler.handleReviewMove()
+	return True
+
+
+def processPendingEvents(processEventQueue=True):
+	import queueHandler
+
+	if processEventQueue:
+		queueHandler.flushQueue(queueHandler.eventQueue)
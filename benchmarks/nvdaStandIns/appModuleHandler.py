@@ -0,0 +1,5 @@
+"""Stand-in for NVDA module appModuleHandler, used by benchmarks."""
+
+class AppModule:
+	def __init__(self, appName):
+		self.appName = appName
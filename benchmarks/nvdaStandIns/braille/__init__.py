@@ -0,0 +1,80 @@
+"""Stand-in for NVDA module braille, used by benchmarks."""
+
+import api
+import config
+import extensionPoints
+from config.configFlags import TetherTo
+
+SELECTION_SHAPE = 0xC0
+displayChanged = extensionPoints.Action()
+displaySizeChanged = extensionPoints.Action()
+
+
+class _Table:
+	fileName = "en-ueb-g1.ctb"
+
+
+class BrailleBuffer:
+	def __init__(self, handler):
+		self.handler = handler
+		self.regions = []
+		self.windowStartPos = 0
+
+	def update(self):
+		pass
+
+	def updateDisplay(self):
+		pass
+
+
+class BrailleHandler:
+	def __init__(self):
+		self.enabled = True
+		self.displaySize = 40
+		self.table = _Table()
+		self.mainBuffer = BrailleBuffer(self)
+		self.updates = 0
+
+	def getTether(self):
+		return config.conf["braille"]["tetherTo"]
+
+	def setTether(self, tether, auto=False):
+		config.conf["braille"]["tetherTo"] = tether
+
+	def _reviewRegion(self):
+		from braille.regions.textInfo import ReviewTextInfoRegion
+
+		obj = api.getNavigatorObject()
+		region = self.mainBuffer.regions[-1] if self.mainBuffer.regions else None
+		if region is None or region.obj is not obj:
+			region = ReviewTextInfoRegion(obj)
+			self.mainBuffer.regions = [region]
+		return region
+
+	def handleReviewMove(self, shouldAutoTether=True):
+		if not self.enabled or api.getNavigatorObject() is None:
+			return
+		region = self._reviewRegion()
+		region.update()
+		self.updates += 1
+
+	def handleCaretMove(self, obj, shouldAutoTether=True):
+		if self.getTether() == TetherTo.REVIEW.value:
+			return
+		self.handleReviewMove()
+
+	def handleGainFocus(self, obj, shouldAutoTether=True):
+		self.handleReviewMove()
+
+	def handleUpdate(self, obj):
+		for region in reversed(self.mainBuffer.regions):
+			if getattr(region, "obj", None) == obj:
+				region.update()
+				self.updates += 1
+				return
+
+	def update(self):
+		pass
+
+
+handler = BrailleHandler()
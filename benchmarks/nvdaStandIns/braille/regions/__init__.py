@@ -0,0 +1,46 @@
+"""Stand-in for NVDA module braille.regions, used by benchmarks."""
+
+import config
+import louis
+import louisHelper
+
+
+class Region:
+	def __init__(self):
+		self.rawText = ""
+		self.rawTextTypeforms = None
+		self.cursorPos = None
+		self.selectionStart = self.selectionEnd = None
+		self.brailleCells = []
+		self.brailleCursorPos = None
+		self.brailleSelectionStart = self.brailleSelectionEnd = None
+		self.rawToBraillePos = []
+		self.brailleToRawPos = []
+
+	def update(self):
+		import braille
+
+		mode = louis.dotsIO
+		if config.conf["braille"]["expandAtCursor"] and self.cursorPos is not None:
+			mode |= louis.compbrlAtCursor
+		self.brailleCells, self.brailleToRawPos, self.rawToBraillePos, self.brailleCursorPos = louisHelper.translate(
+			[braille.handler.table.fileName, "braille-patterns.cti"],
+			self.rawText,
+			typeform=self.rawTextTypeforms,
+			mode=mode,
+			cursorPos=self.cursorPos,
+		)
+		if self.selectionStart is not None and self.selectionEnd is not None:
+			try:
+				self.brailleSelectionStart = self.rawToBraillePos[self.selectionStart]
+				if self.selectionEnd >= len(self.rawText):
+					self.brailleSelectionEnd = len(self.brailleCells)
+				else:
+					self.brailleSelectionEnd = self.rawToBraillePos[self.selectionEnd]
+				for pos in range(self.brailleSelectionStart, self.brailleSelectionEnd):
+					self.brailleCells[pos] |= braille.SELECTION_SHAPE
+			except IndexError:
+				pass
+
+	def routeTo(self, braillePos):
+		pass
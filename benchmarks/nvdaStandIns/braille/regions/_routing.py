@@ -0,0 +1,7 @@
+"""Stand-in for NVDA module braille.regions._routing, used by benchmarks."""
+
+import config
+
+
+def _routingShouldMoveSystemCaret():
+	return config.conf["braille"].get("reviewRoutingMovesSystemCaret", "never") == "always"
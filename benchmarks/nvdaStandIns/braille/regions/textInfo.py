@@ -0,0 +1,112 @@
+"""Stand-in for NVDA module braille.regions.textInfo, used by benchmarks."""
+
+import api
+import config
+import textInfos
+from braille.regions import Region
+from braille.regions._routing import _routingShouldMoveSystemCaret
+
+
+class TextInfoRegion(Region):
+	def __init__(self, obj):
+		super().__init__()
+		self.obj = obj
+
+	def _getSelection(self):
+		try:
+			return self.obj.makeTextInfo(textInfos.POSITION_SELECTION)
+		except (NotImplementedError, RuntimeError):
+			return self.obj.makeTextInfo(textInfos.POSITION_FIRST)
+
+	def _getReadingUnit(self):
+		if config.conf["braille"]["readByParagraph"]:
+			return textInfos.UNIT_PARAGRAPH
+		return textInfos.UNIT_LINE
+
+	def _addTextWithFields(self, info, formatConfig, isSelection=False):
+		text = info.text
+		self.rawText += text
+		self._rawToContentPos.extend(range(self._currentContentPos, self._currentContentPos + len(text)))
+		self._currentContentPos += len(text)
+
+	def update(self):
+		formatConfig = config.conf["documentFormatting"]
+		unit = self._getReadingUnit()
+		self.rawText = ""
+		self.rawTextTypeforms = []
+		self.cursorPos = None
+		self._rawToContentPos = []
+		self._currentContentPos = 0
+		self.selectionStart = self.selectionEnd = None
+		sel = self._getSelection()
+		readingInfo = sel.copy()
+		readingInfo.collapse()
+		readingInfo.expand(unit)
+		self._readingInfo = readingInfo
+		sel = sel.copy()
+		if sel.compareEndPoints(readingInfo, "endToEnd") > 0:
+			sel.setEndPoint(readingInfo, "endToEnd")
+		chunk = readingInfo.copy()
+		chunk.collapse()
+		chunk.setEndPoint(sel, "endToStart")
+		self._addTextWithFields(chunk, formatConfig)
+		if sel.isCollapsed:
+			self.cursorPos = len(self.rawText)
+		else:
+			self.selectionStart = len(self.rawText)
+			self._addTextWithFields(sel, formatConfig, isSelection=True)
+			self.selectionEnd = len(self.rawText)
+		chunk.setEndPoint(sel, "startToEnd")
+		chunk.setEndPoint(readingInfo, "endToEnd")
+		self._addTextWithFields(chunk, formatConfig)
+		if self.cursorPos is not None and self.cursorPos >= len(self.rawText):
+			self.rawText += " "
+			self._rawToContentPos.append(self._currentContentPos)
+		self.brailleSelectionStart = self.brailleSelectionEnd = None
+		super().update()
+
+	def getTextInfoForBraillePos(self, braillePos):
+		pos = self._rawToContentPos[self.brailleToRawPos[braillePos]]
+		dest = self._readingInfo.copy()
+		dest.collapse()
+		dest.move(textInfos.UNIT_CHARACTER, pos)
+		return dest
+
+	def routeTo(self, braillePos):
+		self._routeToTextInfo(self.getTextInfoForBraillePos(braillePos))
+
+	def _routeToTextInfo(self, info):
+		info.updateCaret()
+
+	def _setCursor(self, info):
+		info.updateCaret()
+
+	def nextLine(self):
+		dest = self._readingInfo.copy()
+		moved = dest.move(self._getReadingUnit(), 1)
+		if not moved:
+			return
+		dest.collapse()
+		self._setCursor(dest)
+
+	def previousLine(self, start=False):
+		dest = self._readingInfo.copy()
+		dest.collapse()
+		moved = dest.move(self._getReadingUnit(), -1)
+		if not moved:
+			return
+		dest.collapse()
+		self._setCursor(dest)
+
+
+class ReviewTextInfoRegion(TextInfoRegion):
+	def _getSelection(self):
+		return api.getReviewPosition().copy()
+
+	def _setCursor(self, info):
+		api.setReviewPosition(info)
+
+	def _routeToTextInfo(self, info):
+		api.setReviewPosition(info)
+		if _routingShouldMoveSystemCaret():
+			info.updateCaret()
@@ -0,0 +1,11 @@
+"""Stand-in for module comtypes, used by benchmarks."""
+
+COINIT_MULTITHREADED = 0
+
+
+def CoInitializeEx(flags=None):
+	pass
+
+
+def CoUninitialize():
+	pass
@@ -0,0 +1,65 @@
+"""Stand-in for NVDA module config, used by benchmarks."""
+
+import re
+
+import extensionPoints
+from config.configFlags import BrailleMode, TetherTo
+
+post_configProfileSwitch = extensionPoints.Action()
+post_configSave = extensionPoints.Action()
+post_configReset = extensionPoints.Action()
+
+_specDefault = re.compile(r"^(\w+)\(.*default=([^,)]+)")
+
+
+def _parseDefault(value):
+	match = _specDefault.match(value)
+	if not match:
+		return None
+	kind, default = match.groups()
+	if kind == "boolean":
+		return default == "True"
+	if kind == "integer":
+		return int(default)
+	if kind == "float":
+		return float(default)
+	return default.strip("\"'")
+
+
+class _Section(dict):
+	def __init__(self, spec):
+		super().__init__()
+		self._spec = spec
+
+	def __missing__(self, key):
+		value = _parseDefault(self._spec[key])
+		self[key] = value
+		return value
+
+
+class _Config(dict):
+	def __init__(self):
+		super().__init__()
+		self.spec = {}
+		self.update(
+			{
+				"braille": {
+					"showSelection": True,
+					"mode": BrailleMode.FOLLOW_CURSORS.value,
+					"tetherTo": TetherTo.REVIEW.value,
+					"expandAtCursor": False,
+					"readByParagraph": False,
+				},
+				"reviewCursor": {"followCaret": True, "followFocus": True},
+				"UIA": {"allowInMSWord": 0},
+				"documentFormatting": {},
+			}
+		)
+
+	def __missing__(self, key):
+		section = _Section(self.spec[key])
+		self[key] = section
+		return section
+
+
+conf = _Config()
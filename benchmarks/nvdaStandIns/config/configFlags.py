@@ -0,0 +1,14 @@
+"""Stand-in for NVDA module config.configFlags, used by benchmarks."""
+
+import enum
+
+
+class BrailleMode(enum.Enum):
+	FOLLOW_CURSORS = "followCursors"
+	SPEECH_OUTPUT = "speechOutput"
+
+
+class TetherTo(enum.Enum):
+	AUTO = "auto"
+	FOCUS = "focus"
+	REVIEW = "review"
@@ -0,0 +1,8 @@
+"""Stand-in for NVDA module core, used by benchmarks."""
+
+#: Functions whose call is delayed, run when environment is idle.
+timers = []
+
+
+def callLater(delay, callable, *args, **kwargs):
+	timers.append((callable, args, kwargs))
@@ -0,0 +1,26 @@
+"""Stand-in for NVDA module cursorManager, used by benchmarks."""
+
+import textInfos
+
+
+class CursorManager:
+	@property
+	def selection(self):
+		return self.makeTextInfo(textInfos.POSITION_SELECTION)
+
+	def _selectionMovementScriptHelper(self, unit=None, direction=None, toPosition=None):
+		start, end = self.selectionOffsets
+		anchor = start if self.isTextSelectionAnchoredAtStart or start == end else end
+		caret = self.makeTextInfo(toPosition or textInfos.POSITION_CARET)
+		if not toPosition:
+			caret.move(unit, direction)
+		newOffset = caret._startOffset
+		self.select(min(anchor, newOffset), max(anchor, newOffset), anchoredAtStart=newOffset >= anchor)
+		self._set_selection()
+
+	def _set_selection(self):
+		import api
+		import config
+
+		if config.conf["reviewCursor"]["followCaret"]:
+			api.setReviewPosition(self.makeTextInfo(textInfos.POSITION_CARET), isCaret=True)
@@ -0,0 +1,15 @@
+"""Stand-in for NVDA module editableText, used by benchmarks."""
+
+import textInfos
+
+
+class EditableText:
+	def detectPossibleSelectionChange(self):
+		import eventHandler
+
+		eventHandler.queueEvent("caret", self)
+
+
+class EditableTextWithoutAutoSelectDetection(EditableText):
+	def reportSelectionChange(self, oldTextInfo):
+		pass
@@ -0,0 +1,45 @@
+"""Stand-in for NVDA module eventHandler, used by benchmarks."""
+
+import collections
+import queueHandler
+
+_pendingEventCountsByName = collections.Counter()
+_pendingEventCountsByObj = collections.Counter()
+_pendingEventCountsByNameAndObj = collections.Counter()
+#: Number of executed events by name.
+executedEvents = collections.Counter()
+
+
+def _runEvent(eventName, obj):
+	_pendingEventCountsByNameAndObj[(eventName, id(obj))] -= 1
+	_pendingEventCountsByName[eventName] -= 1
+	executeEvent(eventName, obj)
+
+
+def queueEvent(eventName, obj, **kwargs):
+	_pendingEventCountsByNameAndObj[(eventName, id(obj))] += 1
+	_pendingEventCountsByName[eventName] += 1
+	queueHandler.queueFunction(queueHandler.eventQueue, _runEvent, eventName, obj)
+
+
+def isPendingEvents(eventName=None, obj=None):
+	if obj is None:
+		return _pendingEventCountsByName[eventName] > 0
+	return _pendingEventCountsByNameAndObj[(eventName, id(obj))] > 0
+
+
+def executeEvent(eventName, obj, **kwargs):
+	import globalPluginHandler
+	import api
+
+	executedEvents[eventName] += 1
+	if eventName == "gainFocus":
+		api._focusObject = obj
+		api._navigatorObject = obj
+	handler = getattr(obj, "event_%s" % eventName, lambda: None)
+	chain = [handler]
+	for plugin in reversed(globalPluginHandler.runningPlugins):
+		func = getattr(plugin, "event_%s" % eventName, None)
+		if func is not None:
+			chain.append(lambda func=func, nextHandler=chain[-1]: func(obj, nextHandler))
+	chain[-1]()
@@ -0,0 +1,30 @@
+"""Stand-in for NVDA module extensionPoints, used by benchmarks."""
+
+class Action:
+	def __init__(self):
+		self._handlers = []
+
+	def register(self, handler):
+		if handler not in self._handlers:
+			self._handlers.append(handler)
+
+	def unregister(self, handler):
+		if handler in self._handlers:
+			self._handlers.remove(handler)
+			return True
+		return False
+
+	def notify(self, **kwargs):
+		for handler in list(self._handlers):
+			try:
+				handler(**kwargs)
+			except TypeError:
+				handler()
+
+
+class Decider(Action):
+	def decide(self, **kwargs):
+		for handler in list(self._handlers):
+			if not handler(**kwargs):
+				return False
+		return True
@@ -0,0 +1,36 @@
+"""Stand-in for NVDA module globalCommands, used by benchmarks."""
+
+import config
+from config.configFlags import BrailleMode, TetherTo
+
+
+class GlobalCommands:
+	def script_navigatorObject_toFocus(self, gesture):
+		import api
+
+		api.setNavigatorObject(api.getFocusObject())
+
+	def script_braille_toggleTether(self, gesture):
+		import braille
+
+		values: list[str] = [tether.value for tether in TetherTo]
+		tether: str = values[(values.index(config.conf["braille"]["tetherTo"]) + 1) % len(values)]
+		if tether == TetherTo.AUTO.value:
+			config.conf["braille"]["tetherTo"] = tether
+		else:
+			braille.handler.setTether(tether)
+
+	def script_toggleBrailleMode(self, gesture):
+		values: list[str] = [mode.value for mode in BrailleMode]
+		config.conf["braille"]["mode"] = values[(values.index(config.conf["braille"]["mode"]) + 1) % len(values)]
+
+	def script_braille_cycleShowSelection(self, gesture):
+		config.conf["braille"]["showSelection"] = not config.conf["braille"]["showSelection"]
+
+	def script_braille_cycleReviewRoutingMovesSystemCaret(self, gesture):
+		values: list[str] = ["never", "onlyWhenAutoTethered", "always"]
+		value: str = config.conf["braille"].get("reviewRoutingMovesSystemCaret", "never")
+		config.conf["braille"]["reviewRoutingMovesSystemCaret"] = values[(values.index(value) + 1) % len(values)]
+
+
+commands = GlobalCommands()
@@ -0,0 +1,12 @@
+"""Stand-in for NVDA module globalPluginHandler, used by benchmarks."""
+
+runningPlugins = []
+
+
+class GlobalPlugin:
+	def __init__(self):
+		runningPlugins.append(self)
+
+	def terminate(self):
+		if self in runningPlugins:
+			runningPlugins.remove(self)
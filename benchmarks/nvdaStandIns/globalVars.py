@@ -0,0 +1,10 @@
+"""Stand-in for NVDA module globalVars, used by benchmarks."""
+
+import tempfile
+
+
+class _AppArgs:
+	configPath = tempfile.mkdtemp(prefix="nvdaConfig")
+
+
+appArgs = _AppArgs()
@@ -0,0 +1,9 @@
+"""Stand-in for NVDA module inputCore, used by benchmarks."""
+
+import extensionPoints
+
+decide_executeGesture = extensionPoints.Decider()
+
+
+class InputGesture:
+	pass
@@ -0,0 +1,7 @@
+"""Stand-in for NVDA module logHandler, used by benchmarks."""
+
+import logging
+
+log = logging.getLogger("nvda")
+log.debugWarning = log.debug
+log.io = log.debug
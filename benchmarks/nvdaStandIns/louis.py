@@ -0,0 +1,4 @@
+"""Stand-in for module louis, used by benchmarks."""
+
+dotsIO = 0x4
+compbrlAtCursor = 0x20
@@ -0,0 +1,12 @@
+"""Stand-in for NVDA module louisHelper, used by benchmarks."""
+
+translations = 0
+
+
+def translate(tableList, inbuf, typeform=None, cursorPos=None, mode=0):
+	global translations
+	translations += 1
+	cells = [(ord(c) & 0x3F) or 1 for c in inbuf]
+	positions = list(range(len(inbuf)))
+	brailleCursorPos = cursorPos if cursorPos is not None and cursorPos < len(inbuf) else None
+	return cells, list(positions), positions, brailleCursorPos
@@ -0,0 +1,15 @@
+"""Stand-in for NVDA module queueHandler, used by benchmarks."""
+
+import collections
+
+eventQueue = collections.deque()
+
+
+def queueFunction(queue, func, *args, **kwargs):
+	queue.append((func, args, kwargs))
+
+
+def flushQueue(queue):
+	while queue:
+		func, args, kwargs = queue.popleft()
+		func(*args, **kwargs)
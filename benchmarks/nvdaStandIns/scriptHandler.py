@@ -0,0 +1,13 @@
+"""Stand-in for NVDA module scriptHandler, used by benchmarks."""
+
+def script(description="", category=None, gesture=None, gestures=None, **kwargs):
+	def decorator(func):
+		func.__doc__ = description
+		func.category = category
+		func.gestures = list(gestures or []) + ([gesture] if gesture else [])
+		return func
+	return decorator
+
+
+def getLastScriptRepeatCount():
+	return 0
@@ -0,0 +1,104 @@
+"""Stand-in for NVDA module textInfos, used by benchmarks."""
+
+POSITION_FIRST = "first"
+POSITION_LAST = "last"
+POSITION_CARET = "caret"
+POSITION_SELECTION = "selection"
+POSITION_ALL = "all"
+
+UNIT_CHARACTER = "character"
+UNIT_WORD = "word"
+UNIT_LINE = "line"
+UNIT_PARAGRAPH = "paragraph"
+UNIT_STORY = "story"
+
+providerCalls = {
+	"makeTextInfo": 0,
+	"expand": 0,
+	"copy": 0,
+	"compareEndPoints": 0,
+	"text": 0,
+	"VBuf_getSelectionOffsets": 0,
+	"VBuf_getLineOffsets": 0,
+	"UIA_Clone": 0,
+	"UIA_Compare": 0,
+	"UIA_CompareEndpoints": 0,
+	"UIA_MoveEndpointByRange": 0,
+	"UIA_ExpandToEnclosingUnit": 0,
+	"UIA_Move": 0,
+	"UIA_MoveEndpointByUnit": 0,
+	"UIA_GetText": 0,
+	"UIA_Select": 0,
+	"UIA_GetSelection": 0,
+	"SCI_GETSELECTIONS": 0,
+	"SCI_GETSELECTIONNSTART": 0,
+	"SCI_GETSELECTIONNEND": 0,
+}
+
+
+class Bookmark:
+	pass
+
+
+class TextInfo:
+	def __init__(self, obj, position):
+		self.obj = obj
+		self.basePosition = position
+
+	def copy(self):
+		raise NotImplementedError
+
+	def __eq__(self, other):
+		return self is other
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	__hash__ = object.__hash__
+
+	@property
+	def start(self):
+		return _Endpoint(self, True)
+
+	@start.setter
+	def start(self, endpoint):
+		self.setEndPoint(endpoint.textInfo, "startToStart" if endpoint.isStart else "startToEnd")
+
+	@property
+	def end(self):
+		return _Endpoint(self, False)
+
+	@end.setter
+	def end(self, endpoint):
+		self.setEndPoint(endpoint.textInfo, "endToStart" if endpoint.isStart else "endToEnd")
+
+	def activate(self):
+		pass
+
+
+class _Endpoint:
+	def __init__(self, textInfo, isStart):
+		self.textInfo = textInfo
+		self.isStart = isStart
+
+	def _cmp(self, other):
+		which = ("start" if self.isStart else "end") + "To" + ("Start" if other.isStart else "End")
+		return self.textInfo.compareEndPoints(other.textInfo, which)
+
+	def __lt__(self, other):
+		return self._cmp(other) < 0
+
+	def __le__(self, other):
+		return self._cmp(other) <= 0
+
+	def __gt__(self, other):
+		return self._cmp(other) > 0
+
+	def __ge__(self, other):
+		return self._cmp(other) >= 0
+
+	def __eq__(self, other):
+		return self._cmp(other) == 0
+
+	def __ne__(self, other):
+		return self._cmp(other) != 0
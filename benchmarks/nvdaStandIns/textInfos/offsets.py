@@ -0,0 +1,247 @@
+"""Stand-in for NVDA module textInfos.offsets, used by benchmarks."""
+
+import bisect
+import itertools
+
+import textInfos
+from textInfos import providerCalls
+
+
+class Offsets:
+	def __init__(self, startOffset, endOffset):
+		self.startOffset = startOffset
+		self.endOffset = endOffset
+
+	def __eq__(self, other):
+		return (
+			isinstance(other, Offsets)
+			and self.startOffset == other.startOffset
+			and self.endOffset == other.endOffset
+		)
+
+	def __hash__(self):
+		return hash((self.startOffset, self.endOffset))
+
+
+class OffsetsTextInfo(textInfos.TextInfo):
+	#: Encoding whose code units offsets count, or None when offsets are
+	#: indexes of characters of story text.
+	encoding = None
+
+	def __init__(self, obj, position):
+		super().__init__(obj, position)
+		if isinstance(position, Offsets):
+			self._startOffset, self._endOffset = position.startOffset, position.endOffset
+		elif position == textInfos.POSITION_SELECTION:
+			self._startOffset, self._endOffset = self._getSelectionOffsets()
+		elif position == textInfos.POSITION_CARET:
+			self._startOffset = self._endOffset = self._getCaretOffset()
+		elif position == textInfos.POSITION_FIRST:
+			self._startOffset = self._endOffset = 0
+		elif position == textInfos.POSITION_ALL:
+			self._startOffset, self._endOffset = 0, self._getStoryLength()
+		else:
+			raise NotImplementedError(position)
+
+	def _get_bookmark(self):
+		return Offsets(self._startOffset, self._endOffset)
+
+	bookmark = property(_get_bookmark)
+
+	def copy(self):
+		providerCalls["copy"] += 1
+		return self.__class__(self.obj, self.bookmark)
+
+	def __eq__(self, other):
+		return (
+			self is other
+			or (
+				isinstance(other, OffsetsTextInfo)
+				and self.obj == other.obj
+				and self._startOffset == other._startOffset
+				and self._endOffset == other._endOffset
+			)
+		)
+
+	__hash__ = object.__hash__
+
+	@property
+	def isCollapsed(self):
+		return self._startOffset == self._endOffset
+
+	def collapse(self, end=False):
+		if end:
+			self._startOffset = self._endOffset
+		else:
+			self._endOffset = self._startOffset
+
+	def _getStoryText(self):
+		return self.obj.documentText
+
+	#: Number of characters between offsets which are cached.
+	_BLOCK_LENGTH = 1024
+
+	def _encodedLength(self, text):
+		"""Gets number of offsets which text takes."""
+		if self.encoding == "utf_16_le":
+			return len(text.encode("utf_16_le")) // 2
+		return len(text.encode(self.encoding))
+
+	def _blockOffsets(self):
+		"""Gets offset of every block of characters of story, cached on object
+		until text changes.
+		"""
+		text = self._getStoryText()
+		cached = getattr(self.obj, "_blockOffsetsCache", None)
+		if cached is None or cached[0] is not text or cached[1] != self.encoding:
+			lengths = (
+				self._encodedLength(text[start : start + self._BLOCK_LENGTH])
+				for start in range(0, len(text), self._BLOCK_LENGTH)
+			)
+			cached = (text, self.encoding, list(itertools.accumulate(lengths, initial=0)))
+			self.obj._blockOffsetsCache = cached
+		return cached[2]
+
+	def _strOffset(self, offset):
+		"""Gets index of character of story text which contains offset."""
+		if self.encoding is None:
+			return offset
+		text = self._getStoryText()
+		blockOffsets = self._blockOffsets()
+		# Offsets past end of story count one unit each.
+		if offset >= blockOffsets[-1]:
+			return len(text) + offset - blockOffsets[-1]
+		block = bisect.bisect_right(blockOffsets, offset) - 1
+		index = block * self._BLOCK_LENGTH
+		encodedOffset = blockOffsets[block]
+		while True:
+			width = self._encodedLength(text[index])
+			if encodedOffset + width > offset:
+				return index
+			encodedOffset += width
+			index += 1
+
+	def _encodedOffset(self, index):
+		"""Gets offset of character of story text at index, counting indexes past
+		end of story as one unit each.
+		"""
+		if self.encoding is None:
+			return index
+		text = self._getStoryText()
+		if index >= len(text):
+			return self._blockOffsets()[-1] + index - len(text)
+		block = index // self._BLOCK_LENGTH
+		start = block * self._BLOCK_LENGTH
+		return self._blockOffsets()[block] + self._encodedLength(text[start:index])
+
+	def _getStoryLength(self):
+		return self._encodedOffset(len(self.obj.documentText))
+
+	def _getSelectionOffsets(self):
+		return self.obj.selectionOffsets
+
+	def _getCaretOffset(self):
+		return self.obj.caretOffset
+
+	def _getLineOffsets(self, offset):
+		text = self._getStoryText()
+		offset = self._strOffset(offset)
+		start = text.rfind("\n", 0, offset) + 1
+		end = text.find("\n", offset)
+		end = len(text) if end < 0 else end + 1
+		return self._encodedOffset(start), self._encodedOffset(end)
+
+	def _getWordOffsets(self, offset):
+		text = self._getStoryText()
+		offset = self._strOffset(offset)
+		start = offset
+		while start > 0 and not text[start - 1].isspace():
+			start -= 1
+		end = offset
+		while end < len(text) and not text[end].isspace():
+			end += 1
+		while end < len(text) and text[end] == " ":
+			end += 1
+		return self._encodedOffset(start), self._encodedOffset(max(end, offset + 1))
+
+	def _getCharacterOffsets(self, offset):
+		index = self._strOffset(offset)
+		return self._encodedOffset(index), self._encodedOffset(index + 1)
+
+	def _getUnitOffsets(self, unit, offset):
+		if unit == textInfos.UNIT_CHARACTER:
+			return self._getCharacterOffsets(offset)
+		if unit == textInfos.UNIT_WORD:
+			return self._getWordOffsets(offset)
+		if unit in (textInfos.UNIT_LINE, textInfos.UNIT_PARAGRAPH):
+			return self._getLineOffsets(offset)
+		if unit == textInfos.UNIT_STORY:
+			return 0, self._getStoryLength()
+		raise NotImplementedError(unit)
+
+	def expand(self, unit):
+		providerCalls["expand"] += 1
+		self._startOffset, self._endOffset = self._getUnitOffsets(unit, self._startOffset)
+
+	def move(self, unit, direction, endPoint=None):
+		length = self._getStoryLength()
+		offset = self._endOffset if endPoint == "end" else self._startOffset
+		moved = 0
+		while direction != 0:
+			if direction > 0:
+				newOffset = self._getUnitOffsets(unit, offset)[1] if offset < length else offset
+				if newOffset >= length and unit != textInfos.UNIT_CHARACTER:
+					break
+				newOffset = min(newOffset, length)
+				if newOffset == offset:
+					break
+				offset = newOffset
+				direction -= 1
+				moved += 1
+			else:
+				if offset <= 0:
+					break
+				offset = self._getUnitOffsets(unit, offset - 1)[0]
+				direction += 1
+				moved -= 1
+		if endPoint == "start":
+			self._startOffset = offset
+			self._endOffset = max(self._endOffset, offset)
+		elif endPoint == "end":
+			self._endOffset = offset
+			self._startOffset = min(self._startOffset, offset)
+		else:
+			self._startOffset = self._endOffset = offset
+		return moved
+
+	def compareEndPoints(self, other, which):
+		providerCalls["compareEndPoints"] += 1
+		selfEndPoint, otherEndPoint = which.split("To")
+		a = self._startOffset if selfEndPoint == "start" else self._endOffset
+		b = other._startOffset if otherEndPoint == "Start" else other._endOffset
+		return (a > b) - (a < b)
+
+	def setEndPoint(self, other, which):
+		selfEndPoint, otherEndPoint = which.split("To")
+		offset = other._startOffset if otherEndPoint == "Start" else other._endOffset
+		if selfEndPoint == "start":
+			self._startOffset = offset
+			self._endOffset = max(self._endOffset, offset)
+		else:
+			self._endOffset = offset
+			self._startOffset = min(self._startOffset, offset)
+
+	@property
+	def text(self):
+		providerCalls["text"] += 1
+		return self._getStoryText()[self._strOffset(self._startOffset) : self._strOffset(self._endOffset)]
+
+	def getTextWithFields(self, formatConfig=None):
+		return [self.text] if self._startOffset != self._endOffset else []
+
+	def updateCaret(self):
+		self.obj.caretOffset = self._startOffset
+		self.obj.selectionOffsets = (self._startOffset, self._startOffset)
+
+	def updateSelection(self):
+		self.obj.selectionOffsets = (self._startOffset, self._endOffset)
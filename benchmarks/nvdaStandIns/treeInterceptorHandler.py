@@ -0,0 +1,8 @@
+"""Stand-in for NVDA module treeInterceptorHandler, used by benchmarks."""
+
+class TreeInterceptor:
+	pass
+
+
+class DocumentTreeInterceptor(TreeInterceptor):
+	passThrough = False
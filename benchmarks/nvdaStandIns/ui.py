@@ -0,0 +1,7 @@
+"""Stand-in for NVDA module ui, used by benchmarks."""
+
+messages = []
+
+
+def message(text, *args, **kwargs):
+	messages.append(text)
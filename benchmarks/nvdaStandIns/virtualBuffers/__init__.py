@@ -0,0 +1,22 @@
+"""Stand-in for NVDA module virtualBuffers, used by benchmarks."""
+
+from cursorManager import CursorManager
+from textInfos import providerCalls
+from textInfos.offsets import OffsetsTextInfo
+from treeInterceptorHandler import DocumentTreeInterceptor
+
+
+class VirtualBufferTextInfo(OffsetsTextInfo):
+	"""Counts queries which NVDA makes to virtual buffer in its own process."""
+
+	def _getSelectionOffsets(self):
+		providerCalls["VBuf_getSelectionOffsets"] += 1
+		return super()._getSelectionOffsets()
+
+	def _getLineOffsets(self, offset):
+		providerCalls["VBuf_getLineOffsets"] += 1
+		return super()._getLineOffsets(offset)
+
+
+class VirtualBuffer(CursorManager, DocumentTreeInterceptor):
+	TextInfo = VirtualBufferTextInfo
@@ -0,0 +1,13 @@
+"""Stand-in for NVDA module watchdog, used by benchmarks."""
+
+
+class CallCancelled(Exception):
+	pass
+
+
+#: Stand-in windows by handle, which answer messages.
+windows = {}
+
+
+def cancellableSendMessage(hwnd, msg, wParam, lParam, flags=0, timeout=60000):
+	return windows[hwnd].sendMessage(msg, wParam, lParam)
@@ -0,0 +1,13 @@
+"""Stand-in for NVDA module winVersion, used by benchmarks."""
+
+class WinVersion(tuple):
+	pass
+
+
+WIN10 = (10, 0, 19041)
+WIN11 = (10, 0, 22000)
+_current = WIN11
+
+
+def getWinVer():
+	return _current
@@ -0,0 +1,207 @@
+"""Replays selection traces recorded with the add-on against synthetic documents.
+
+Traces are recorded in NVDA with the command which starts or stops recording of
+selection trace. They are written to showSelectionTraces directory in NVDA user
+configuration directory.
+
+Usage: python benchmarks/replay.py TRACE [--json FILE] [--compare FILE]
+"""
+
+import argparse
+import collections
+import json
+import time
+
+import environment
+from benchmark import percentile
+
+
+def readTrace(path: str) -> list[tuple]:
+	"""Reads records of trace file.
+	:param path: path of trace file
+	:return: records as tuples of fields of _TraceRecorder.RECORD
+	:raise ValueError: if file is not a trace of supported version
+	"""
+	showSelection = environment.load()
+	recorder = showSelection.trace._TraceRecorder
+	with open(path, "rb") as file:
+		data: bytes = file.read()
+	magic, version = recorder.HEADER.unpack_from(data)
+	if magic != recorder.MAGIC or version != recorder.VERSION:
+		raise ValueError(f"{path} is not a selection trace of version {recorder.VERSION}")
+	end: int = len(data) - (len(data) - recorder.HEADER.size) % recorder.RECORD.size
+	return list(recorder.RECORD.iter_unpack(data[recorder.HEADER.size : end]))
+
+
+class Replayer:
+	"""Drives patched hooks with events of trace."""
+
+	def __init__(self, records: list[tuple], settleTime: float = 0.01):
+		from documents import BrowseModeDocument, Document, makeText
+
+		self.showSelection = environment.load()
+		self.recorder = self.showSelection.trace._TraceRecorder
+		self.records = records
+		size: int = max([max(record[5:8]) for record in records] + [0]) + 4096
+		self.documents: dict[tuple[int, bool], object] = {}
+		text: str = makeText(size)
+		for record in records:
+			browseMode: bool = bool(record[1] & self.recorder.FLAG_BROWSE_MODE)
+			key = (record[4], browseMode)
+			if key not in self.documents:
+				documentClass = BrowseModeDocument if browseMode else Document
+				self.documents[key] = documentClass(text, windowHandle=record[4])
+		self.latencies: dict[str, list[float]] = collections.defaultdict(list)
+		#: Updates recorded within this many seconds after previous record are
+		#: caused by it, and they are replayed by replaying previous record.
+		self.settleTime: float = settleTime
+		self._previous: tuple | None = None
+		self._previousUpdate: tuple | None = None
+
+	def _document(self, record: tuple):
+		return self.documents[(record[4], bool(record[1] & self.recorder.FLAG_BROWSE_MODE))]
+
+	def _select(self, document, record: tuple) -> None:
+		start, end = record[5], record[6]
+		if start >= 0 and (start, end) != document.selectionOffsets:
+			document.select(start, end, anchoredAtStart=bool(record[1] & self.recorder.FLAG_ANCHORED_AT_START))
+
+	def _replayRecord(self, record: tuple) -> str | None:
+		import api
+		from textInfos.offsets import Offsets
+
+		kind: int = record[0]
+		document = self._document(record)
+		if kind == self.recorder.GAIN_FOCUS:
+			self._select(document, record)
+			environment.focus(document)
+			return "gainFocus"
+		if kind == self.recorder.CARET:
+			# Caret events queued by the add-on are queued again when replaying.
+			if record[1] & self.recorder.FLAG_SYNTHETIC:
+				return None
+			self._select(document, record)
+			environment.caret(document)
+			return "caret"
+		if kind == self.recorder.SELECTION_MOVEMENT:
+			unitIndex, direction = record[8], record[9]
+			if unitIndex < len(self.recorder.UNITS) and direction:
+				document._selectionMovementScriptHelper(self.recorder.UNITS[unitIndex], direction)
+				environment.flush()
+			self._select(document, record)
+			return "selectionMovement"
+		# Updates which move review position some time after previous record
+		# are caused by review commands, braille panning or routing.
+		previousUpdate, self._previousUpdate = self._previousUpdate, record
+		review: int = record[7]
+		if (
+			review < 0
+			or previousUpdate is None
+			or previousUpdate[7] == review
+			or record[2] - self._previous[2] < self.settleTime
+			or api.getNavigatorObject() is not document
+		):
+			return None
+		api.setReviewPosition(document.makeTextInfo(Offsets(review, review)))
+		environment.flush()
+		return "reviewMove"
+
+	def replay(self) -> dict[str, object]:
+		"""Replays trace.
+		:return: results
+		"""
+		import braille
+		import eventHandler
+		import louisHelper
+		from textInfos import providerCalls
+
+		calls: dict[str, int] = dict(providerCalls)
+		events: collections.Counter[str] = collections.Counter(eventHandler.executedEvents)
+		translations: int = louisHelper.translations
+		updates: int = braille.handler.updates
+		# Traces of older versions do not start with focus record when
+		# recording started while document had focus.
+		if self.records and self.records[0][0] != self.recorder.GAIN_FOCUS:
+			document = self._document(self.records[0])
+			self._select(document, self.records[0])
+			environment.focus(document)
+			environment.idle()
+		for record in self.records:
+			start: float = time.perf_counter()
+			name: str | None = self._replayRecord(record)
+			self._previous = record
+			if name is not None:
+				self.latencies[name].append((time.perf_counter() - start) * 1000000)
+			environment.idle()
+		recordedUpdates: list[float] = sorted(
+			record[3] for record in self.records if record[0] == self.recorder.UPDATE
+		)
+		results: dict[str, object] = {
+			"operations": {},
+			"events": dict(eventHandler.executedEvents - events),
+			"regionUpdates": braille.handler.updates - updates,
+			"translations": louisHelper.translations - translations,
+			"providerCalls": {key: count - calls[key] for key, count in providerCalls.items()},
+		}
+		for name, latencies in sorted(self.latencies.items()):
+			latencies.sort()
+			results["operations"][name] = {
+				"count": len(latencies),
+				"p50": percentile(latencies, 0.5),
+				"p99": percentile(latencies, 0.99),
+			}
+		if recordedUpdates:
+			results["recordedUpdates"] = {
+				"count": len(recordedUpdates),
+				"p50": percentile(recordedUpdates, 0.5),
+				"p99": percentile(recordedUpdates, 0.99),
+			}
+		return results
+
+
+def _printResults(results: dict[str, object], previous: dict[str, object] | None) -> None:
+	def delta(value: float, old: float | None) -> str:
+		return f" ({value - old:+.0f})" if old is not None else ""
+
+	print(f"{'operation':<20}{'count':>8}{'p50 us':>16}{'p99 us':>16}")
+	for name, values in results["operations"].items():
+		old = (previous or {}).get("operations", {}).get(name, {})
+		print(
+			f"{name:<20}{values['count']:>8}"
+			f"{values['p50']:>8.0f}{delta(values['p50'], old.get('p50')):>8}"
+			f"{values['p99']:>8.0f}{delta(values['p99'], old.get('p99')):>8}"
+		)
+	for key in ("regionUpdates", "translations"):
+		print(f"{key}: {results[key]}{delta(results[key], (previous or {}).get(key))}")
+	print("events: " + ", ".join(f"{name} {count}" for name, count in sorted(results["events"].items())))
+	print("provider calls: " + ", ".join(f"{name} {count}" for name, count in sorted(results["providerCalls"].items())))
+	if "recordedUpdates" in results:
+		recorded = results["recordedUpdates"]
+		print(f"recorded updates: {recorded['count']}, p50 {recorded['p50']:.0f} us, p99 {recorded['p99']:.0f} us")
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("trace", help="trace file")
+	parser.add_argument("--json", help="write results to this file")
+	parser.add_argument("--compare", help="results of earlier replay to compare with")
+	parser.add_argument(
+		"--settle-ms",
+		type=float,
+		default=10,
+		help="updates recorded within this time after previous record are not replayed as review movement",
+	)
+	args = parser.parse_args()
+	results: dict[str, object] = Replayer(readTrace(args.trace), args.settle_ms / 1000).replay()
+	previous: dict[str, object] | None = None
+	if args.compare:
+		with open(args.compare, encoding="utf-8") as file:
+			previous = json.load(file)
+	_printResults(results, previous)
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as file:
+			json.dump(results, file, indent="\t")
+
+
+if __name__ == "__main__":
+	main()
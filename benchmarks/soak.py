@@ -0,0 +1,295 @@
+"""Soak test which runs randomized operations through the hooks of the add-on
+for a long time, and fails if latency, retained objects, state of the add-on or
+queue depth grow without bound.
+
+Usage: python benchmarks/soak.py [--operations 200000] [--interval 10000] [--seed 1] [--json FILE]
+"""
+
+import argparse
+import collections
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+
+import environment
+from benchmark import percentile
+
+#: Operation gets random generator and returns its name.
+Operation = Callable[[random.Random], str]
+
+
+class Soak:
+	"""Runs randomized selection, review, routing and focus operations."""
+
+	def __init__(self, size: int):
+		self.showSelection = environment.load()
+		from documents import BrowseModeDocument, Document, ScintillaDocument, UIADocument, makeText
+
+		self.documents = [Document(makeText(size), windowHandle=handle) for handle in (1, 2)]
+		self.documents.append(UIADocument(makeText(size), windowHandle=3))
+		self.documents.append(ScintillaDocument(makeText(size), windowHandle=4))
+		self.browseModeDocument = BrowseModeDocument(makeText(size))
+		self.document = self.documents[0]
+		environment.focus(self.document)
+		self.operations: list[tuple[Operation, int]] = [
+			(self.extendSelection, 30),
+			(self.collapseSelection, 5),
+			(self.selectOccurrences, 2),
+			(self.moveReview, 25),
+			(self.route, 10),
+			(self.switchFocus, 5),
+			(self.moveInBrowseMode, 10),
+			(self.changeText, 3),
+			(self.reportSummary, 2),
+		]
+
+	def _documentLength(self) -> int:
+		return len(self.document.documentText)
+
+	def extendSelection(self, generator: random.Random) -> str:
+		if self.document is self.browseModeDocument:
+			return self.moveInBrowseMode(generator)
+		start, end = self.document.selectionOffsets
+		anchor: int = start if self.document.isTextSelectionAnchoredAtStart else end
+		caret: int = max(0, min(self._documentLength(), (end if anchor == start else start) + generator.randint(-80, 80)))
+		self.document.select(min(anchor, caret), max(anchor, caret), anchoredAtStart=caret >= anchor)
+		environment.caret(self.document)
+		return "extendSelection"
+
+	def collapseSelection(self, generator: random.Random) -> str:
+		if self.document is self.browseModeDocument:
+			return self.moveInBrowseMode(generator)
+		offset: int = generator.randrange(self._documentLength())
+		self.document.select(offset, offset)
+		environment.caret(self.document)
+		return "collapseSelection"
+
+	def selectOccurrences(self, generator: random.Random) -> str:
+		if not hasattr(self.document, "selectOccurrences"):
+			return self.extendSelection(generator)
+		self.document.selectOccurrences(generator.choice(("lorem", "amet", "elit")))
+		environment.caret(self.document)
+		return "selectOccurrences"
+
+	def moveReview(self, generator: random.Random) -> str:
+		region = environment.region()
+		if region is None:
+			return "moveReview"
+		if generator.random() < 0.5:
+			region.nextLine()
+		else:
+			region.previousLine()
+		environment.flush()
+		return "moveReview"
+
+	def route(self, generator: random.Random) -> str:
+		region = environment.region()
+		if region is None or not region.brailleCells:
+			return "route"
+		region.routeTo(generator.randrange(len(region.brailleCells)))
+		environment.flush()
+		return "route"
+
+	def switchFocus(self, generator: random.Random) -> str:
+		self.document = generator.choice(self.documents + [self.browseModeDocument])
+		environment.focus(self.document)
+		return "switchFocus"
+
+	def moveInBrowseMode(self, generator: random.Random) -> str:
+		import textInfos
+
+		if self.document is not self.browseModeDocument:
+			return self.extendSelection(generator)
+		unit: str = generator.choice((textInfos.UNIT_CHARACTER, textInfos.UNIT_WORD, textInfos.UNIT_LINE))
+		self.document._selectionMovementScriptHelper(unit, generator.choice((-1, 1)))
+		environment.flush()
+		return "moveInBrowseMode"
+
+	def changeText(self, generator: random.Random) -> str:
+		import eventHandler
+
+		# Length is kept, so that offsets of selection stay valid.
+		text: str = self.document.documentText
+		offset: int = generator.randrange(len(text))
+		if text[offset] != "\n":
+			self.document.documentText = text[:offset] + generator.choice("abcdefgh") + text[offset + 1 :]
+		eventHandler.queueEvent("textChange", self.document)
+		environment.flush()
+		return "changeText"
+
+	def reportSummary(self, generator: random.Random) -> str:
+		import globalPluginHandler
+		import ui
+
+		globalPluginHandler.runningPlugins[0].script_reportSelectionSummary(None)
+		environment.flush()
+		ui.messages.clear()
+		return "reportSummary"
+
+	def state(self) -> dict[str, int]:
+		"""Gets sizes of state of the add-on.
+		:return: sizes by name
+		"""
+		module = self.showSelection
+		return {
+			"regions": len(module.registry._regionRegistry._regions),
+			"summaries": len(module.summary._summarizer._cache),
+			"prefetched": len(module.prefetch._prefetcher._entries),
+			"snapshots": len(module.snapshots._snapshotCache._snapshots),
+			"translations": len(module.translation.cache._translations) if module.translation.cache else 0,
+			"lateSelections": len(module.selection._fetcher._late),
+			"stuckWorkers": len(module.selection._fetcher._stuck),
+			"syntheticCarets": len(module.trace.recorder.syntheticCaretEvents) if module.trace.recorder else 0,
+			"pendingReview": int(module.coalescer._coalescer._reviewPos is not None),
+			"lastKnownSelection": int(module.selection._selectionCache._lastKnownSelection is not None),
+			"fetchedRanges": int(module.selection._selectionCache._fetchedRanges is not None),
+		}
+
+	def limits(self) -> dict[str, int]:
+		"""Gets capacities of bounded state of the add-on.
+		:return: capacities by name
+		"""
+		import config
+
+		module = self.showSelection
+		return {
+			"summaries": module.summary._SelectionSummarizer.CACHE_SIZE,
+			"prefetched": module.prefetch._Prefetcher.MAX_ENTRIES,
+			"snapshots": module.snapshots._SnapshotCache.MAX_ENTRIES,
+			"translations": config.conf["showSelection"]["translationCacheSize"],
+			"stuckWorkers": module.selection._SelectionFetcher.MAX_STUCK_WORKERS,
+		}
+
+	def run(self, operations: int, interval: int, seed: int) -> list[dict[str, object]]:
+		"""Runs operations and takes sample after each interval.
+		:param operations: number of operations
+		:param interval: number of operations between samples
+		:param seed: seed of random generator
+		:return: samples
+		"""
+		import core
+		import queueHandler
+
+		generator = random.Random(seed)
+		functions, weights = zip(*self.operations)
+		samples: list[dict[str, object]] = []
+		latencies: list[float] = []
+		queueDepth: int = 0
+		counts: collections.Counter[str] = collections.Counter()
+		for index in range(1, operations + 1):
+			operation: Operation = generator.choices(functions, weights)[0]
+			start: float = time.perf_counter()
+			counts[operation(generator)] += 1
+			latencies.append((time.perf_counter() - start) * 1000000)
+			queueDepth = max(queueDepth, len(queueHandler.eventQueue) + len(core.timers))
+			environment.idle()
+			if index % interval == 0:
+				latencies.sort()
+				gc.collect()
+				sample: dict[str, object] = {
+					"operations": index,
+					"p50": percentile(latencies, 0.5),
+					"p99": percentile(latencies, 0.99),
+					"blocks": sys.getallocatedblocks(),
+					"objects": len(gc.get_objects()),
+					"queueDepth": queueDepth,
+					**self.state(),
+				}
+				samples.append(sample)
+				_printSample(sample, header=len(samples) == 1)
+				latencies = []
+				queueDepth = 0
+		print("operations: " + ", ".join(f"{name} {count}" for name, count in sorted(counts.items())))
+		return samples
+
+
+def _printSample(sample: dict[str, object], header: bool) -> None:
+	columns: list[str] = [name for name in sample if name != "operations"]
+	if header:
+		print(f"{'operations':>10}" + "".join(f"{name:>15}" for name in columns))
+	print(
+		f"{sample['operations']:>10}"
+		+ "".join(
+			f"{sample[name]:>15.0f}" if isinstance(sample[name], float) else f"{sample[name]:>15}"
+			for name in columns
+		)
+	)
+
+
+def _grows(values: list[float], tolerance: float, slack: float) -> bool:
+	"""Checks if values grow steadily beyond tolerance.
+	:param values: values of samples after warm-up
+	:param tolerance: allowed relative growth
+	:param slack: allowed absolute growth
+	:return: True if last value exceeds first value by more than tolerance and
+	slack, and values increased in most intervals
+	"""
+	if len(values) < 3:
+		return False
+	increases: int = sum(later > earlier for earlier, later in zip(values, values[1:]))
+	return values[-1] > values[0] * (1 + tolerance) + slack and increases >= 0.75 * (len(values) - 1)
+
+
+def check(samples: list[dict[str, object]], limits: dict[str, int], warmUp: int) -> list[str]:
+	"""Checks samples for unbounded growth.
+	:param samples: samples taken by soak test
+	:param limits: capacities of bounded state, which may fill during test
+	:param warmUp: number of first samples which are ignored while caches fill
+	:return: descriptions of failures
+	"""
+	failures: list[str] = []
+	for name, limit in limits.items():
+		largest: int = max(sample[name] for sample in samples)
+		if largest > limit:
+			failures.append(f"{name} exceeded its capacity {limit}: {largest}")
+	samples = samples[warmUp:]
+	if len(samples) < 4:
+		return failures + ["too few samples after warm-up, increase --operations"]
+	half: int = len(samples) // 2
+	for name, tolerance, slack in (("p50", 0.5, 20), ("p99", 1.0, 200)):
+		reference: float = statistics.median(sample[name] for sample in samples[:half])
+		final: float = statistics.median(sample[name] for sample in samples[-max(1, len(samples) // 4) :])
+		if final > reference * (1 + tolerance) + slack:
+			failures.append(f"{name} latency drifted from {reference:.0f} us to {final:.0f} us")
+	for name, tolerance, slack in (
+		("blocks", 0.05, 2000),
+		("objects", 0.05, 1000),
+		("queueDepth", 1.0, 10),
+		("regions", 0, 2),
+		("lateSelections", 0, 2),
+		("syntheticCarets", 0, 16),
+	):
+		values: list[float] = [sample[name] for sample in samples]
+		if _grows(values, tolerance, slack):
+			failures.append(f"{name} grew from {values[0]} to {values[-1]}")
+	return failures
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--operations", type=int, default=200000, help="number of operations")
+	parser.add_argument("--interval", type=int, default=10000, help="operations between samples")
+	parser.add_argument("--size", type=int, default=20000, help="size of documents in characters")
+	parser.add_argument("--seed", type=int, default=1, help="seed of random generator")
+	parser.add_argument("--warm-up", type=int, default=2, help="samples ignored while caches fill")
+	parser.add_argument("--json", help="write samples to this file")
+	args = parser.parse_args()
+	soak = Soak(args.size)
+	samples: list[dict[str, object]] = soak.run(args.operations, args.interval, args.seed)
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as file:
+			json.dump(samples, file, indent="\t")
+	failures: list[str] = check(samples, soak.limits(), args.warm_up)
+	for failure in failures:
+		print(f"FAIL: {failure}")
+	if failures:
+		sys.exit(1)
+	print("OK")
+
+
+if __name__ == "__main__":
+	main()